@@ -0,0 +1,100 @@
+"""Benchmark de save-analysis: un request por frame vs modo batch.
+
+Simula una cámara en realtime_epp que guarda --frames análisis. La variante
+original hace un request (con --request-overhead de API Gateway + Lambda) y un
+put_item más tres actualizaciones de agregados por frame; el modo batch envía
+lotes de --batch-sizes frames que se escriben con BatchWriteItem de a 25 y
+agregados agrupados. --throttle-rate marca requests del lote como
+UnprocessedItems para ejercitar los reintentos.
+
+    python bench_batch_save.py --frames 500 --batch-sizes 25 100 500 --latency 0.005
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+import support
+import batch_write
+from fakes import FakeDynamoDB
+from idempotency import DedupeCache
+
+USER_ID = 'camera-user'
+
+
+def frames(count, seed=0):
+    rng = random.Random(seed)
+    start = 1700000000000
+    return [support.analysis_data(rng, start + index * 200, 'realtime_epp') for index in range(count)]
+
+
+def install(handler, latency, throttle_rate):
+    dynamodb = FakeDynamoDB(latency=latency, throttle_rate=throttle_rate)
+    handler.dynamodb = dynamodb.client()
+    handler.table = dynamodb.Table('epi-user-analysis')
+    handler.stats_table = dynamodb.Table('epi-analysis-stats')
+    handler.recent = DedupeCache()
+    return dynamodb
+
+
+def single(handler, data, overhead):
+    failed = 0
+    for analysis in data:
+        time.sleep(overhead)
+        response = handler.lambda_handler({'body': json.dumps({'userId': USER_ID, 'analysisData': analysis})}, None)
+        failed += response['statusCode'] != 200
+    return len(data), failed
+
+
+def batched(handler, data, overhead, size):
+    failed = 0
+    requests = 0
+    for start in range(0, len(data), size):
+        time.sleep(overhead)
+        response = handler.lambda_handler({'body': json.dumps({'userId': USER_ID, 'analyses': data[start:start + size]})}, None)
+        failed += json.loads(response['body'])['failed']
+        requests += 1
+    return requests, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[25, 100, 500])
+    parser.add_argument('--latency', type=float, default=0.005, help='latencia simulada por llamada a DynamoDB (s)')
+    parser.add_argument('--request-overhead', type=float, default=0.02, help='API Gateway + invocación por request (s)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    handler = support.load_handler('analysis/save-analysis-lambda.py')
+    batch_write.BASE_DELAY = 0.01
+    data = frames(args.frames)
+    variants = [('put_item por frame', lambda: single(handler, data, args.request_overhead))]
+    for size in args.batch_sizes:
+        variants.append((f'batch de {size}', lambda size=size: batched(handler, data, args.request_overhead, size)))
+
+    rows = []
+    for label, function in variants:
+        dynamodb = install(handler, args.latency, args.throttle_rate)
+        # Una sola pasada: repetirla sobre las mismas tablas serían reintentos (duplicados)
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            requests, failed = function()
+        elapsed = time.perf_counter() - began
+        calls = dynamodb.calls
+        dynamodb.throttle_rate = 0.0
+        stored = dynamodb.Table('epi-user-analysis').item_count()
+        total = dynamodb.Table('epi-analysis-stats').get_item(Key={'pk': 'GLOBAL', 'sk': 'TOTAL'}).get('Item', {}).get('total', 0)
+        rows.append([label, requests, calls['PutItem'], calls['BatchWriteItem'], calls['UpdateItem'],
+                     f'{elapsed:.2f}', f'{args.frames / elapsed:,.0f}', stored, int(total), failed])
+
+    print(f'{args.frames} frames, DynamoDB {args.latency * 1000:.0f} ms, request {args.request_overhead * 1000:.0f} ms, '
+          f'throttling {args.throttle_rate:.0%}\n')
+    support.print_table(['variante', 'requests', 'PutItem', 'BatchWriteItem', 'UpdateItem', 'segundos', 'frames/s',
+                         'guardados', 'total stats', 'fallidos'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark del modo batch de bedrock-summary contra un Bedrock simulado.
+
+Compara N requests individuales (una invocación al modelo por request, más un
+round trip HTTP simulado) con un único request batch con distintos niveles de
+concurrencia. La caché de resúmenes se desactiva para medir solo las
+invocaciones al modelo.
+
+    python bench_bedrock_batch.py --items 24 --model-latency 0.5 --request-overhead 0.15
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+import support
+from fakes import FakeBedrock
+from summary_cache import SummaryCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=24)
+    parser.add_argument('--model-latency', type=float, default=0.5, help='latencia simulada de invoke_model (s)')
+    parser.add_argument('--request-overhead', type=float, default=0.15, help='round trip HTTP + API Gateway por request (s)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    handler = support.load_handler('ai/bedrock-summary-lambda.py')
+    handler.TEMPLATE_CLASSES = set()
+    rng = random.Random(0)
+    items = [
+        {'analysisResults': support.analysis_data(rng, 1700000000000 + i, 'ppe_detection'), 'requiredEPPs': ['HEAD_COVER', 'HAND_COVER']}
+        for i in range(args.items)
+    ]
+
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        bedrock = FakeBedrock(latency=args.model_latency)
+        handler.bedrock = bedrock
+        handler.summary_cache = SummaryCache(max_entries=0)
+        start = time.perf_counter()
+        for item in items:
+            time.sleep(args.request_overhead)
+            handler.lambda_handler({'body': json.dumps(item)}, None)
+        rows.append(['requests individuales', '-', args.items, f'{time.perf_counter() - start:.2f}', bedrock.calls['InvokeModel']])
+
+        for concurrency in args.concurrency:
+            bedrock = FakeBedrock(latency=args.model_latency)
+            handler.bedrock = bedrock
+            handler.summary_cache = SummaryCache(max_entries=0)
+            handler.BATCH_CONCURRENCY = concurrency
+            start = time.perf_counter()
+            time.sleep(args.request_overhead)
+            response = handler.lambda_handler({'body': json.dumps({'batch': items})}, None)
+            elapsed = time.perf_counter() - start
+            ok = sum(1 for result in json.loads(response['body'])['results'] if 'summary' in result)
+            rows.append(['batch', concurrency, ok, f'{elapsed:.2f}', bedrock.calls['InvokeModel']])
+
+    print(f'{args.items} análisis, modelo {args.model_latency * 1000:.0f} ms, overhead HTTP {args.request_overhead * 1000:.0f} ms\n')
+    support.print_table(['modo', 'concurrencia', 'resúmenes', 'segundos', 'invocaciones'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Benchmark de la eliminación en lote de delete-analysis (bulk_delete).
+
+Carga --items análisis (items chicos, --detail-share con detalle en S3)
+repartidos entre --users usuarios, con los agregados de epi-analysis-stats
+recalculados, y los elimina todos con:
+- DELETE por análisis: el request original (delete_item + agregados + S3), con
+  --request-overhead de API Gateway + Lambda por request; se mide sobre
+  --legacy-max análisis y se extrapola
+- lote por rango: from/to por usuario, repitiendo mientras remaining
+- lote por timestamps: listas de MAX_BULK_DELETE timestamps por usuario
+- purge: bulk_delete.purge (retención, scan paralelo de toda la tabla)
+
+Verifica que la tabla, los objetos de S3 y los agregados queden en cero.
+
+    python bench_bulk_delete.py --items 100000 --users 20 --latency 0.005
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+import support
+import batch_write
+import bulk_delete
+from analysis_codec import DETAIL_BUCKET, detail_key
+from fakes import FakeDynamoDB, FakeS3
+from stats_store import rebuild
+
+NOW_MS = 1735689600000
+
+
+def dataset(count, ids, detail_share, seed=0):
+    rng = random.Random(seed)
+    items = {}
+    while len(items) < count:
+        user_id = rng.choice(ids)
+        timestamp = NOW_MS - rng.randrange(365 * support.DAY_MS)
+        item = {'userId': user_id, 'timestamp': timestamp,
+                'analysisData': {'DetectionType': rng.choice(support.DETECTION_TYPES), 'timestamp': timestamp}}
+        if rng.random() < detail_share:
+            item['encoding'] = 'zlib-json/1'
+            item['detailKey'] = detail_key(user_id, timestamp)
+        items[(user_id, timestamp)] = item
+    return list(items.values())
+
+
+def install(handler, items, latency):
+    dynamodb = FakeDynamoDB(latency=latency)
+    s3 = FakeS3()
+    table = dynamodb.Table('epi-user-analysis')
+    table.load(items)
+    for item in items:
+        if 'detailKey' in item:
+            s3.objects[(DETAIL_BUCKET, item['detailKey'])] = b'{}'
+    rebuild(dynamodb.client(), dynamodb.Table('epi-analysis-stats'))
+    dynamodb.calls.clear()
+    table.consumed_wcu = 0.0
+    handler.dynamodb, handler.table, handler.s3 = dynamodb.client(), table, s3
+    handler.stats_table = dynamodb.Table('epi-analysis-stats')
+    return dynamodb, s3
+
+
+def call(handler, params=None, body=None, overhead=0.0):
+    time.sleep(overhead)
+    event = {'httpMethod': 'DELETE', 'queryStringParameters': params}
+    if body is not None:
+        event['body'] = json.dumps(body)
+    response = handler.lambda_handler(event, None)
+    if response['statusCode'] != 200:
+        raise SystemExit(f'delete-analysis: {response["body"]}')
+    return json.loads(response['body'])
+
+
+def one_by_one(handler, items, overhead):
+    for item in items:
+        call(handler, {'userId': item['userId'], 'timestamp': str(item['timestamp'])}, overhead=overhead)
+    return len(items)
+
+
+def by_range(handler, ids, overhead):
+    requests = 0
+    for user_id in ids:
+        while True:
+            body = call(handler, {'userId': user_id, 'from': '1577836800000', 'to': str(NOW_MS)}, overhead=overhead)
+            requests += 1
+            if not body['remaining']:
+                break
+    return requests
+
+
+def by_timestamps(handler, items, overhead):
+    by_user = {}
+    for item in items:
+        by_user.setdefault(item['userId'], []).append(item['timestamp'])
+    requests = 0
+    for user_id, timestamps in by_user.items():
+        for start in range(0, len(timestamps), bulk_delete.MAX_BULK_DELETE):
+            call(handler, body={'userId': user_id, 'timestamps': timestamps[start:start + bulk_delete.MAX_BULK_DELETE]},
+                 overhead=overhead)
+            requests += 1
+    return requests
+
+
+def purge(handler):
+    bulk_delete.purge(handler.table, handler.dynamodb, handler.stats_table, handler.s3, NOW_MS + 1)
+    return '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--detail-share', type=float, default=0.05)
+    parser.add_argument('--legacy-max', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.005, help='latencia simulada por llamada a DynamoDB (s)')
+    parser.add_argument('--request-overhead', type=float, default=0.02, help='API Gateway + invocación por request (s)')
+    args = parser.parse_args()
+
+    handler = support.load_handler('analysis/delete-analysis-lambda.py')
+    batch_write.BASE_DELAY = 0.01
+    ids = support.user_ids(args.users)
+    items = dataset(args.items, ids, args.detail_share)
+    sample = items[:args.legacy_max]
+    variants = (
+        ('DELETE por análisis', len(sample), lambda: one_by_one(handler, sample, args.request_overhead)),
+        ('lote por rango', len(items), lambda: by_range(handler, ids, args.request_overhead)),
+        ('lote por timestamps', len(items), lambda: by_timestamps(handler, items, args.request_overhead)),
+        ('purge (retención)', len(items), lambda: purge(handler)),
+    )
+    rows = []
+    for label, count, function in variants:
+        dynamodb, s3 = install(handler, items, args.latency)
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            requests = function()
+        elapsed = time.perf_counter() - began
+        table = handler.table
+        totals = handler.stats_table.get_item(Key={'pk': 'GLOBAL', 'sk': 'TOTAL'})['Item']
+        users = handler.stats_table.query(KeyConditionExpression='pk = :pk', ExpressionAttributeValues={':pk': 'USER'})['Items']
+        left = len(items) - count
+        if (table.item_count() != left or int(totals['total']) != left or len(s3.objects) != sum('detailKey' in item for item in items[count:])
+                or (not left and any(int(user['count']) or 'lastAnalysis' in user for user in users))):
+            raise SystemExit(f'{label}: quedaron análisis, objetos de S3 o agregados sin descontar')
+        projected = elapsed * len(items) / count
+        rows.append([label, count, requests, dynamodb.calls['DeleteItem'], dynamodb.calls['BatchWriteItem'],
+                     dynamodb.calls['UpdateItem'], f'{table.consumed_wcu:,.0f}', f'{elapsed:.1f}',
+                     f'{count / elapsed:,.0f}', f'{projected:,.0f}'])
+
+    print(f'{args.items:,} análisis de {args.users} usuarios, DynamoDB {args.latency * 1000:.0f} ms, '
+          f'request {args.request_overhead * 1000:.0f} ms\n')
+    support.print_table(['variante', 'análisis', 'requests', 'DeleteItem', 'BatchWriteItem', 'UpdateItem', 'WCU',
+                         'segundos', 'análisis/s', f's para {args.items:,}'], rows)
+
+
+if __name__ == '__main__':
+    main()
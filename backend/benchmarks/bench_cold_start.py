@@ -0,0 +1,128 @@
+"""Profiler del cold start de las Lambdas Python: import e init de clientes.
+
+Cada handler se importa en un proceso nuevo (como un contenedor de Lambda), dos
+veces:
+- eager: AWS_CLIENTS_EAGER=1, los clientes se construyen al importar (lo que
+  hacían los handlers antes de aws_clients.py)
+- lazy: los clientes se construyen en el primer uso; después del import se
+  construyen todos con aws_clients.preload() para medir lo que pagaría un
+  request que los use todos
+
+Reporta ms de import, ms de construcción de cada cliente (el primero paga
+además el import de boto3 y la sesión) y el RSS después del import. Con --importtime N
+lista también los N módulos con más tiempo propio de import (python -X
+importtime) de cada handler.
+
+Los clientes de boto3 se construyen sin red ni credenciales; no se invoca
+ningún handler.
+
+    python bench_cold_start.py --runs 5 --importtime 5
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import support
+
+HANDLERS = (
+    'analysis/save-analysis-lambda.py',
+    'analysis/delete-analysis-lambda.py',
+    'admin/epi-admin-stats-lambda-v2-updated.py',
+    'admin/lambda_function.py',
+    'admin/epi-admin-users-lambda-v2.py',
+    'admin/epi-admin-user-history-lambda.py',
+    'admin/epi-admin-actions-lambda-updated.py',
+    'notifications/epi-get-supervisors-lambda.py',
+    'user/user-profile-lambda.py',
+    'ai/bedrock-summary-lambda.py',
+)
+
+
+def profile(relative_path):
+    """Import del handler en este proceso; devuelve las métricas como dict"""
+    began = time.perf_counter()
+    support.load_handler(relative_path)
+    imported = time.perf_counter() - began
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    import aws_clients
+
+    eager_builds = dict(aws_clients.build_times)
+    began = time.perf_counter()
+    aws_clients.preload()
+    first_use = time.perf_counter() - began
+    builds = {**eager_builds, **aws_clients.build_times}
+    return {
+        'import': imported * 1000,
+        'firstUse': first_use * 1000,
+        'clients': {f'{kind} {name}': seconds * 1000 for (kind, name, _), seconds in builds.items()},
+        'rss': rss,
+    }
+
+
+def run_child(relative_path, eager, importtime=False):
+    env = dict(os.environ, AWS_CLIENTS_EAGER='1' if eager else '0')
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), os.path.abspath(__file__),
+               '--run', relative_path]
+    child = subprocess.run(command, capture_output=True, text=True, env=env, cwd=support.BENCH_DIR)
+    if child.returncode != 0:
+        raise SystemExit(f'{relative_path}:\n{child.stderr}')
+    return json.loads(child.stdout.splitlines()[-1]), child.stderr
+
+
+def slowest_imports(stderr, count):
+    """Módulos con más tiempo propio en la salida de -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='procesos por handler y modo (se reporta la mediana)')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(profile(args.run)))
+        return
+
+    rows = []
+    details = []
+    for relative_path in HANDLERS:
+        eager = [run_child(relative_path, True)[0] for _ in range(args.runs)]
+        lazy = [run_child(relative_path, False)[0] for _ in range(args.runs)]
+        clients = lazy[0]['clients']
+        eager_import = statistics.median(run['import'] for run in eager)
+        lazy_import = statistics.median(run['import'] for run in lazy)
+        rows.append([
+            os.path.basename(relative_path), len(clients), f'{eager_import:.0f}', f'{lazy_import:.0f}',
+            f'{statistics.median(run["firstUse"] for run in lazy):.0f}',
+            f'{statistics.median(run["rss"] for run in eager):.0f}', f'{statistics.median(run["rss"] for run in lazy):.0f}',
+        ])
+        details.append((relative_path, clients))
+        if args.importtime:
+            _, stderr = run_child(relative_path, False, importtime=True)
+            details[-1] += (slowest_imports(stderr, args.importtime),)
+
+    print(f'Mediana de {args.runs} procesos por handler y modo\n')
+    support.print_table(['handler', 'clientes', 'import eager ms', 'import lazy ms', 'primer uso ms',
+                         'RSS eager MB', 'RSS lazy MB'], rows)
+    print('\nConstrucción de cada cliente en el primer uso (ms):')
+    for relative_path, clients, *imports in details:
+        print(f'  {os.path.basename(relative_path)}: ' + ', '.join(f'{name} {ms:.0f}' for name, ms in clients.items()))
+        for self_us, name in (imports[0] if imports else []):
+            print(f'      {self_us / 1000:6.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark del formato compacto de epi-user-analysis (analysis_codec).
+
+Genera análisis de un usuario (EPP con 1 a --max-persons personas, la mitad
+con aiSummary, y otros tipos), los guarda en formato original y compacto y
+compara tamaño de item, costo de codificar al guardar, y tiempo y RCU de leer
+el historial completo (query + decode) y de un scan completo. Luego migra la
+tabla original con analysis_codec.migrate y verifica que cada item decodificado
+sea igual al original.
+
+    python bench_compact_storage.py --items 2000 --max-persons 20 --latency 0.005
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import statistics
+import time
+
+import support
+from analysis_codec import build_item, decode_analysis, migrate
+from boto3.dynamodb.conditions import Key
+from decimal_json import loads
+from fakes import FakeDynamoDB, item_size
+
+USER_ID = 'bench-user'
+AI_SUMMARY = ('**DETECCIÓN Y CUMPLIMIENTO**\nSe detectaron personas en la imagen con cumplimiento parcial de los EPP '
+              'requeridos. ' * 12)
+
+
+def analyses(count, max_persons, seed=0):
+    """analysisData tal como los recibe save-analysis (Decimal desde el body JSON)"""
+    rng = random.Random(seed)
+    result = []
+    for index in range(count):
+        detection_type = 'ppe_detection' if rng.random() < 0.7 else rng.choice(support.DETECTION_TYPES)
+        data = support.analysis_data(rng, 1700000000000 + index * 1000, detection_type,
+                                     persons=rng.randint(1, max_persons) if detection_type == 'ppe_detection' else None)
+        if detection_type == 'ppe_detection' and rng.random() < 0.5:
+            data['aiSummary'] = AI_SUMMARY
+        result.append(loads(json.dumps(data)))
+    return result
+
+
+def read_history(table):
+    items, params = [], {'KeyConditionExpression': Key('userId').eq(USER_ID), 'ScanIndexForward': False}
+    while True:
+        response = table.query(**params)
+        items.extend(decode_analysis(item) for item in response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return items
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def full_scan(table):
+    count, params = 0, {}
+    while True:
+        response = table.scan(**params)
+        count += response['Count']
+        if 'LastEvaluatedKey' not in response:
+            return count
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--max-persons', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.005, help='latencia simulada por llamada a DynamoDB (s)')
+    args = parser.parse_args()
+
+    data = analyses(args.items, args.max_persons)
+    rows = []
+    tables = {}
+    for label, compact in (('original', False), ('compacto', True)):
+        dynamodb = FakeDynamoDB(latency=args.latency)
+        table = dynamodb.Table('epi-user-analysis')
+        items, encode_time = timed(lambda: [build_item(USER_ID, int(d['timestamp']), d, compact) for d in data])
+        table.load(items)
+        sizes = sorted(item_size(item) for item in items)
+
+        history, read_time = timed(read_history, table)
+        read_rcu, table.consumed_rcu = table.consumed_rcu, 0.0
+        _, scan_time = timed(full_scan, table)
+        tables[label] = (dynamodb, table, history)
+        rows.append([label, f'{statistics.mean(sizes) / 1024:.1f}', f'{sizes[int(len(sizes) * 0.99)] / 1024:.1f}',
+                     f'{sizes[-1] / 1024:.1f}', f'{encode_time / len(data) * 1e6:.0f}', f'{read_time * 1000:.0f}',
+                     f'{read_rcu:.0f}', f'{scan_time * 1000:.0f}', f'{table.consumed_rcu:.0f}'])
+
+    print(f'{args.items} análisis, DynamoDB {args.latency * 1000:.0f} ms por llamada\n')
+    support.print_table(['formato', 'KB medio', 'KB p99', 'KB máx', 'µs codificar', 'historial ms', 'RCU historial',
+                         'scan ms', 'RCU scan'], rows)
+
+    original_history = tables['original'][2]
+    if tables['compacto'][2] != original_history:
+        raise SystemExit('El historial compacto decodificado no coincide con el original')
+
+    dynamodb, table, _ = tables['original']
+    with contextlib.redirect_stdout(io.StringIO()):
+        (seen, written), migrate_time = timed(migrate, dynamodb.client(), table.name)
+    if read_history(table) != original_history:
+        raise SystemExit('La migración alteró el contenido de algún análisis')
+    print(f'\nmigrate: {seen} revisados, {written} reescritos en {migrate_time:.2f} s; historial idéntico tras migrar')
+
+
+if __name__ == '__main__':
+    main()
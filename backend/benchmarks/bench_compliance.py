@@ -0,0 +1,142 @@
+"""Microbenchmark del motor de cumplimiento contra el cálculo original.
+
+La variante original (inline en bedrock-summary) reconstruye los mapeos por
+llamada y recorre personas, partes y detecciones dos veces; compliance aplana
+una vez y evalúa sobre columnas. También se mide reevaluar las mismas columnas
+con otro umbral, que es lo que aprovechan los reportes por umbral. Antes de
+medir se verifica que ambas variantes den el mismo resultado.
+
+    python bench_compliance.py --persons 10 100 500 1000 --repeat 200
+"""
+import argparse
+import random
+import time
+
+import support
+from compliance import compliance_metrics, evaluate, flatten
+
+REQUIRED = ['HEAD_COVER', 'HAND_COVER', 'FACE_COVER']
+
+
+def legacy(analysis_results, required_epps):
+    """Réplica del cálculo original de bedrock-summary, sin los prints de depuración"""
+    summary = analysis_results.get('Summary', {})
+    total_persons_detected = summary.get('totalPersons', 0)
+    min_confidence = analysis_results.get('MinConfidence', 75)
+    protective_equipment = analysis_results.get('ProtectiveEquipment', [])
+
+    def is_evaluable_person(person):
+        visible_parts = set()
+        for body_part in person.get('BodyParts', []):
+            visible_parts.add(body_part.get('Name'))
+        epp_to_parts = {
+            'HEAD_COVER': ['HEAD'],
+            'EYE_COVER': ['FACE'],
+            'FACE_COVER': ['FACE'],
+            'HAND_COVER': ['LEFT_HAND', 'RIGHT_HAND'],
+            'FOOT_COVER': ['FOOT'],
+            'EAR_COVER': ['HEAD']
+        }
+        for epp in required_epps:
+            required_parts = epp_to_parts.get(epp, [])
+            if any(part in visible_parts for part in required_parts):
+                return True
+        return False
+
+    evaluable_persons = [p for p in protective_equipment if is_evaluable_person(p)]
+    total_persons = len(evaluable_persons)
+
+    def validate_epp_for_bodypart(epp_type, body_part):
+        valid_combinations = {
+            'HEAD_COVER': ['HEAD'],
+            'EYE_COVER': ['FACE', 'HEAD'],
+            'FACE_COVER': ['FACE'],
+            'HAND_COVER': ['LEFT_HAND', 'RIGHT_HAND'],
+            'FOOT_COVER': ['FOOT', 'LEFT_FOOT', 'RIGHT_FOOT'],
+            'EAR_COVER': ['HEAD']
+        }
+        return body_part in valid_combinations.get(epp_type, [])
+
+    epp_detected = {}
+    compliant = 0
+    for person in evaluable_persons:
+        person_epps = set()
+        for body_part in person.get('BodyParts', []):
+            body_part_name = body_part.get('Name')
+            for equipment in body_part.get('EquipmentDetections', []):
+                epp_type = equipment.get('Type')
+                confidence = equipment.get('Confidence', 0)
+                if confidence >= min_confidence and validate_epp_for_bodypart(epp_type, body_part_name):
+                    person_epps.add(epp_type)
+                    epp_detected[epp_type] = epp_detected.get(epp_type, 0) + 1
+        if required_epps and all(epp in person_epps for epp in required_epps):
+            compliant += 1
+
+    below_threshold_epps = {}
+    below_threshold_max_conf = {}
+    for person in evaluable_persons:
+        for body_part in person.get('BodyParts', []):
+            body_part_name = body_part.get('Name')
+            for equipment in body_part.get('EquipmentDetections', []):
+                epp_type = equipment.get('Type')
+                confidence = equipment.get('Confidence', 0)
+                if validate_epp_for_bodypart(epp_type, body_part_name) and epp_type in required_epps:
+                    if confidence < min_confidence:
+                        below_threshold_epps[epp_type] = below_threshold_epps.get(epp_type, 0) + 1
+                        if epp_type not in below_threshold_max_conf or confidence > below_threshold_max_conf[epp_type]:
+                            below_threshold_max_conf[epp_type] = confidence
+
+    return {
+        'total_persons_detected': total_persons_detected,
+        'total_persons': total_persons,
+        'filtered_persons': total_persons_detected - total_persons,
+        'compliant': compliant,
+        'min_confidence': min_confidence,
+        'required_epps': required_epps,
+        'epp_detected': epp_detected,
+        'below_threshold_epps': below_threshold_epps,
+        'below_threshold_max_conf': below_threshold_max_conf
+    }
+
+
+def check(frames):
+    rng = random.Random(7)
+    epps = list(REQUIRED) + ['FOOT_COVER', 'EYE_COVER', 'EAR_COVER', 'UNKNOWN_COVER']
+    for frame in frames:
+        for _ in range(5):
+            required = rng.sample(epps, rng.randint(0, 4))
+            if legacy(frame, required) != compliance_metrics(frame, required):
+                raise SystemExit(f'Resultados distintos para requiredEPPs={required}')
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--persons', type=int, nargs='+', default=[10, 100, 500, 1000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    frames = {count: support.analysis_data(rng, 1700000000000, 'ppe_detection', persons=count) for count in args.persons}
+    check(frames.values())
+
+    rows = []
+    for count, frame in frames.items():
+        columns = flatten(frame['ProtectiveEquipment'])
+        original = timed(lambda: legacy(frame, REQUIRED), args.repeat)
+        engine = timed(lambda: compliance_metrics(frame, REQUIRED), args.repeat)
+        reevaluate = timed(lambda: evaluate(columns, REQUIRED, 60), args.repeat)
+        rows.append([count, len(columns.epp), f'{original * 1e6:,.0f}', f'{engine * 1e6:,.0f}',
+                     f'{reevaluate * 1e6:,.0f}', f'{original / engine:.1f}x'])
+
+    support.print_table(['personas', 'detecciones', 'original µs', 'compliance µs', 'reevaluar µs', 'mejora'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark de la conversión float -> Decimal del body de save-analysis.
+
+Compara sobre payloads PPE con varias personas (bounding boxes y confianzas):
+- json.loads + convert_floats recursivo (handler original, reconstruye el árbol)
+- json.loads + floats_to_decimal iterativo en el lugar (eventos ya decodificados)
+- json.loads(parse_float=Decimal) (decode_body con body en texto)
+
+Reporta tiempo por body, bloques asignados y pico de memoria (tracemalloc), y
+verifica que las tres variantes produzcan los mismos valores.
+
+    python bench_decimal_conversion.py --persons 5 50 200 --repeat 200
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+import support
+from decimal_json import floats_to_decimal, loads
+
+
+def convert_floats(obj):
+    """Réplica del handler original"""
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    elif isinstance(obj, dict):
+        return {k: convert_floats(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_floats(v) for v in obj]
+    return obj
+
+
+VARIANTS = (
+    ('recursivo (original)', lambda text: convert_floats(json.loads(text))),
+    ('iterativo en el lugar', lambda text: floats_to_decimal(json.loads(text))),
+    ('parse_float=Decimal', loads),
+)
+
+
+def allocations(function, text):
+    """(bloques asignados, pico en KB) de una ejecución"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = function(text)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    del result
+    return blocks, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--persons', type=int, nargs='+', default=[5, 50, 200])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = []
+    for persons in args.persons:
+        analysis = support.analysis_data(rng, 1700000000000, 'ppe_detection', persons=persons)
+        text = json.dumps({'userId': 'user', 'analysisData': analysis})
+        expected = convert_floats(json.loads(text))
+        for label, function in VARIANTS:
+            if function(text) != expected:
+                raise SystemExit(f'{label}: resultado distinto al original')
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                function(text)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            blocks, peak = allocations(function, text)
+            rows.append([persons, f'{len(text) / 1024:.0f}', label, f'{elapsed * 1e6:,.0f}', f'{blocks:,}', f'{peak:,.0f}'])
+
+    support.print_table(['personas', 'body KB', 'variante', 'µs/body', 'bloques', 'pico KB'], rows)
+
+
+if __name__ == '__main__':
+    main()
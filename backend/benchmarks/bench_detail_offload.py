@@ -0,0 +1,150 @@
+"""Benchmark del detalle de análisis grandes en S3 (analysis_codec + FakeS3).
+
+Guarda con save-analysis --items análisis EPP de 1 a --max-persons personas
+(con muchas personas el item se acerca al límite de 400 KB de DynamoDB) sin
+mover detalles a S3 y con el umbral --threshold, y compara tamaño de item, RCU
+de un scan completo y el historial paginado de epi-admin-user-history: tamaño y
+latencia de una página con detail=false y con el detalle (lo que pide el
+frontend), y la descarga de los detalles de una página en paralelo
+(fetch_details) frente a de a uno. Verifica que el historial con detalle sea
+igual al guardado sin S3, que los reintentos (duplicados) no suban objetos y
+que reemplazar un análisis grande por uno chico borre su objeto.
+
+    python bench_detail_offload.py --items 120 --max-persons 400 --page 20 --s3-latency 0.03
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import statistics
+import time
+
+import support
+import analysis_codec
+from fakes import FakeDynamoDB, FakeS3, item_size
+from idempotency import DedupeCache
+
+USER_ID = 'bench-user'
+
+
+def analyses(count, max_persons, seed=0):
+    rng = random.Random(seed)
+    return [support.analysis_data(rng, 1700000000000 + index * 1000, 'ppe_detection',
+                                  persons=rng.randint(1, max_persons)) for index in range(count)]
+
+
+def save_all(handler, data):
+    for analysis in data:
+        response = handler.lambda_handler({'body': json.dumps({'userId': USER_ID, 'analysisData': analysis})}, None)
+        if response['statusCode'] != 200:
+            raise SystemExit(f'save-analysis: {response["body"]}')
+
+
+def read_history(history_handler, page, detail):
+    """Historial completo página a página; devuelve (análisis, ms por página, KB por página)"""
+    result, latencies, sizes, params = [], [], [], {'userId': USER_ID, 'limit': str(page)}
+    if not detail:
+        params['detail'] = 'false'
+    while True:
+        start = time.perf_counter()
+        response = history_handler.lambda_handler({'queryStringParameters': dict(params)}, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(response['body']) / 1024)
+        body = json.loads(response['body'])
+        result.extend(body['history'])
+        if 'lastKey' not in body:
+            return result, statistics.median(latencies), statistics.median(sizes)
+        params['lastKey'] = body['lastKey']
+
+
+def full_scan(table):
+    params = {}
+    while True:
+        response = table.scan(**params)
+        if 'LastEvaluatedKey' not in response:
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=120)
+    parser.add_argument('--max-persons', type=int, default=400)
+    parser.add_argument('--page', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.005, help='latencia simulada por llamada a DynamoDB (s)')
+    parser.add_argument('--s3-latency', type=float, default=0.03, help='latencia simulada por llamada a S3 (s)')
+    parser.add_argument('--threshold', type=int, default=analysis_codec.DETAIL_OFFLOAD_BYTES,
+                        help='DETAIL_OFFLOAD_BYTES (bytes de JSON)')
+    args = parser.parse_args()
+
+    save = support.load_handler('analysis/save-analysis-lambda.py')
+    history = support.load_handler('admin/epi-admin-user-history-lambda.py')
+    data = analyses(args.items, args.max_persons)
+    expected = None
+
+    rows = []
+    for label, threshold in (('sin S3', float('inf')), ('detalle en S3', args.threshold)):
+        analysis_codec.DETAIL_OFFLOAD_BYTES = threshold
+        s3 = FakeS3(latency=args.s3_latency)
+        dynamodb = FakeDynamoDB(latency=args.latency)
+        save.dynamodb, save.s3 = dynamodb.client(), s3
+        save.table = history.table = dynamodb.Table('epi-user-analysis')
+        save.stats_table = dynamodb.Table('epi-analysis-stats')
+        save.recent = DedupeCache()
+        history.s3 = s3
+        with contextlib.redirect_stdout(io.StringIO()):
+            save_all(save, data)
+
+        table = save.table
+        items = [table._load(key) for key in sorted(table._data)]
+        sizes = sorted(item_size(item) for item in items)
+        table.consumed_rcu = 0.0
+        full_scan(table)
+        scan_rcu = table.consumed_rcu
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, summary_ms, summary_kb = read_history(history, args.page, detail=False)
+            full, detail_ms, _ = read_history(history, args.page, detail=True)
+        if expected is None:
+            expected = full
+        elif full != expected:
+            raise SystemExit('El historial con detalle desde S3 no coincide con el guardado sin S3')
+
+        offloaded = sum(1 for item in items if 'detailKey' in item)
+        fetch = {'paralelo': '-', 'de a uno': '-'}
+        if offloaded:
+            for name, workers in (('paralelo', analysis_codec.DETAIL_FETCH_CONCURRENCY), ('de a uno', 1)):
+                timings = []
+                for start in range(0, len(items), args.page):
+                    began = time.perf_counter()
+                    analysis_codec.fetch_details(s3, items[start:start + args.page], max_workers=workers)
+                    timings.append((time.perf_counter() - began) * 1000)
+                fetch[name] = f'{statistics.median(timings):.0f}'
+
+            # Reintentos en otro contenedor (duplicados): sin subidas nuevas ni objetos sueltos
+            puts = s3.calls['PutObject']
+            save.recent = DedupeCache()
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_all(save, data)
+            if s3.calls['PutObject'] != puts or len(s3.objects) != offloaded:
+                raise SystemExit('Los guardados duplicados subieron detalles a S3')
+            # Reemplazar los análisis grandes por uno chico borra sus objetos
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_all(save, [{**analysis, 'ProtectiveEquipment': analysis['ProtectiveEquipment'][:1]}
+                                for analysis, item in zip(data, items) if 'detailKey' in item])
+            if s3.objects:
+                raise SystemExit(f'{len(s3.objects)} detalles en S3 de análisis reemplazados')
+        rows.append([label, offloaded, f'{statistics.mean(sizes) / 1024:.1f}', f'{sizes[-1] / 1024:.1f}',
+                     f'{scan_rcu:.0f}', f'{summary_kb:.0f}', f'{summary_ms:.0f}', f'{detail_ms:.0f}',
+                     fetch['paralelo'], fetch['de a uno']])
+
+    print(f'{args.items} análisis de 1 a {args.max_persons} personas, umbral {args.threshold / 1024:.0f} KB, '
+          f'DynamoDB {args.latency * 1000:.0f} ms, S3 {args.s3_latency * 1000:.0f} ms, páginas de {args.page}\n')
+    support.print_table(['variante', 'en S3', 'KB medio', 'KB máx', 'RCU scan', 'KB página detail=false', 'ms página detail=false',
+                         'ms página con detalle', 'ms fetch paralelo', 'ms fetch de a uno'], rows)
+    print('\nhistorial con detalle idéntico en ambas variantes; reintentos sin subidas y reemplazos sin objetos sueltos')
+
+
+if __name__ == '__main__':
+    main()
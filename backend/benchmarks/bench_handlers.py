@@ -0,0 +1,481 @@
+"""Benchmark de punta a punta de las Lambdas Python con stand-ins de AWS.
+
+Cada escenario importa un lambda_handler, reemplaza sus clientes por los
+stand-ins de fakes.py (DynamoDB, Cognito, S3 y Bedrock en memoria, con
+--latency y --throttle-rate), arma el dataset sintético (--users usuarios de
+Cognito, --analyses análisis con los agregados de epi-analysis-stats, un
+historial de --history análisis) y lo invoca --invocations veces con eventos
+de API Gateway. Las primeras --warmup invocaciones no se miden.
+
+Cada escenario corre en un proceso propio: el pico de RSS (ru_maxrss) es el
+del escenario y las cachés de contenedor (directorio, DedupeCache,
+summary_cache) arrancan vacías. Reporta p50/p95/p99, pico de RSS, cuánto crece
+durante las invocaciones, llamadas a AWS por invocación y respuestas 5xx.
+Los stand-ins se envuelven con metrics.instrument como los clientes reales, y
+de las líneas de métricas de cada invocación sale la mediana por fase (parse,
+DynamoDB, Cognito, S3, Bedrock, compute, serialize) y la capacidad consumida.
+
+Sin opciones compara con baseline.json y termina con código 1 si un escenario
+empeora: p95 o crecimiento de RSS por encima de --tolerance (y p95 más de
+--min-delta ms), más llamadas a AWS por invocación (deterministas con la misma
+semilla) o más respuestas 5xx. Así una regresión se detecta antes del deploy;
+--save-baseline reescribe la línea base después de un cambio aceptado (depende
+de la máquina: generarla donde se compara). En máquinas con ruido, --repeat 3
+corre cada escenario tres veces y compara la mediana.
+
+    python bench_handlers.py
+    python bench_handlers.py --only save-analysis delete-analysis --invocations 500
+    python bench_handlers.py --latency 0.005 --throttle-rate 0.01 --no-compare
+    python bench_handlers.py --save-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import support
+from analysis_codec import build_item
+from decimal_json import loads
+from fakes import FakeBedrock, FakeCognito, FakeDynamoDB, FakeDynamoDBClient, FakeS3, FakeTable
+from idempotency import DedupeCache
+from metrics import instrument
+from role_index import reconcile
+from stats_store import rebuild
+from summary_cache import SummaryCache
+from user_directory import get_users
+
+BASELINE = os.path.join(support.BENCH_DIR, 'baseline.json')
+NOW_MS = int(time.time() // 86400 * 86400 * 1000)
+POOL_ID = 'us-east-1_zrdfN7OKN'
+
+
+class Environment:
+    """Stand-ins y datasets compartidos por los escenarios"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.dynamodb = FakeDynamoDB(seed=args.seed)
+        self.cognito = FakeCognito(support.cognito_users(args.users, args.seed), seed=args.seed)
+        self.s3 = FakeS3(seed=args.seed)
+        self.bedrock = FakeBedrock(seed=args.seed)
+        self.ids = [user['Username'] for user in self.cognito.users]
+
+    @property
+    def services(self):
+        return (self.dynamodb, self.cognito, self.s3, self.bedrock)
+
+    def analyses(self, stats=True):
+        """--analyses análisis de los usuarios del pool, con o sin agregados"""
+        table = self.dynamodb.Table('epi-user-analysis')
+        table.load(support.analysis_items(self.args.analyses, users=len(self.ids), days=30, seed=self.args.seed,
+                                          now_ms=NOW_MS, as_decimal=True))
+        if stats:
+            rebuild(self.dynamodb.client(), self.dynamodb.Table('epi-analysis-stats'))
+        return table
+
+    def history(self, user_id):
+        """--history análisis de un usuario guardados como save-analysis (build_item)"""
+        table = self.dynamodb.Table('epi-user-analysis')
+        table.load(build_item(user_id, NOW_MS - index * 60000,
+                              loads(json.dumps(support.analysis_data(self.rng, NOW_MS - index * 60000))), s3=self.s3)
+                   for index in range(self.args.history))
+        return table
+
+    def arm(self):
+        """Latencia y throttling a partir de acá (la carga del dataset no los paga)"""
+        for service in self.services:
+            service.latency = self.args.latency
+            service.throttle_rate = self.args.throttle_rate
+            service.calls.clear()
+        self.bedrock.latency = self.args.model_latency
+
+
+def get(params):
+    return {'httpMethod': 'GET', 'queryStringParameters': params}
+
+
+def post(body, method='POST', params=None):
+    return {'httpMethod': method, 'queryStringParameters': params, 'body': json.dumps(body)}
+
+
+SERVICES = ((FakeDynamoDB, 'dynamodb'), (FakeDynamoDBClient, 'dynamodb'), (FakeTable, 'dynamodb'), (FakeCognito, 'cognito-idp'), (FakeS3, 's3'),
+            (FakeBedrock, 'bedrock-runtime'))
+PHASES = ('Parse', 'DynamoDB', 'Cognito', 'S3', 'Bedrock', 'Compute', 'Serialize')
+
+
+def instrumented(handler):
+    """Envuelve los stand-ins asignados al handler como aws_clients envuelve los clientes reales"""
+    for name, value in vars(handler).items():
+        for fake_type, service in SERVICES:
+            if isinstance(value, fake_type):
+                setattr(handler, name, instrument(value, service))
+    return handler
+
+
+def events(handler, builder):
+    """invoke(index) que llama al handler con el evento builder(index)"""
+    instrumented(handler)
+    return lambda index: handler.lambda_handler(builder(index), None)
+
+
+# ---------------------------------------------------------------------------
+# Escenarios: reciben el Environment y devuelven invoke(index)
+# ---------------------------------------------------------------------------
+
+def save_single(env, count):
+    handler = support.load_handler('analysis/save-analysis-lambda.py')
+    handler.dynamodb, handler.s3, handler.recent = env.dynamodb.client(), env.s3, DedupeCache()
+    handler.table = env.dynamodb.Table('epi-user-analysis')
+    handler.stats_table = env.dynamodb.Table('epi-analysis-stats')
+    bodies = [json.dumps({'userId': env.ids[index % len(env.ids)],
+                          'analysisData': support.analysis_data(env.rng, NOW_MS + index, 'ppe_detection')})
+              for index in range(count)]
+    return events(handler, lambda index: {'httpMethod': 'POST', 'body': bodies[index]})
+
+
+def save_batch(env, count):
+    handler = support.load_handler('analysis/save-analysis-lambda.py')
+    handler.dynamodb, handler.s3, handler.recent = env.dynamodb.client(), env.s3, DedupeCache()
+    handler.table = env.dynamodb.Table('epi-user-analysis')
+    handler.stats_table = env.dynamodb.Table('epi-analysis-stats')
+    bodies = [json.dumps({'userId': env.ids[index % len(env.ids)], 'analyses': [
+        support.analysis_data(env.rng, NOW_MS + index * 1000 + frame, 'realtime_epp', persons=1) for frame in range(100)
+    ]}) for index in range(count)]
+    return events(handler, lambda index: {'httpMethod': 'POST', 'body': bodies[index]})
+
+
+def delete_single(env, count):
+    handler = support.load_handler('analysis/delete-analysis-lambda.py')
+    handler.dynamodb, handler.s3 = env.dynamodb.client(), env.s3
+    handler.table = env.history(env.ids[0])
+    handler.stats_table = env.dynamodb.Table('epi-analysis-stats')
+    rebuild(handler.dynamodb, handler.stats_table)
+    timestamps = [NOW_MS - index * 60000 for index in range(env.args.history)]
+    return events(handler, lambda index: {'httpMethod': 'DELETE', 'queryStringParameters': {
+        'userId': env.ids[0], 'timestamp': str(timestamps[index % len(timestamps)])}})
+
+
+def delete_bulk(env, count):
+    handler = support.load_handler('analysis/delete-analysis-lambda.py')
+    handler.dynamodb, handler.s3 = env.dynamodb.client(), env.s3
+    handler.table = env.dynamodb.Table('epi-user-analysis')
+    handler.stats_table = env.dynamodb.Table('epi-analysis-stats')
+    for user_id in env.ids[:count]:
+        handler.table.load({'userId': user_id, 'timestamp': NOW_MS - frame * 1000,
+                            'analysisData': {'DetectionType': 'realtime_epp'}} for frame in range(100))
+    rebuild(handler.dynamodb, handler.stats_table)
+    return events(handler, lambda index: post({'userId': env.ids[index % len(env.ids)],
+                                               'timestamps': [NOW_MS - frame * 1000 for frame in range(100)]}, 'DELETE'))
+
+
+def admin_stats(relative_path, stats=True):
+    def scenario(env, count):
+        handler = support.load_handler(relative_path)
+        handler.cognito, handler.dynamodb = env.cognito, env.dynamodb.client()
+        env.analyses(stats)
+        handler.stats_table = env.dynamodb.Table('epi-analysis-stats')
+        return events(handler, lambda index: get(None))
+    return scenario
+
+
+def admin_users(sort):
+    def scenario(env, count):
+        handler = support.load_handler('admin/epi-admin-users-lambda-v2.py')
+        handler.cognito, handler.dynamodb = env.cognito, env.dynamodb.client()
+        handler.cache_table = env.dynamodb.Table('epi-analysis-stats')
+        env.analyses()
+        instrumented(handler)
+        pages = {'lastKey': None}
+
+        def invoke(index):
+            params = {'limit': '50', 'sort': sort}
+            if pages['lastKey']:
+                params['lastKey'] = pages['lastKey']
+            response = handler.lambda_handler(get(params), None)
+            pages['lastKey'] = json.loads(response['body']).get('lastKey') if response['statusCode'] == 200 else None
+            return response
+        return invoke
+    return scenario
+
+
+def user_history(params):
+    def scenario(env, count):
+        handler = support.load_handler('admin/epi-admin-user-history-lambda.py')
+        handler.dynamodb, handler.s3 = env.dynamodb.client(), env.s3
+        handler.table = env.history(env.ids[0])
+        instrumented(handler)
+        pages = {'lastKey': None}
+
+        def invoke(index):
+            query = {'userId': env.ids[0], 'limit': '25', **params}
+            if pages['lastKey']:
+                query['lastKey'] = pages['lastKey']
+            response = handler.lambda_handler(get(query), None)
+            pages['lastKey'] = json.loads(response['body']).get('lastKey') if response['statusCode'] == 200 else None
+            return response
+        return invoke
+    return scenario
+
+
+def admin_actions(env, count):
+    handler = support.load_handler('admin/epi-admin-actions-lambda-updated.py')
+    handler.cognito = env.cognito
+    handler.cache_table = handler.index_table = env.dynamodb.Table('epi-analysis-stats')
+    get_users(env.cognito, POOL_ID, handler.cache_table)
+    roles = ('supervisor', 'user')
+    return events(handler, lambda index: post({'action': 'change-role', 'username': env.ids[index % len(env.ids)],
+                                               'role': roles[index % 2]}))
+
+
+def supervisors(env, count):
+    handler = support.load_handler('notifications/epi-get-supervisors-lambda.py')
+    handler.cognito = env.cognito
+    handler.index_table = handler.cache_table = env.dynamodb.Table('epi-analysis-stats')
+    reconcile(env.cognito, POOL_ID, handler.index_table)
+    return events(handler, lambda index: get(None))
+
+
+def profile(method):
+    def scenario(env, count):
+        handler = support.load_handler('user/user-profile-lambda.py')
+        handler.table = env.dynamodb.Table('UserProfiles')
+        handler.table.load({'userId': user_id, 'firstName': 'Nombre', 'lastName': 'Apellido', 'phone': '+54 11 5555-0000'}
+                           for user_id in env.ids)
+        if method == 'GET':
+            return events(handler, lambda index: get({'userId': env.ids[index % len(env.ids)]}))
+        return events(handler, lambda index: post({'userId': env.ids[index % len(env.ids)], 'profileData': {
+            'firstName': f'Nombre{index}', 'lastName': 'Apellido', 'phone': '+54 11 5555-0000', 'birthDate': '1990-01-01'
+        }}))
+    return scenario
+
+
+def bedrock_summary(batch_size):
+    def scenario(env, count):
+        handler = support.load_handler('ai/bedrock-summary-lambda.py')
+        handler.bedrock = env.bedrock
+        handler.summary_cache = SummaryCache(None)
+        analyses = [{'analysisResults': support.analysis_data(env.rng, NOW_MS + index, 'ppe_detection'),
+                     'requiredEPPs': ['HEAD_COVER', 'HAND_COVER', 'FOOT_COVER']}
+                    for index in range(count * batch_size)]
+        if batch_size == 1:
+            return events(handler, lambda index: {'body': json.dumps(analyses[index])})
+        return events(handler, lambda index: {'body': json.dumps(
+            {'batch': analyses[index * batch_size:(index + 1) * batch_size]})})
+    return scenario
+
+
+SCENARIOS = {
+    'save-analysis': save_single,
+    'save-analysis (batch 100)': save_batch,
+    'delete-analysis': delete_single,
+    'delete-analysis (lote 100)': delete_bulk,
+    'epi-admin-stats': admin_stats('admin/epi-admin-stats-lambda-v2-updated.py'),
+    'epi-admin-stats (sin agregados)': admin_stats('admin/epi-admin-stats-lambda-v2-updated.py', stats=False),
+    'lambda_function (stats)': admin_stats('admin/lambda_function.py'),
+    'epi-admin-users (activity)': admin_users('activity'),
+    'epi-admin-users (email)': admin_users('email'),
+    'epi-admin-user-history (full)': user_history({}),
+    'epi-admin-user-history (summary)': user_history({'view': 'summary'}),
+    'epi-admin-user-history (type)': user_history({'view': 'summary', 'type': 'ppe_detection'}),
+    'epi-admin-actions (change-role)': admin_actions,
+    'epi-get-supervisors': supervisors,
+    'user-profile (GET)': profile('GET'),
+    'user-profile (POST)': profile('POST'),
+    'bedrock-summary': bedrock_summary(1),
+    'bedrock-summary (batch 10)': bedrock_summary(10),
+}
+
+
+def max_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS bytes
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+def percentile(values, p):
+    """Percentil por rango más cercano de values ordenados"""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def run_scenario(name, args):
+    """Corre un escenario en este proceso y devuelve sus métricas"""
+    env = Environment(args)
+    total = args.warmup + args.invocations
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        invoke = SCENARIOS[name](env, total)
+        for index in range(args.warmup):
+            invoke(index)
+        env.arm()
+        measured_from = output.tell()
+        rss_before = max_rss_mb()
+        latencies = []
+        errors = 0
+        for index in range(args.warmup, total):
+            began = time.perf_counter()
+            response = invoke(index)
+            latencies.append(time.perf_counter() - began)
+            if response['statusCode'] >= 500:
+                errors += 1
+    latencies.sort()
+    calls = {}
+    for service in env.services:
+        for operation, count in service.calls.items():
+            calls[operation] = calls.get(operation, 0) + count
+    lines = [json.loads(line) for line in output.getvalue()[measured_from:].splitlines() if line.startswith('{"')]
+    lines = [line for line in lines if '_aws' in line]
+    return {
+        'phases': {phase: round(statistics.median(line.get(f'{phase}Ms', 0.0) for line in lines), 3)
+                   for phase in PHASES} if lines else {},
+        'capacity': {unit: round(sum(line.get(f'Consumed{unit}', 0.0) for line in lines) / len(lines), 2)
+                     for unit in ('RCU', 'WCU')} if lines else {},
+        'p50': round(percentile(latencies, 50) * 1000, 3),
+        'p95': round(percentile(latencies, 95) * 1000, 3),
+        'p99': round(percentile(latencies, 99) * 1000, 3),
+        'rss': round(max_rss_mb(), 1),
+        'rssGrowth': round(max_rss_mb() - rss_before, 1),
+        'calls': {operation: round(count / args.invocations, 3) for operation, count in sorted(calls.items())},
+        'errors': errors,
+    }
+
+
+def run_child(name, args):
+    """Métricas del escenario en --repeat procesos nuevos: mediana de los percentiles, máximo del resto"""
+    runs = []
+    for _ in range(args.repeat):
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', name, *child_args(args)],
+                               capture_output=True, text=True, cwd=support.BENCH_DIR)
+        if child.returncode != 0:
+            raise SystemExit(f'{name}:\n{child.stderr}')
+        runs.append(json.loads(child.stdout.splitlines()[-1]))
+    result = max(runs, key=lambda run: sum(run['calls'].values()))
+    for key in ('p50', 'p95', 'p99'):
+        result[key] = statistics.median(run[key] for run in runs)
+    for key in ('rss', 'rssGrowth', 'errors'):
+        result[key] = max(run[key] for run in runs)
+    return result
+
+
+def child_args(args):
+    return ['--invocations', str(args.invocations), '--warmup', str(args.warmup), '--users', str(args.users),
+            '--analyses', str(args.analyses), '--history', str(args.history), '--latency', str(args.latency),
+            '--model-latency', str(args.model_latency), '--throttle-rate', str(args.throttle_rate),
+            '--seed', str(args.seed)]
+
+
+def settings(args):
+    return {key: getattr(args, key) for key in ('invocations', 'warmup', 'users', 'analyses', 'history', 'latency',
+                                                 'model_latency', 'throttle_rate', 'seed')}
+
+
+def compare(result, baseline, tolerance, min_delta):
+    """(cambio de p95, cambio de llamadas/invocación, regresiones) contra la línea base"""
+    if baseline is None:
+        return '-', '-', ['sin línea base']
+    problems = []
+    p95_change = result['p95'] / baseline['p95'] - 1 if baseline['p95'] else 0.0
+    # Los handlers de menos de un milisegundo varían más que tolerance entre corridas
+    if p95_change > tolerance and result['p95'] - baseline['p95'] > min_delta:
+        problems.append('p95')
+    # Margen absoluto: el crecimiento de RSS de escenarios chicos es ruido del allocator
+    if result['rssGrowth'] > baseline['rssGrowth'] * (1 + tolerance) + 5:
+        problems.append('RSS')
+    calls_change = sum(result['calls'].values()) - sum(baseline['calls'].values())
+    if any(count > baseline['calls'].get(operation, 0) + 0.01 for operation, count in result['calls'].items()):
+        problems.append('llamadas')
+    if result['errors'] > baseline['errors']:
+        problems.append('5xx')
+    return f'{p95_change:+.0%}', f'{calls_change:+.2f}', problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=list(SCENARIOS), metavar='ESCENARIO')
+    parser.add_argument('--invocations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--analyses', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0, help='latencia simulada de DynamoDB, Cognito y S3 (s)')
+    parser.add_argument('--model-latency', type=float, default=0.0, help='latencia simulada de invoke_model (s)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fracción de llamadas a AWS rechazadas por throttling')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='procesos por escenario (mediana de los percentiles)')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='aumento de p95 y RSS tolerado contra la línea base')
+    parser.add_argument('--min-delta', type=float, default=1.0, help='aumento de p95 (ms) por debajo del cual no hay regresión')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--no-compare', action='store_true')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_scenario(args.run, args)))
+        return
+
+    baseline = None
+    if not args.save_baseline and not args.no_compare:
+        if not os.path.exists(args.baseline):
+            raise SystemExit(f'No existe {args.baseline}: generarla con --save-baseline')
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['settings'] != settings(args):
+            print(f'Aviso: la línea base se generó con {baseline["settings"]}\n')
+
+    results = {}
+    rows = []
+    regressions = []
+    for name in args.only or SCENARIOS:
+        result = results[name] = run_child(name, args)
+        row = [name, f'{result["p50"]:.2f}', f'{result["p95"]:.2f}', f'{result["p99"]:.2f}', f'{result["rss"]:.0f}',
+               f'{result["rssGrowth"]:.1f}', f'{sum(result["calls"].values()):.2f}', result['errors']]
+        if baseline is not None:
+            p95_change, calls_change, problems = compare(result, baseline['scenarios'].get(name), args.tolerance,
+                                                          args.min_delta)
+            row += [p95_change, calls_change, ', '.join(problems) or 'ok']
+            if problems:
+                regressions.append(name)
+        rows.append(row)
+
+    print(f'{args.invocations} invocaciones por escenario, {args.users} usuarios, {args.analyses:,} análisis, '
+          f'AWS {args.latency * 1000:.0f} ms, modelo {args.model_latency * 1000:.0f} ms, '
+          f'throttling {args.throttle_rate:.0%}\n')
+    headers = ['escenario', 'p50 ms', 'p95 ms', 'p99 ms', 'RSS pico MB', 'Δ RSS MB', 'llamadas AWS', '5xx']
+    if baseline is not None:
+        headers += ['Δ p95', 'Δ llamadas', 'estado']
+    support.print_table(headers, rows)
+
+    print()
+    for name, result in results.items():
+        print(f'{name}: ' + ', '.join(f'{operation} {count:g}' for operation, count in result['calls'].items()))
+
+    print('\nFases (mediana en ms por invocación) y capacidad consumida por invocación:\n')
+    support.print_table(['escenario', *PHASES, 'RCU', 'WCU'], [
+        [name, *(f'{result["phases"].get(phase, 0.0):.2f}' for phase in PHASES),
+         *(f'{result["capacity"].get(unit, 0.0):g}' for unit in ('RCU', 'WCU'))]
+        for name, result in results.items()
+    ])
+
+    if args.save_baseline:
+        if args.only and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                results = {**json.load(f)['scenarios'], **results}
+        with open(args.baseline, 'w') as f:
+            json.dump({'settings': settings(args), 'scenarios': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nLínea base guardada en {args.baseline}')
+    if regressions:
+        raise SystemExit(f'\nRegresiones contra la línea base: {", ".join(regressions)}')
+
+
+if __name__ == '__main__':
+    main()
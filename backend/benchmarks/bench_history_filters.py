@@ -0,0 +1,124 @@
+"""Benchmark de los filtros from/to y type de epi-admin-user-history.
+
+Un usuario con --items análisis repartidos en --days días. Para cada escenario
+(una semana reciente de EPP, una semana de hace --offset-days días de EPP, y un
+tipo poco frecuente en todo el historial) compara:
+- cliente: páginas newest-first sin filtros, filtrando en el cliente y cortando
+  al pasar 'from' (lo único posible antes)
+- rango + FilterExpression: from/to en la KeyConditionExpression y el tipo como
+  filtro sobre la partición (TYPE_INDEX vacío)
+- índice por tipo: rango y tipo en la sort key typeTs del GSI
+
+Las variantes del servidor se miden con view=full y view=summary (el listado
+del panel). Reporta queries, RCU y tiempo para traer todos los análisis del
+escenario y verifica que todas las variantes devuelvan los mismos.
+
+    python bench_history_filters.py --items 50000 --days 365 --page 100 --latency 0.003
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+import support
+from analysis_codec import build_item
+from decimal_json import loads
+from fakes import FakeDynamoDB
+
+USER_ID = 'bench-user'
+NOW_MS = 1735689600000
+
+
+def analyses(count, days, seed=0):
+    rng = random.Random(seed)
+    weights = (0.55, 0.2, 0.1, 0.1, 0.05)
+    timestamps = sorted(rng.sample(range(NOW_MS - days * support.DAY_MS, NOW_MS), count))
+    for timestamp in timestamps:
+        detection_type = rng.choices(support.DETECTION_TYPES, weights)[0]
+        yield loads(json.dumps(support.analysis_data(rng, timestamp, detection_type)))
+
+
+def fetch(handler, params):
+    """Todas las páginas de una consulta; devuelve los timestamps"""
+    params = {'userId': USER_ID, **params}
+    timestamps = []
+    while True:
+        body = json.loads(handler.lambda_handler({'queryStringParameters': dict(params)}, None)['body'])
+        timestamps.extend(int(row['timestamp']) for row in body['history'])
+        if 'lastKey' not in body:
+            return timestamps
+        params['lastKey'] = body['lastKey']
+
+
+def client_side(handler, page, start, end, detection_type):
+    params = {'userId': USER_ID, 'limit': str(page)}
+    timestamps = []
+    while True:
+        body = json.loads(handler.lambda_handler({'queryStringParameters': dict(params)}, None)['body'])
+        for row in body['history']:
+            timestamp = int(row['timestamp'])
+            if start <= timestamp <= end and row['DetectionType'] == detection_type:
+                timestamps.append(timestamp)
+        if 'lastKey' not in body or (body['history'] and int(body['history'][-1]['timestamp']) < start):
+            return timestamps
+        params['lastKey'] = body['lastKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--offset-days', type=int, default=180)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.003, help='latencia simulada por llamada a DynamoDB (s)')
+    args = parser.parse_args()
+
+    handler = support.load_handler('admin/epi-admin-user-history-lambda.py')
+    dynamodb = FakeDynamoDB(latency=args.latency)
+    handler.dynamodb = dynamodb.client()
+    handler.table = dynamodb.Table('epi-user-analysis')
+    handler.table.load(build_item(USER_ID, int(data['timestamp']), data) for data in analyses(args.items, args.days))
+    type_index = handler.TYPE_INDEX
+    # El stand-in arma la vista de cada GSI en la primera query; que no cuente en la medición
+    for index in (type_index, handler.SUMMARY_INDEX):
+        handler.table._index_entries(index)
+
+    week = 7 * support.DAY_MS
+    past = NOW_MS - args.offset_days * support.DAY_MS
+    scenarios = (
+        ('última semana, EPP', NOW_MS - week, NOW_MS, 'ppe_detection'),
+        (f'semana de hace {args.offset_days} días, EPP', past - week, past, 'ppe_detection'),
+        ('todo el historial, text_detection', 0, NOW_MS, 'text_detection'),
+    )
+    rows = []
+    for label, start, end, detection_type in scenarios:
+        filters = {'from': str(start), 'to': str(end), 'type': detection_type, 'limit': str(args.page)}
+        variants = [('cliente', '', lambda: client_side(handler, args.page, start, end, detection_type))]
+        for view in ('full', 'summary'):
+            params = {**filters, 'view': view}
+            variants.append((f'rango + FilterExpression ({view})', '', lambda params=params: fetch(handler, params)))
+            variants.append((f'índice por tipo ({view})', type_index, lambda params=params: fetch(handler, params)))
+        expected = None
+        for name, index, function in variants:
+            handler.TYPE_INDEX = index
+            dynamodb.calls.clear()
+            handler.table.consumed_rcu = 0.0
+            began = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = function()
+            elapsed = time.perf_counter() - began
+            if expected is None:
+                expected = sorted(result)
+            elif sorted(result) != expected:
+                raise SystemExit(f'{label} / {name}: resultados distintos al filtrado en el cliente')
+            rows.append([label, name, len(result), dynamodb.calls['Query'], dynamodb.calls['BatchGetItem'],
+                         f'{handler.table.consumed_rcu:,.0f}', f'{elapsed * 1000:,.0f}'])
+
+    print(f'{args.items:,} análisis en {args.days} días, páginas de {args.page}, DynamoDB {args.latency * 1000:.0f} ms\n')
+    support.print_table(['escenario', 'variante', 'análisis', 'Query', 'BatchGetItem', 'RCU', 'ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
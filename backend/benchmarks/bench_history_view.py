@@ -0,0 +1,100 @@
+"""Benchmark de view=summary en epi-admin-user-history.
+
+Para usuarios con --histories análisis (EPP de 1 a --max-persons personas y
+otros tipos), en formato original y compacto, recorre el historial completo
+página a página con view=full, view=summary sobre el GSI de resumen y
+view=summary con ProjectionExpression sobre la tabla (SUMMARY_INDEX vacío), y
+reporta RCU, KB y latencia por página, y el tamaño medio de cada item en la
+tabla y en el GSI de resumen (lo que cada guardado vuelve a escribir en el
+índice). Verifica que cada fila del resumen coincida con los campos del
+análisis completo.
+
+    python bench_history_view.py --histories 1000 5000 --page 25 --latency 0.005
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import support
+from analysis_codec import SUMMARY_FIELDS, SUMMARY_INDEX_ATTRIBUTES, build_item
+from decimal_json import loads
+from fakes import FakeDynamoDB, item_size
+
+USER_ID = 'bench-user'
+
+
+def analyses(count, max_persons, seed=0):
+    rng = random.Random(seed)
+    result = []
+    for index in range(count):
+        detection_type = 'ppe_detection' if rng.random() < 0.7 else rng.choice(support.DETECTION_TYPES)
+        persons = rng.randint(1, max_persons) if detection_type == 'ppe_detection' else None
+        data = support.analysis_data(rng, 1700000000000 + index * 1000, detection_type, persons=persons)
+        result.append(loads(json.dumps(data)))
+    return result
+
+
+def read_all(handler, page, view):
+    """(filas, RCU, KB por página, ms por página) del historial completo"""
+    rows, sizes, latencies = [], [], []
+    params = {'userId': USER_ID, 'limit': str(page), 'view': view}
+    handler.table.consumed_rcu = 0.0
+    while True:
+        start = time.perf_counter()
+        response = handler.lambda_handler({'queryStringParameters': dict(params)}, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(response['body']) / 1024)
+        body = json.loads(response['body'])
+        rows.extend(body['history'])
+        if 'lastKey' not in body:
+            return rows, handler.table.consumed_rcu, statistics.median(sizes), statistics.median(latencies)
+        params['lastKey'] = body['lastKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--histories', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--max-persons', type=int, default=20)
+    parser.add_argument('--page', type=int, default=25)
+    parser.add_argument('--latency', type=float, default=0.005, help='latencia simulada por llamada a DynamoDB (s)')
+    args = parser.parse_args()
+
+    handler = support.load_handler('admin/epi-admin-user-history-lambda.py')
+    variants = (
+        ('full', 'full', handler.SUMMARY_INDEX),
+        ('summary (GSI)', 'summary', handler.SUMMARY_INDEX),
+        ('summary (proyección)', 'summary', ''),
+    )
+    rows = []
+    for count in args.histories:
+        data = analyses(count, args.max_persons)
+        for storage, compact in (('original', False), ('compacto', True)):
+            dynamodb = FakeDynamoDB(latency=args.latency)
+            handler.table = dynamodb.Table('epi-user-analysis')
+            items = [build_item(USER_ID, int(d['timestamp']), d, compact) for d in data]
+            handler.table.load(items)
+            item_kb = statistics.mean(item_size(item) for item in items) / 1024
+            index_kb = statistics.mean(item_size({key: item[key] for key in ('userId', 'timestamp', *SUMMARY_INDEX_ATTRIBUTES)
+                                                  if key in item}) for item in items) / 1024
+            full = None
+            for label, view, index in variants:
+                handler.SUMMARY_INDEX = index
+                history, rcu, page_kb, page_ms = read_all(handler, args.page, view)
+                if full is None:
+                    full = history
+                elif len(history) != len(full) or any(
+                        {key: row[key] for key in SUMMARY_FIELDS if key in row} != {key: value for key, value in summary.items() if key != 'compliance'}
+                        for row, summary in zip(full, history)):
+                    raise SystemExit(f'{label}: el resumen no coincide con el análisis completo')
+                rows.append([count, storage, label, f'{rcu:,.0f}', f'{page_kb:.1f}', f'{page_ms:.0f}',
+                             f'{item_kb:.2f}', f'{index_kb:.2f}'])
+
+    print(f'Páginas de {args.page}, DynamoDB {args.latency * 1000:.0f} ms por llamada\n')
+    support.print_table(['análisis', 'formato', 'vista', 'RCU total', 'KB página', 'ms página', 'KB item',
+                         'KB item en GSI'], rows)
+
+
+if __name__ == '__main__':
+    main()
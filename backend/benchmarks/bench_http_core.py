@@ -0,0 +1,149 @@
+"""Benchmark del núcleo de request/response (http_api.Router) contra el handler a mano.
+
+La réplica a mano hace lo que repetían los handlers antes de http_api.py:
+imprime el evento completo (json.dumps(event, default=str)), arma los headers
+CORS por request, decodifica el body con json.loads + floats_to_decimal y
+serializa con json.dumps(default=decimal_default). El router decodifica el
+body una sola vez, serializa con el encoder compartido y registra por
+muestreo (--sample-rate, LOG_SAMPLE_RATE en las Lambdas) un resumen acotado
+e imprime la línea de métricas de metrics.py (METRICS_ENABLED=0 la omite).
+
+Casos: preflight OPTIONS, GET chico (perfil), POST con un análisis PPE grande
+(save-analysis) y GET con una página de historial llena de Decimal. Reporta
+µs por request y caracteres escritos al log por request (se descartan). Verifica que
+ambas variantes respondan el mismo status y el mismo JSON.
+
+Lo medido con los valores de abajo: OPTIONS ~8x y el POST grande ~3.3x más
+rápidos; el GET chico del perfil queda a la par o algo más lento (~0.9x),
+porque la línea de métricas que el router imprime en cada invocación cuesta
+lo mismo que lo que ahorra, y la página de historial también queda a la par
+(domina la serialización de los Decimal). En los GET chicos la ganancia es el
+log acotado, no la latencia.
+
+    python bench_http_core.py --persons 200 --page 100 --repeat 500
+"""
+import argparse
+import contextlib
+import json
+import random
+import time
+from decimal import Decimal
+
+import support
+import metrics
+from decimal_json import floats_to_decimal, loads
+from http_api import Router
+
+HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
+}
+
+
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+def legacy_handler(handle):
+    """lambda_handler escrito a mano como en los handlers originales"""
+    def lambda_handler(event, context):
+        print(f"Event received: {json.dumps(event, default=str)}")
+        headers = dict(HEADERS)
+        if event.get('httpMethod') == 'OPTIONS':
+            return {'statusCode': 200, 'headers': headers, 'body': ''}
+        try:
+            body = event.get('body')
+            body = floats_to_decimal(json.loads(body)) if body else {}
+            result = handle(event.get('queryStringParameters') or {}, body)
+            return {'statusCode': 200, 'headers': headers, 'body': json.dumps(result, default=decimal_default)}
+        except Exception as e:
+            print(f'Error: {str(e)}')
+            return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': str(e)})}
+    return lambda_handler
+
+
+def router_handler(handle):
+    router = Router()
+
+    @router.route('GET', 'POST')
+    def dispatch(request):
+        return handle(request.params, request.body if request.event.get('body') else {})
+
+    return router
+
+
+def cases(persons, page):
+    rng = random.Random(0)
+    profile = {'userId': 'user', 'firstName': 'Ana', 'lastName': 'Pérez', 'city': 'Rosario'}
+    analysis = support.analysis_data(rng, 1700000000000, 'ppe_detection', persons=persons)
+    history = [loads(json.dumps(support.analysis_data(rng, 1700000000000 - index * support.DAY_MS, 'ppe_detection')))
+               for index in range(page)]
+    event = {'path': '/api', 'headers': {'Content-Type': 'application/json'},
+             'requestContext': {'identity': {'sourceIp': '10.0.0.1'}}}
+    return [
+        ('OPTIONS', {**event, 'httpMethod': 'OPTIONS'}, lambda params, body: None),
+        ('GET perfil', {**event, 'httpMethod': 'GET', 'queryStringParameters': {'userId': 'user'}},
+         lambda params, body: {'profile': profile}),
+        (f'POST análisis ({persons} personas)', {**event, 'httpMethod': 'POST', 'body': json.dumps({'userId': 'user', 'analysisData': analysis})},
+         lambda params, body: {'success': True, 'status': 'saved', 'timestamp': body['analysisData']['timestamp']}),
+        (f'GET historial ({page} análisis)', {**event, 'httpMethod': 'GET', 'queryStringParameters': {'userId': 'user'}},
+         lambda params, body: {'history': history, 'count': len(history), 'view': 'full'}),
+    ]
+
+
+class LogSink:
+    """stdout descartado que cuenta los caracteres escritos"""
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, text):
+        self.written += len(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def run(handler, event, repeat):
+    log = LogSink()
+    with contextlib.redirect_stdout(log):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            response = handler(event, None)
+        elapsed = (time.perf_counter() - started) / repeat
+    return response, elapsed, log.written / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--persons', type=int, default=200, help='personas del análisis PPE del POST')
+    parser.add_argument('--page', type=int, default=100, help='análisis en la página de historial')
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--sample-rate', type=float, default=metrics.LOG_SAMPLE_RATE)
+    args = parser.parse_args()
+    metrics.LOG_SAMPLE_RATE = args.sample_rate
+    random.seed(0)
+
+    rows = []
+    for label, event, handle in cases(args.persons, args.page):
+        body_kb = len(event.get('body') or '') / 1024
+        legacy, legacy_s, legacy_log = run(legacy_handler(handle), event, args.repeat)
+        routed, routed_s, routed_log = run(router_handler(handle), event, args.repeat)
+        if legacy['statusCode'] != routed['statusCode'] or \
+                (legacy['body'] and json.loads(legacy['body']) != json.loads(routed['body'])):
+            raise SystemExit(f'{label}: respuestas distintas')
+        rows.append([label, f'{body_kb:.0f}', f'{len(routed["body"]) / 1024:.0f}',
+                     f'{legacy_s * 1e6:,.0f}', f'{routed_s * 1e6:,.0f}', f'{legacy_s / routed_s:.1f}x',
+                     f'{legacy_log:,.0f}', f'{routed_log:,.0f}'])
+
+    print(f'{args.repeat} requests por caso, log muestreado al {args.sample_rate:.0%}\n')
+    support.print_table(['caso', 'body KB', 'respuesta KB', 'a mano µs', 'router µs', 'mejora',
+                         'log a mano', 'log router'], rows)
+
+
+if __name__ == '__main__':
+    main()
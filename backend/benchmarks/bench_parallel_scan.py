@@ -0,0 +1,65 @@
+"""Benchmark de parallel_scan contra el stand-in de DynamoDB.
+
+Compara tiempo y pico de memoria del scan secuencial original (lista completa
+de items) con parallel_scan en streaming y proyección para 1, 4 y 16 segmentos.
+
+    python bench_parallel_scan.py --items 20000 --latency 0.1
+"""
+import argparse
+
+import support
+from fakes import FakeDynamoDB
+from parallel_scan import ANALYSIS_SUMMARY_ATTRIBUTES, parallel_scan
+
+
+def legacy_scan(table):
+    response = table.scan()
+    items = response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+        items.extend(response.get('Items', []))
+    return len(items)
+
+
+def streaming_scan(dynamodb, segments):
+    counts = {}
+
+    def consume(items):
+        for item in items:
+            counts[item['userId']] = counts.get(item['userId'], 0) + 1
+
+    return parallel_scan(dynamodb, 'epi-user-analysis', consume, total_segments=segments, attributes=ANALYSIS_SUMMARY_ATTRIBUTES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.1, help='latencia simulada por llamada (s)')
+    args = parser.parse_args()
+
+    dynamodb = FakeDynamoDB(latency=args.latency)
+    table = dynamodb.Table('epi-user-analysis')
+    table.load(support.analysis_items(args.items, as_decimal=True))
+
+    rows = []
+    for label, run in [
+        ('scan secuencial (items completos)', lambda: legacy_scan(table)),
+        ('parallel_scan 1 segmento', lambda: streaming_scan(dynamodb.client(), 1)),
+        ('parallel_scan 4 segmentos', lambda: streaming_scan(dynamodb.client(), 4)),
+        ('parallel_scan 16 segmentos', lambda: streaming_scan(dynamodb.client(), 16)),
+    ]:
+        calls_before = dynamodb.calls['Scan']
+        rcu_before = table.consumed_rcu
+        count, elapsed, peak = support.measure(run)
+        # measure ejecuta dos veces: llamadas y RCU corresponden a una sola
+        rows.append([
+            label, count, f'{elapsed:.2f}', f'{peak:.1f}',
+            (dynamodb.calls['Scan'] - calls_before) // 2, f'{(table.consumed_rcu - rcu_before) / 2:.0f}'
+        ])
+
+    print(f'{args.items} items, latencia {args.latency * 1000:.0f} ms por llamada\n')
+    support.print_table(['variante', 'items', 'segundos', 'pico MB', 'llamadas', 'RCU'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark de la caché de perfiles de user-profile (profile_cache.py).
+
+Simula el frontend: --requests requests a --rps por segundo (reloj simulado,
+así el TTL vence como en producción) de --users usuarios con acceso sesgado
+(pocos usuarios activos concentran los GET), de los cuales --post-share son
+POST que cambian el perfil. Cada request cae en uno de --containers
+contenedores al azar, cada uno con su propia caché y todos sobre la misma
+tabla UserProfiles (stand-in con --latency). Los navegadores guardan el último
+ETag y --revalidate-share de los GET lo mandan en If-None-Match.
+
+Por cada contenedores x TTL (0 = sin caché) reporta la tasa de aciertos,
+get_item por GET, respuestas 304, KB de respuesta, p50/p95 del GET y las
+respuestas desactualizadas: perfiles (o 304) que no reflejan un POST atendido
+por otro contenedor dentro del TTL.
+
+    python bench_profile_cache.py --requests 3000 --containers 1 4 --ttls 0 30 60 300
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+import support
+import profile_cache
+from fakes import FakeDynamoDB
+from metrics import instrument
+from profile_cache import ProfileCache, profile_etag
+
+
+class Clock:
+    """time.time() simulado para los vencimientos de la caché"""
+
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def time(self):
+        return self.now
+
+
+def profile_body(user_id, version):
+    return json.dumps({'userId': user_id, 'profileData': {
+        'firstName': f'Nombre{version}', 'lastName': 'Apellido', 'phone': '+54 11 5555-0000', 'birthDate': '1990-01-01',
+        'country': 'Argentina', 'city': 'Rosario'}})
+
+
+def simulate(args, containers, ttl, clock):
+    rng = random.Random(args.seed)
+    dynamodb = FakeDynamoDB(latency=args.latency, seed=args.seed)
+    table = dynamodb.Table('UserProfiles')
+    ids = support.user_ids(args.users, args.seed)
+    handlers = []
+    for index in range(containers):
+        handler = support.load_handler('user/user-profile-lambda.py', f'user_profile_{index}')
+        handler.table = instrument(table, 'dynamodb')
+        handler.profiles = ProfileCache(ttl=ttl, max_entries=args.size if ttl else 0)
+        handlers.append(handler)
+
+    # Perfil inicial de todos los usuarios (sin latencia ni contadores)
+    current = {}
+    for user_id in ids:
+        item = {'userId': user_id, 'firstName': 'Nombre0', 'lastName': 'Apellido'}
+        table.load([item])
+        current[user_id] = profile_etag(item)
+    versions = dict.fromkeys(ids, 0)
+    browser = {}
+
+    latencies = []
+    counts = {'get': 0, 'post': 0, 'notModified': 0, 'stale': 0, 'bytes': 0}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.requests):
+            clock.now += 1 / args.rps
+            user_id = ids[int(len(ids) * rng.random() ** 3)]
+            handler = rng.choice(handlers)
+            if rng.random() < args.post_share:
+                versions[user_id] += 1
+                response = handler.lambda_handler({'httpMethod': 'POST', 'body': profile_body(user_id, versions[user_id])}, None)
+                current[user_id] = browser[user_id] = response['headers']['ETag']
+                counts['post'] += 1
+                continue
+            event = {'httpMethod': 'GET', 'queryStringParameters': {'userId': user_id}}
+            if user_id in browser and rng.random() < args.revalidate_share:
+                event['headers'] = {'If-None-Match': browser[user_id]}
+            started = time.perf_counter()
+            response = handler.lambda_handler(event, None)
+            latencies.append(time.perf_counter() - started)
+            etag = response['headers']['ETag']
+            counts['get'] += 1
+            counts['bytes'] += len(response['body'])
+            if response['statusCode'] == 304:
+                counts['notModified'] += 1
+            browser[user_id] = etag
+            if etag != current[user_id]:
+                counts['stale'] += 1
+
+    latencies.sort()
+    hits = sum(handler.profiles.stats['hits'] for handler in handlers)
+    misses = sum(handler.profiles.stats['misses'] for handler in handlers)
+    return {
+        'hitRate': hits / (hits + misses) if hits + misses else 0.0,
+        'getItem': dynamodb.calls['GetItem'] / counts['get'],
+        'notModified': counts['notModified'] / counts['get'],
+        'kb': counts['bytes'] / 1024,
+        'p50': latencies[len(latencies) // 2],
+        'p95': latencies[int(len(latencies) * 0.95)],
+        'stale': counts['stale'] / counts['get'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--rps', type=float, default=20.0, help='requests por segundo simulado')
+    parser.add_argument('--post-share', type=float, default=0.02)
+    parser.add_argument('--revalidate-share', type=float, default=0.7, help='GET con If-None-Match si el navegador tiene ETag')
+    parser.add_argument('--containers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--ttls', type=int, nargs='+', default=[0, 30, 60, 300], help='segundos; 0 = sin caché')
+    parser.add_argument('--size', type=int, default=1024, help='entradas por contenedor')
+    parser.add_argument('--latency', type=float, default=0.002, help='latencia simulada de get_item/put_item (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    clock = Clock()
+    profile_cache.time = clock
+    rows = []
+    for containers in args.containers:
+        for ttl in args.ttls:
+            result = simulate(args, containers, ttl, clock)
+            rows.append([containers, ttl or 'sin caché', f'{result["hitRate"]:.0%}', f'{result["getItem"]:.2f}',
+                         f'{result["notModified"]:.0%}', f'{result["kb"]:,.0f}', f'{result["p50"] * 1e6:,.0f}',
+                         f'{result["p95"] * 1e6:,.0f}', f'{result["stale"]:.2%}'])
+
+    print(f'{args.requests} requests de {args.users} usuarios a {args.rps:g}/s, POST {args.post_share:.0%}, '
+          f'If-None-Match {args.revalidate_share:.0%}, get_item {args.latency * 1000:.0f} ms\n')
+    support.print_table(['contenedores', 'TTL s', 'aciertos', 'get_item/GET', '304', 'respuesta KB',
+                         'GET p50 µs', 'GET p95 µs', 'desactualizadas'], rows)
+
+
+if __name__ == '__main__':
+    main()
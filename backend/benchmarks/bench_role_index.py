@@ -0,0 +1,65 @@
+"""Benchmark de búsqueda de supervisores: recorrido del user pool vs índice de roles.
+
+El recorrido original pagina list_users de a 60 usuarios y filtra custom:role en
+Python; el índice responde con una query por rol. Latencia simulada por llamada
+a Cognito y a DynamoDB. Verifica que ambas variantes encuentren la misma
+cantidad de supervisores y admins.
+
+    python bench_role_index.py --pool-sizes 100 10000 100000 --latency 0.005
+"""
+import argparse
+
+import support
+from fakes import FakeCognito, FakeDynamoDB
+from role_index import reconcile, users_with_roles
+
+POOL_ID = 'us-east-1_bench'
+
+
+def walk_pool(cognito):
+    """Réplica del handler original (paginator + filtro por rol)"""
+    supervisors = []
+    token = None
+    while True:
+        params = {'UserPoolId': POOL_ID, 'Limit': 60}
+        if token:
+            params['PaginationToken'] = token
+        response = cognito.list_users(**params)
+        for user in response['Users']:
+            attributes = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
+            if attributes.get('custom:role', 'user') in ['supervisor', 'admin']:
+                supervisors.append(user['Username'])
+        token = response.get('PaginationToken')
+        if not token:
+            return len(supervisors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--latency', type=float, default=0.005, help='latencia simulada por llamada (s)')
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.pool_sizes:
+        cognito = FakeCognito(support.cognito_users(size), latency=args.latency)
+        dynamodb = FakeDynamoDB(latency=args.latency)
+        table = dynamodb.Table('epi-analysis-stats')
+        reconcile(cognito, POOL_ID, table)
+        cognito.calls.clear()
+        dynamodb.calls.clear()
+
+        walked, elapsed, peak = support.measure(walk_pool, cognito)
+        rows.append([size, 'recorrido list_users', walked, f'{elapsed * 1000:.0f}', f'{peak:.2f}', cognito.calls['ListUsers'] // 2])
+
+        indexed, elapsed, peak = support.measure(lambda: len(users_with_roles(table, ['supervisor', 'admin'])))
+        rows.append([size, 'índice de roles', indexed, f'{elapsed * 1000:.0f}', f'{peak:.2f}', dynamodb.calls['Query'] // 2])
+        if indexed != walked:
+            raise SystemExit(f'{size} usuarios: el índice devuelve {indexed} supervisores y el recorrido {walked}')
+
+    print(f'latencia {args.latency * 1000:.0f} ms por llamada\n')
+    support.print_table(['usuarios', 'variante', 'encontrados', 'ms', 'pico MB', 'llamadas'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Benchmark de save-analysis bajo tormentas de reintentos (idempotencia).
+
+Simula --analyses guardados de clientes móviles: cada request se reintenta con
+probabilidad --retry-rate hasta --max-retries veces con el mismo body (la
+respuesta se perdió), y los análisis EPP se vuelven a guardar con aiSummary
+como hace el frontend. Los intentos llegan a --containers contenedores de la
+Lambda (el reintento vuelve al mismo con probabilidad --sticky). Compara:
+- put ciego: réplica del handler anterior (put_item y agregados en cada intento)
+- condicional: put_item condicional sin caché en el contenedor
+- condicional + caché: con DedupeCache (lo desplegado)
+
+Repite lo mismo en modo batch (lotes de --batch-size frames de realtime_epp).
+Reporta PutItem/BatchWriteItem, WCU, objetos subidos a S3 y el total de los
+agregados, y verifica que las variantes idempotentes cuenten cada análisis una
+sola vez.
+
+    python bench_save_retries.py --analyses 2000 --retry-rate 0.3 --max-retries 5 --containers 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+import support
+from analysis_codec import build_item
+from batch_write import batch_write
+from decimal_json import loads
+from fakes import FakeDynamoDB, FakeS3
+from idempotency import DedupeCache
+from stats_store import detection_type_of, record_analyses, record_analysis
+
+USER_ID = 'mobile-user'
+SAVE_MODULE = 'analysis/save-analysis-lambda.py'
+
+
+def requests_single(count, seed=0):
+    """Bodies de guardado en orden: el análisis y, en los EPP, la actualización con aiSummary"""
+    rng = random.Random(seed)
+    bodies = []
+    for index in range(count):
+        detection_type = 'ppe_detection' if rng.random() < 0.6 else rng.choice(support.DETECTION_TYPES)
+        data = support.analysis_data(rng, 1700000000000 + index * 1000, detection_type, persons=rng.randint(1, 8))
+        bodies.append({'userId': USER_ID, 'analysisData': data})
+        if detection_type == 'ppe_detection':
+            bodies.append({'userId': USER_ID, 'analysisData': {**data, 'aiSummary': 'Resumen ' * 40}})
+    return bodies
+
+
+def requests_batch(count, size, seed=0):
+    rng = random.Random(seed)
+    frames = [support.analysis_data(rng, 1710000000000 + index * 200, 'realtime_epp', persons=1) for index in range(count)]
+    return [{'userId': USER_ID, 'analyses': frames[start:start + size]} for start in range(0, count, size)]
+
+
+def attempts(bodies, args, seed=1):
+    """(contenedor, body) de cada intento, con los reintentos de la tormenta"""
+    rng = random.Random(seed)
+    result = []
+    for body in bodies:
+        container = rng.randrange(args.containers)
+        retries = rng.randint(1, args.max_retries) if rng.random() < args.retry_rate else 0
+        for _ in range(1 + retries):
+            result.append((container, body))
+            if rng.random() >= args.sticky:
+                container = rng.randrange(args.containers)
+    return result
+
+
+def blind_save(dynamodb, s3, body):
+    """Réplica del handler anterior: put_item / BatchWriteItem y agregados sin condiciones"""
+    table = dynamodb.Table('epi-user-analysis')
+    stats_table = dynamodb.Table('epi-analysis-stats')
+    if 'analyses' in body:
+        items = [build_item(USER_ID, int(data['timestamp']), data, s3=s3) for data in body['analyses']]
+        batch_write(dynamodb.client(), 'epi-user-analysis', [{'PutRequest': {'Item': item}} for item in items], ('userId', 'timestamp'))
+        record_analyses(stats_table, [(USER_ID, item['timestamp'], detection_type_of(item['analysisData'])) for item in items])
+        return
+    data = body['analysisData']
+    table.put_item(Item=build_item(USER_ID, int(data['timestamp']), data, s3=s3))
+    record_analysis(stats_table, USER_ID, int(data['timestamp']), detection_type_of(data))
+
+
+def run(variant, plan, handlers, latency):
+    dynamodb = FakeDynamoDB(latency=latency)
+    s3 = FakeS3(latency=latency)
+    for handler in handlers:
+        handler.dynamodb = dynamodb.client()
+        handler.table = dynamodb.Table('epi-user-analysis')
+        handler.stats_table = dynamodb.Table('epi-analysis-stats')
+        handler.s3 = s3
+        # Sin caché: las entradas vencen al guardarse
+        handler.recent = DedupeCache(ttl=0 if variant == 'condicional' else 300)
+    began = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for container, body in plan:
+            if variant == 'put ciego':
+                blind_save(dynamodb, s3, loads(json.dumps(body)))
+                continue
+            response = handlers[container].lambda_handler({'body': json.dumps(body)}, None)
+            if response['statusCode'] != 200:
+                raise SystemExit(f'{variant}: {response["body"]}')
+    elapsed = time.perf_counter() - began
+    table = dynamodb.Table('epi-user-analysis')
+    totals = dynamodb.Table('epi-analysis-stats').get_item(Key={'pk': 'GLOBAL', 'sk': 'TOTAL'}).get('Item', {})
+    hits = sum(handler.recent.hits for handler in handlers) if variant != 'put ciego' else 0
+    return table.item_count(), int(totals.get('total', 0)), [
+        dynamodb.calls['PutItem'], dynamodb.calls['BatchWriteItem'], dynamodb.calls['BatchGetItem'],
+        f'{table.consumed_wcu:,.0f}', s3.calls['PutObject'], hits, f'{elapsed:.2f}'
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--analyses', type=int, default=2000)
+    parser.add_argument('--retry-rate', type=float, default=0.3)
+    parser.add_argument('--max-retries', type=int, default=5)
+    parser.add_argument('--containers', type=int, default=4)
+    parser.add_argument('--sticky', type=float, default=0.7, help='probabilidad de que el reintento caiga en el mismo contenedor')
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help='latencia simulada por llamada a DynamoDB y S3 (s)')
+    args = parser.parse_args()
+
+    handlers = [support.load_handler(SAVE_MODULE, f'save_analysis_{index}') for index in range(args.containers)]
+    scenarios = (
+        ('individual', requests_single(args.analyses)),
+        ('batch', requests_batch(args.frames, args.batch_size)),
+    )
+    rows = []
+    for mode, bodies in scenarios:
+        plan = attempts(bodies, args)
+        for variant in ('put ciego', 'condicional', 'condicional + caché'):
+            stored, total, metrics = run(variant, plan, handlers, args.latency)
+            if variant != 'put ciego' and total != stored:
+                raise SystemExit(f'{mode} / {variant}: agregados {total} para {stored} análisis guardados')
+            rows.append([mode, variant, len(plan), stored, total, *metrics])
+
+    print(f'{args.containers} contenedores, reintentos en {args.retry_rate:.0%} de los requests (hasta {args.max_retries})\n')
+    support.print_table(['modo', 'variante', 'intentos', 'guardados', 'total stats', 'PutItem', 'BatchWriteItem',
+                         'BatchGetItem', 'WCU', 'S3 PutObject', 'aciertos caché', 'segundos'], rows)
+
+
+if __name__ == '__main__':
+    main()
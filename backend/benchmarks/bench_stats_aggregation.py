@@ -0,0 +1,109 @@
+"""Benchmark de la agregación de estadísticas: lista completa vs streaming.
+
+La variante original acumula todos los items (con analysisData completo) y los
+recorre dos veces usando datetime por item; StatsAccumulator consume páginas
+proyectadas en una sola pasada. Se mide pico de memoria y throughput sobre
+tablas sintéticas; la variante original se limita a --legacy-max items porque
+su memoria crece con la tabla.
+
+    python bench_stats_aggregation.py --sizes 10000 100000 1000000
+"""
+import argparse
+import pickle
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import support
+from stats_accumulator import StatsAccumulator
+from stats_store import last_days
+
+PAGE_SIZE = 1000
+
+
+def payload_pool(size=64):
+    """analysisData serializados; cada página los deserializa como haría boto3"""
+    rng = random.Random(1)
+    now_ms = int(time.time() * 1000)
+    return [pickle.dumps(support.analysis_data(rng, now_ms)) for _ in range(size)]
+
+
+def pages(count, full, pool, seed=0):
+    rng = random.Random(seed)
+    ids = support.user_ids(200, seed)
+    now_ms = int(time.time() * 1000)
+    page = []
+    for index in range(count):
+        blob = pool[index % len(pool)]
+        timestamp = now_ms - rng.randrange(60 * support.DAY_MS)
+        if full:
+            item = {'userId': ids[index % len(ids)], 'timestamp': timestamp, 'analysisData': pickle.loads(blob)}
+        else:
+            item = {'userId': ids[index % len(ids)], 'timestamp': timestamp,
+                    'analysisData': {'DetectionType': support.DETECTION_TYPES[index % len(support.DETECTION_TYPES)]}}
+        page.append(item)
+        if len(page) == PAGE_SIZE:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def legacy(count, pool):
+    """Réplica del handler original: lista de items + dos pasadas"""
+    items = []
+    for page in pages(count, True, pool):
+        items.extend(page)
+
+    unique_users = set()
+    by_type = defaultdict(int)
+    for item in items:
+        unique_users.add(item.get('userId'))
+        analysis = item.get('analysisData', item)
+        by_type[analysis.get('DetectionType', 'unknown')] += 1
+
+    now = datetime.now()
+    thirty_days_ago = now - timedelta(days=30)
+    daily = {(thirty_days_ago + timedelta(days=i)).strftime('%Y-%m-%d'): 0 for i in range(30)}
+    for item in items:
+        timestamp = item.get('timestamp', 0)
+        if timestamp:
+            dt = datetime.fromtimestamp(timestamp / 1000)
+            if dt >= thirty_days_ago:
+                key = dt.strftime('%Y-%m-%d')
+                if key in daily:
+                    daily[key] += 1
+    return len(items)
+
+
+def streaming(count, pool):
+    dates = last_days(30)
+    accumulator = StatsAccumulator()
+    for page in pages(count, False, pool):
+        accumulator.add_page(page)
+    accumulator.result(dates[0], dates[-1])
+    return accumulator.total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-max', type=int, default=100000)
+    args = parser.parse_args()
+
+    pool = payload_pool()
+    rows = []
+    for size in args.sizes:
+        variants = [('streaming', streaming)]
+        if size <= args.legacy_max:
+            variants.insert(0, ('lista + 2 pasadas', legacy))
+        for label, function in variants:
+            count, elapsed, peak = support.measure(function, size, pool)
+            rows.append([size, label, f'{elapsed:.2f}', f'{count / elapsed:,.0f}', f'{peak:.1f}'])
+
+    support.print_table(['items', 'variante', 'segundos', 'items/s', 'pico MB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark de la caché de resúmenes de bedrock-summary.
+
+Simula un flujo de reaperturas: cada request elige un análisis de un conjunto
+de --distinct (con sesgo hacia los recientes, como historial y PDFs) y en la
+mitad de los casos lo reenvía con otro analysisId, URL y bounding boxes, que
+producen las mismas métricas. Cada --container-requests se descarta la caché
+en memoria para simular un contenedor nuevo; ahí solo acierta el nivel
+persistente.
+
+    python bench_summary_cache.py --requests 400 --distinct 60 --model-latency 0.5
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import random
+import time
+
+import support
+from fakes import FakeBedrock, FakeDynamoDB
+from summary_cache import SummaryCache
+
+
+def equivalent_copy(rng, analysis):
+    """Mismo análisis con identificadores y geometría distintos (mismas métricas)"""
+    data = copy.deepcopy(analysis)
+    data['analysisId'] = str(rng.getrandbits(64))
+    data['imageUrl'] = data['imageUrl'].replace('.jpg', f'-{rng.randrange(1000)}.jpg')
+    for person in data.get('ProtectiveEquipment', []):
+        person['BoundingBox'] = support.bounding_box(rng)
+        for part in person['BodyParts']:
+            for detection in part['EquipmentDetections']:
+                detection['BoundingBox'] = support.bounding_box(rng)
+    return data
+
+
+def workload(requests, distinct, seed=0):
+    rng = random.Random(seed)
+    pool = [support.analysis_data(rng, 1700000000000 + i, 'ppe_detection') for i in range(distinct)]
+    bodies = []
+    for _ in range(requests):
+        analysis = pool[min(int(rng.expovariate(1 / (distinct / 4))), distinct - 1)]
+        if rng.random() < 0.5:
+            analysis = equivalent_copy(rng, analysis)
+        bodies.append(json.dumps({'analysisResults': analysis, 'requiredEPPs': ['HEAD_COVER', 'HAND_COVER']}))
+    return bodies
+
+
+def run(handler, bodies, make_cache, container_requests, model_latency, db_latency):
+    bedrock = FakeBedrock(latency=model_latency)
+    dynamodb = FakeDynamoDB(latency=db_latency)
+    handler.bedrock = bedrock
+    cache = None
+    hits = {'memory': 0, 'persistent': 0, None: 0}
+    latencies = []
+    for index, body in enumerate(bodies):
+        if index % container_requests == 0:
+            cache = make_cache(dynamodb)
+            if cache is not None:
+                handler.summary_cache = cache
+        if cache is None:
+            # Sin caché: una caché que nunca guarda
+            handler.summary_cache = SummaryCache(max_entries=0)
+        start = time.perf_counter()
+        response = handler.lambda_handler({'body': body}, None)
+        latencies.append(time.perf_counter() - start)
+        hits[json.loads(response['body'])['cache']] += 1
+    latencies.sort()
+    return hits, sum(latencies), latencies[len(latencies) // 2], bedrock.calls['InvokeModel']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--distinct', type=int, default=60)
+    parser.add_argument('--container-requests', type=int, default=100, help='requests por contenedor antes de un cold start')
+    parser.add_argument('--model-latency', type=float, default=0.5, help='latencia simulada de invoke_model (s)')
+    parser.add_argument('--db-latency', type=float, default=0.005, help='latencia simulada de DynamoDB (s)')
+    args = parser.parse_args()
+
+    handler = support.load_handler('ai/bedrock-summary-lambda.py')
+    handler.TEMPLATE_CLASSES = set()
+    bodies = workload(args.requests, args.distinct)
+    variants = [
+        ('sin caché', lambda dynamodb: None),
+        ('memoria', lambda dynamodb: SummaryCache()),
+        ('memoria + DynamoDB', lambda dynamodb: SummaryCache(dynamodb.Table('epi-summary-cache'))),
+    ]
+
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for label, make_cache in variants:
+            hits, total, median, invocations = run(
+                handler, bodies, make_cache, args.container_requests, args.model_latency, args.db_latency
+            )
+            rows.append([label, invocations, hits['memory'], hits['persistent'], f'{total:.2f}', f'{median * 1000:.1f}'])
+
+    print(f'{args.requests} requests sobre {args.distinct} análisis distintos, '
+          f'cold start cada {args.container_requests}, modelo {args.model_latency * 1000:.0f} ms\n')
+    support.print_table(['caché', 'invocaciones', 'hits memoria', 'hits DynamoDB', 'segundos', 'p50 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
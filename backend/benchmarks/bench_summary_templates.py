@@ -0,0 +1,118 @@
+"""Benchmark de las plantillas de bedrock-summary sobre un corpus de análisis.
+
+Recorre un corpus de requests ({"analysisResults", "requiredEPPs"} por línea
+JSONL, p. ej. exportado de epi-user-analysis) con y sin plantillas, contando
+invocaciones al modelo, latencia y costo estimado de tokens (precios de
+Claude 3 Haiku on-demand). Sin --corpus se genera uno sintético con la
+proporción indicada de análisis 100% conformes y sin personas evaluables;
+--write-corpus lo guarda para reutilizarlo.
+
+    python bench_summary_templates.py --size 300 --compliant-share 0.35 --empty-share 0.2
+    python bench_summary_templates.py --corpus analisis.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+import support
+from fakes import FakeBedrock
+from summary_cache import SummaryCache
+
+INPUT_PRICE = 0.25 / 1000000
+OUTPUT_PRICE = 1.25 / 1000000
+REQUIRED = ['HEAD_COVER', 'HAND_COVER']
+
+
+def compliant_frame(rng, timestamp):
+    """Análisis donde todas las personas llevan casco y guantes sobre el umbral"""
+    data = support.analysis_data(rng, timestamp, 'ppe_detection')
+    for person in data['ProtectiveEquipment']:
+        person['BodyParts'] = [
+            {'Name': name, 'Confidence': 95.0, 'EquipmentDetections': [{
+                'Type': epp_type,
+                'Confidence': 85 + rng.random() * 15,
+                'BoundingBox': support.bounding_box(rng),
+                'CoversBodyPart': {'Confidence': 95.0, 'Value': True},
+            }]}
+            for name, epp_type in (('HEAD', 'HEAD_COVER'), ('LEFT_HAND', 'HAND_COVER'), ('RIGHT_HAND', 'HAND_COVER'))
+        ]
+    return data
+
+
+def empty_frame(rng, timestamp):
+    """Análisis sin personas o con personas sin partes evaluables (lejos, en vehículos)"""
+    data = support.analysis_data(rng, timestamp, 'ppe_detection', persons=rng.choice([0, 1, 2]))
+    for person in data['ProtectiveEquipment']:
+        person['BodyParts'] = [part for part in person['BodyParts'] if part['Name'] == 'FOOT']
+    return data
+
+
+def synthetic_corpus(size, compliant_share, empty_share, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(size):
+        timestamp = 1700000000000 + index
+        draw = rng.random()
+        if draw < compliant_share:
+            analysis = compliant_frame(rng, timestamp)
+        elif draw < compliant_share + empty_share:
+            analysis = empty_frame(rng, timestamp)
+        else:
+            analysis = support.analysis_data(rng, timestamp, 'ppe_detection', persons=rng.randint(2, 8))
+        corpus.append({'analysisResults': analysis, 'requiredEPPs': REQUIRED})
+    return corpus
+
+
+def run(handler, bodies, classes, model_latency):
+    bedrock = FakeBedrock(latency=model_latency)
+    handler.bedrock = bedrock
+    handler.summary_cache = SummaryCache(max_entries=0)
+    handler.TEMPLATE_CLASSES = classes
+    sources = {}
+    start = time.perf_counter()
+    for body in bodies:
+        response = json.loads(handler.lambda_handler({'body': body}, None)['body'])
+        sources[response['source']] = sources.get(response['source'], 0) + 1
+    elapsed = time.perf_counter() - start
+    input_tokens = sum(len(prompt) // 4 for prompt in bedrock.prompts)
+    output_tokens = bedrock.calls['InvokeModel'] * bedrock.output_tokens
+    return sources, elapsed, input_tokens * INPUT_PRICE + output_tokens * OUTPUT_PRICE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='archivo JSONL con un request por línea')
+    parser.add_argument('--write-corpus', help='guarda el corpus sintético en este archivo')
+    parser.add_argument('--size', type=int, default=300)
+    parser.add_argument('--compliant-share', type=float, default=0.35)
+    parser.add_argument('--empty-share', type=float, default=0.2)
+    parser.add_argument('--model-latency', type=float, default=0.05, help='latencia simulada de invoke_model (s)')
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as corpus_file:
+            corpus = [json.loads(line) for line in corpus_file if line.strip()]
+    else:
+        corpus = synthetic_corpus(args.size, args.compliant_share, args.empty_share)
+        if args.write_corpus:
+            with open(args.write_corpus, 'w') as corpus_file:
+                corpus_file.writelines(json.dumps(request) + '\n' for request in corpus)
+    bodies = [json.dumps(request) for request in corpus]
+
+    handler = support.load_handler('ai/bedrock-summary-lambda.py')
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for label, classes in (('solo modelo', set()), ('plantillas', {'compliant', 'empty'})):
+            sources, elapsed, cost = run(handler, bodies, classes, args.model_latency)
+            rows.append([label, sources.get('model', 0), sources.get('template', 0), f'{elapsed:.2f}',
+                         f'{elapsed / len(bodies) * 1000:.1f}', f'{cost:.4f}'])
+
+    print(f'{len(bodies)} análisis, modelo {args.model_latency * 1000:.0f} ms\n')
+    support.print_table(['modo', 'modelo', 'plantilla', 'segundos', 'ms/request', 'USD estimado'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Benchmark del listado de epi-admin-users: scan + join vs filas USER.
+
+Un user pool de --users usuarios y --analyses análisis (items chicos, reparto
+sesgado: pocos usuarios concentran la mayoría y algunos no tienen ninguno).
+Compara la primera página de --page usuarios:
+- scan + join: réplica del handler anterior, scan paralelo de userId/timestamp
+  de todos los análisis y join en memoria con el directorio
+- sort=activity sin índice: una query sobre todas las filas USER de epi-analysis-stats
+- sort=activity: query de una página al GSI pk-count y batch_get_item de sus filas USER
+- sort=email: batch_get_item de las filas USER de la página
+
+El directorio de Cognito se precarga, así ninguna variante paga list_users.
+Verifica que conteos y lastAnalysis coincidan con el scan y recorre el
+listado completo por actividad (sin repetidos ni faltantes, de más a menos
+análisis). Luego aplica
+--churn guardados y eliminaciones (la mitad de estas sobre el análisis más reciente del
+usuario) con record_analyses y confirma con check_users que las filas USER
+siguen igual al scan.
+
+    python bench_users_listing.py --users 10000 --analyses 1000000 --page 50 --latency 0.003
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+import support
+import user_directory
+from fakes import FakeCognito, FakeDynamoDB
+from parallel_scan import parallel_scan
+from stats_store import check_users, rebuild, record_analyses
+
+NOW_MS = 1735689600000
+
+
+def small_items(count, ids, days, seed=0):
+    """Items de epi-user-analysis con lo mínimo para contar (analysisData solo con el tipo)"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {
+            'userId': ids[int(len(ids) * rng.random() ** 3)],
+            'timestamp': NOW_MS - rng.randrange(days * support.DAY_MS),
+            'analysisData': {'DetectionType': rng.choice(support.DETECTION_TYPES)},
+        }
+
+
+def scan_join(dynamodb, users, page):
+    """Réplica del handler anterior: conteos por scan y ranking en memoria"""
+    stats = {}
+
+    def count_page(items):
+        for item in items:
+            count, last = stats.get(item['userId'], (0, 0))
+            stats[item['userId']] = (count + 1, max(last, int(item['timestamp'])))
+
+    parallel_scan(dynamodb, 'epi-user-analysis', count_page, attributes=('userId', 'timestamp'))
+    ranked = sorted((-stats.get(user.username, (0, 0))[0], user.username) for user in users)
+    return stats, [username for _, username in ranked[:page]]
+
+
+def last_analysis_str(timestamp):
+    return datetime.fromtimestamp(timestamp / 1000).strftime('%d/%m/%Y') if timestamp else ''
+
+
+def churn(analysis_table, stats_table, ids, operations, seed=1):
+    """Guardados y eliminaciones con la misma secuencia que save-analysis y delete-analysis"""
+    rng = random.Random(seed)
+    for index in range(operations):
+        user_id = ids[int(len(ids) * rng.random() ** 3)]
+        if index % 2 == 0:
+            timestamp = NOW_MS + index + 1 if rng.random() < 0.5 else NOW_MS - rng.randrange(30 * support.DAY_MS)
+            detection_type = rng.choice(support.DETECTION_TYPES)
+            try:
+                analysis_table.put_item(
+                    Item={'userId': user_id, 'timestamp': timestamp, 'analysisData': {'DetectionType': detection_type}},
+                    ConditionExpression='attribute_not_exists(#ts)',
+                    ExpressionAttributeNames={'#ts': 'timestamp'}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                continue
+            record_analyses(stats_table, [(user_id, timestamp, detection_type)])
+            continue
+        response = analysis_table.query(
+            KeyConditionExpression='#user = :user',
+            ExpressionAttributeNames={'#user': 'userId'},
+            ExpressionAttributeValues={':user': user_id},
+            ScanIndexForward=False,
+            Limit=1 if rng.random() < 0.5 else 50
+        )
+        items = response.get('Items', [])
+        if not items:
+            continue
+        victim = rng.choice(items)
+        deleted = analysis_table.delete_item(
+            Key={'userId': user_id, 'timestamp': victim['timestamp']},
+            ReturnValues='ALL_OLD'
+        ).get('Attributes')
+        if deleted:
+            record_analyses(stats_table, [(user_id, deleted['timestamp'], deleted['analysisData']['DetectionType'])],
+                            delta=-1, analysis_table=analysis_table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--analyses', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--page', type=int, default=50)
+    parser.add_argument('--churn', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.003, help='latencia simulada por llamada a DynamoDB (s)')
+    args = parser.parse_args()
+
+    handler = support.load_handler('admin/epi-admin-users-lambda-v2.py')
+    dynamodb = FakeDynamoDB(latency=args.latency)
+    handler.dynamodb = dynamodb.client()
+    handler.cognito = FakeCognito(support.cognito_users(args.users))
+    handler.cache_table = dynamodb.Table('epi-analysis-stats')
+    analysis_table = dynamodb.Table('epi-user-analysis')
+    ids = support.user_ids(args.users)
+    analysis_table.load(small_items(args.analyses, ids, args.days))
+
+    began = time.perf_counter()
+    rebuild(handler.dynamodb, handler.cache_table)
+    backfill = time.perf_counter() - began
+    users = user_directory.get_users(handler.cognito, handler.USER_POOL_ID, handler.cache_table)
+
+    def measured(function):
+        dynamodb.calls.clear()
+        analysis_table.consumed_rcu = handler.cache_table.consumed_rcu = 0.0
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function()
+        elapsed = time.perf_counter() - began
+        rcu = analysis_table.consumed_rcu + handler.cache_table.consumed_rcu
+        calls = sum(dynamodb.calls[name] for name in ('Scan', 'Query', 'BatchGetItem'))
+        return result, [calls, f'{rcu:,.0f}', f'{elapsed * 1000:,.0f}']
+
+    (expected, top), metrics = measured(lambda: scan_join(handler.dynamodb, users, args.page))
+    rows = [['scan + join', *metrics]]
+    top_counts = [expected.get(username, (0, 0))[0] for username in top]
+    for label, sort, index in (('sort=activity sin índice', 'activity', ''), ('sort=activity', 'activity', 'pk-count'),
+                               ('sort=email', 'email', 'pk-count')):
+        handler.ACTIVITY_INDEX = index
+        params = {'queryStringParameters': {'limit': str(args.page), 'sort': sort}}
+        response, metrics = measured(lambda: handler.lambda_handler(params, None))
+        page = json.loads(response['body'])['users']
+        for row in page:
+            count, last = expected.get(row['username'], (0, 0))
+            if row['analysisCount'] != count or row['lastAnalysis'] != last_analysis_str(last):
+                raise SystemExit(f"{label}: {row['username']} no coincide con el scan")
+        # Los empates en count no tienen orden garantizado en el GSI: se comparan los conteos
+        if sort == 'activity' and [row['analysisCount'] for row in page] != top_counts:
+            raise SystemExit(f'{label}: el orden no coincide con el scan')
+        rows.append([label, *metrics])
+
+    # Listado completo por actividad con el GSI: cada usuario una vez, de más a menos análisis
+    handler.ACTIVITY_INDEX = 'pk-count'
+    listed, params = [], {'limit': str(args.page), 'sort': 'activity'}
+    while True:
+        with contextlib.redirect_stdout(io.StringIO()):
+            body = json.loads(handler.lambda_handler({'queryStringParameters': dict(params)}, None)['body'])
+        listed.extend(body['users'])
+        if 'lastKey' not in body:
+            break
+        params['lastKey'] = body['lastKey']
+    counts = [row['analysisCount'] for row in listed]
+    if sorted(row['username'] for row in listed) != sorted(user.username for user in users):
+        raise SystemExit('sort=activity: el listado paginado repite u omite usuarios')
+    if counts != sorted(counts, reverse=True):
+        raise SystemExit('sort=activity: el listado paginado no está ordenado por actividad')
+
+    print(f'{args.users:,} usuarios, {args.analyses:,} análisis, página de {args.page}, '
+          f'DynamoDB {args.latency * 1000:.0f} ms por llamada\n')
+    support.print_table(['variante', 'llamadas', 'RCU', 'ms'], rows)
+
+    began = time.perf_counter()
+    churn(analysis_table, handler.cache_table, ids, args.churn)
+    applied = time.perf_counter() - began
+    began = time.perf_counter()
+    checked, mismatched = check_users(handler.dynamodb, handler.cache_table)
+    elapsed = time.perf_counter() - began
+    print(f'\nrebuild (backfill de lastAnalysis): {backfill:.1f} s')
+    print(f'{args.churn:,} guardados/eliminaciones: {applied:.1f} s; '
+          f'check_users: {checked:,} usuarios en {elapsed:.1f} s, {len(mismatched)} con diferencias')
+    if mismatched:
+        raise SystemExit('las filas USER no coinciden con el scan después de los cambios')
+
+
+if __name__ == '__main__':
+    main()
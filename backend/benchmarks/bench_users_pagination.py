@@ -0,0 +1,101 @@
+"""Benchmark de la paginación con cursor del listado de epi-admin-users.
+
+Para user pools de --pool-sizes usuarios (con --analyses-per-user análisis cada
+uno) compara la respuesta única de antes (todos los usuarios) con la primera
+página de --page: tamaño del body, tiempo del handler y tiempo de parsear el
+JSON en el cliente. Recorre además todas las páginas siguiendo lastKey y
+verifica que devuelvan cada usuario una sola vez y en el mismo orden, y que el
+snapshot del directorio (user_directory) haya quedado en la tabla: un
+contenedor nuevo debe leerlo sin llamar a list_users (FakeDynamoDB rechaza
+items de más de 400 KB como DynamoDB). Al final
+compara el largo del cursor firmado con el LastEvaluatedKey en JSON que
+devolvía el historial.
+
+    python bench_users_pagination.py --pool-sizes 1000 10000 50000 --page 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import support
+import user_directory
+from cursor import encode
+from fakes import FakeCognito, FakeDynamoDB
+from stats_store import rebuild
+
+
+def install(handler, size, analyses_per_user):
+    cognito = FakeCognito(support.cognito_users(size))
+    dynamodb = FakeDynamoDB()
+    handler.cognito = cognito
+    handler.dynamodb = dynamodb.client()
+    handler.cache_table = dynamodb.Table('epi-analysis-stats')
+    user_directory.invalidate(handler.USER_POOL_ID, handler.cache_table)
+    analysis_table = dynamodb.Table('epi-user-analysis')
+    analysis_table.load(support.analysis_items(size * analyses_per_user, users=size, as_decimal=True))
+    rebuild(handler.dynamodb, handler.cache_table)
+
+
+def call(handler, params):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = handler.lambda_handler({'queryStringParameters': params}, None)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    body = json.loads(response['body'])
+    return body, len(response['body']), elapsed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--analyses-per-user', type=int, default=2)
+    parser.add_argument('--page', type=int, default=50)
+    args = parser.parse_args()
+
+    handler = support.load_handler('admin/epi-admin-users-lambda-v2.py')
+    rows = []
+    for size in args.pool_sizes:
+        install(handler, size, args.analyses_per_user)
+        handler.MAX_USERS_PAGE_SIZE = size
+        body, length, elapsed, parse = call(handler, {'limit': str(size)})
+        everything = [user['username'] for user in body['users']]
+        rows.append([size, 'respuesta única', f'{length / 1024:,.0f}', f'{elapsed * 1000:,.0f}', f'{parse * 1000:.1f}', 1, ''])
+
+        handler.MAX_USERS_PAGE_SIZE = 200
+        params = {'limit': str(args.page)}
+        body, length, elapsed, parse = call(handler, params)
+        first = (length, elapsed, parse)
+        paged = [user['username'] for user in body['users']]
+        pages = 1
+        while 'lastKey' in body:
+            params['lastKey'] = body['lastKey']
+            body, *_ = call(handler, params)
+            paged.extend(user['username'] for user in body['users'])
+            pages += 1
+        if paged != everything:
+            raise SystemExit(f'{size} usuarios: las páginas no reproducen el listado completo')
+        rows.append([size, f'página de {args.page}', f'{first[0] / 1024:,.1f}', f'{first[1] * 1000:,.0f}',
+                     f'{first[2] * 1000:.2f}', pages])
+
+        # Contenedor nuevo: sin snapshot en memoria, debe leer el de la tabla
+        user_directory._snapshots.clear()
+        list_calls = handler.cognito.calls['ListUsers']
+        with contextlib.redirect_stdout(io.StringIO()):
+            users = user_directory.get_users(handler.cognito, handler.USER_POOL_ID, handler.cache_table)
+        if handler.cognito.calls['ListUsers'] != list_calls or len(users) != size:
+            raise SystemExit(f'{size} usuarios: el snapshot del directorio no quedó guardado en la tabla')
+        rows[-1].append(len(list(user_directory._query_parts(handler.cache_table, handler.USER_POOL_ID))))
+
+    support.print_table(['usuarios', 'variante', 'KB body', 'ms handler', 'ms parse', 'páginas', 'items snapshot'], rows)
+
+    key = {'userId': support.user_ids(1)[0], 'timestamp': 1735689600000, 'typeTs': 'ppe_detection#1735689600000'}
+    raw = json.dumps(key)
+    signed = encode({name: value for name, value in key.items() if name != 'userId'}, f'history:{key["userId"]}:userId-typeTs:ppe_detection:None:None')
+    print(f'\nlastKey del historial: JSON {len(raw)} caracteres ({len(json.dumps(raw))} en el body), cursor firmado {len(signed)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1108 @@
+"""Stand-ins en memoria de servicios AWS para los benchmarks locales.
+
+Imitan la API de boto3 que usan las Lambdas (resource de DynamoDB con tipos
+Python y, sobre las mismas tablas, el cliente con AttributeValue). Cada llamada puede simular latencia de red y throttling, y cuenta
+invocaciones y capacidad consumida para comparar implementaciones sin tocar AWS.
+"""
+import bisect
+import json
+import math
+import pickle
+import random
+import re
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+PAGE_BYTES = 1024 * 1024
+RCU_BYTES = 4096
+WCU_BYTES = 1024
+MAX_ITEM_BYTES = 400 * 1024
+
+
+def client_error(code, message, operation):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+class AwsStandIn:
+    """Latencia, throttling y contadores comunes a todos los stand-ins"""
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, seed=0):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, operation, throttle=True):
+        with self._lock:
+            self.calls[operation] += 1
+            throttled = throttle and self.throttle_rate and self._random.random() < self.throttle_rate
+        if self.latency:
+            time.sleep(self.latency)
+        return throttled
+
+    def _throttled(self, rate=None):
+        with self._lock:
+            return self._random.random() < (self.throttle_rate if rate is None else rate)
+
+
+# ---------------------------------------------------------------------------
+# Expresiones de DynamoDB (subconjunto usado por las Lambdas)
+# ---------------------------------------------------------------------------
+
+_TOKEN = re.compile(r'\s*(<>|<=|>=|[=<>(),+-]|:\w+|[#A-Za-z_]\w*(?:\.[#A-Za-z_]\w*)*|\S)')
+_MISSING = object()
+
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def _resolve_path(path, names):
+    parts = []
+    for part in path.split('.'):
+        parts.append(names.get(part, part) if part.startswith('#') else part)
+    return parts
+
+
+def _get_path(item, parts):
+    value = item
+    for part in parts:
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _normalize(value):
+    """Convierte a los tipos que devuelve boto3 (int -> Decimal) y rechaza floats"""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {_normalize(v) for v in value}
+    if hasattr(value, 'value') and isinstance(getattr(value, 'value'), bytes):
+        return value.value
+    return value
+
+
+def _number_size(value):
+    digits = ''.join(map(str, value.as_tuple().digits)).strip('0') or '0'
+    return 1 + (len(digits) + 1) // 2
+
+
+def item_size(value, top_level=True):
+    """Tamaño en bytes según las reglas de DynamoDB: nombres y valores de atributos,
+    números por pares de dígitos significativos y 3 bytes + 1 por elemento en mapas y listas"""
+    if top_level:
+        return sum(len(name.encode('utf-8')) + item_size(child, False) for name, child in value.items())
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, Decimal):
+        return _number_size(value)
+    if isinstance(value, dict):
+        return 3 + sum(1 + len(name.encode('utf-8')) + item_size(child, False) for name, child in value.items())
+    if isinstance(value, (list, tuple)):
+        return 3 + sum(1 + item_size(child, False) for child in value)
+    if isinstance(value, (set, frozenset)):
+        return sum(item_size(child, False) for child in value)
+    return len(str(value))
+
+
+class _Parser:
+    def __init__(self, expression, names, values):
+        if not isinstance(expression, str):
+            # Objetos Key()/Attr() de boto3.dynamodb.conditions
+            from boto3.dynamodb.conditions import ConditionExpressionBuilder
+            built = ConditionExpressionBuilder().build_expression(expression)
+            expression = built.condition_expression
+            names = {**(names or {}), **built.attribute_name_placeholders}
+            values = {**(values or {}), **built.attribute_value_placeholders}
+        self.tokens = _tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if expected is not None and (token is None or token.upper() != expected):
+            raise ValueError(f'Se esperaba {expected} y llegó {token}')
+        self.position += 1
+        return token
+
+    def operand(self):
+        token = self.take()
+        if token.startswith(':'):
+            return ('value', _normalize(self.values[token]))
+        return ('path', _resolve_path(token, self.names))
+
+    def parse_condition(self):
+        node = self.parse_and()
+        while self.peek() and self.peek().upper() == 'OR':
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() and self.peek().upper() == 'AND':
+            self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() and self.peek().upper() == 'NOT':
+            self.take()
+            return ('not', self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.peek()
+        if token == '(':
+            self.take()
+            node = self.parse_condition()
+            self.take(')')
+            return node
+        if token in ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains'):
+            self.take()
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take()
+                args.append(self.operand())
+            self.take(')')
+            return ('func', token, args)
+        left = self.operand()
+        operator = self.take().upper()
+        if operator == 'BETWEEN':
+            low = self.operand()
+            self.take('AND')
+            return ('between', left, low, self.operand())
+        if operator == 'IN':
+            self.take('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.take()
+                options.append(self.operand())
+            self.take(')')
+            return ('in', left, options)
+        return ('compare', operator, left, self.operand())
+
+
+def _operand_value(item, operand):
+    kind, value = operand
+    return value if kind == 'value' else _get_path(item, value)
+
+
+def _compare(operator, left, right):
+    if left is _MISSING or right is _MISSING:
+        return operator == '<>'
+    if operator == '=':
+        return left == right
+    if operator == '<>':
+        return left != right
+    try:
+        if operator == '<':
+            return left < right
+        if operator == '<=':
+            return left <= right
+        if operator == '>':
+            return left > right
+        if operator == '>=':
+            return left >= right
+    except TypeError:
+        return False
+    raise ValueError(f'Operador no soportado: {operator}')
+
+
+def _evaluate(node, item):
+    kind = node[0]
+    if kind == 'and':
+        return _evaluate(node[1], item) and _evaluate(node[2], item)
+    if kind == 'or':
+        return _evaluate(node[1], item) or _evaluate(node[2], item)
+    if kind == 'not':
+        return not _evaluate(node[1], item)
+    if kind == 'compare':
+        return _compare(node[1], _operand_value(item, node[2]), _operand_value(item, node[3]))
+    if kind == 'between':
+        value = _operand_value(item, node[1])
+        return _compare('>=', value, _operand_value(item, node[2])) and _compare('<=', value, _operand_value(item, node[3]))
+    if kind == 'in':
+        value = _operand_value(item, node[1])
+        return any(_compare('=', value, _operand_value(item, option)) for option in node[2])
+    if kind == 'func':
+        name, args = node[1], node[2]
+        first = _operand_value(item, args[0])
+        if name == 'attribute_exists':
+            return first is not _MISSING
+        if name == 'attribute_not_exists':
+            return first is _MISSING
+        second = _operand_value(item, args[1])
+        if first is _MISSING:
+            return False
+        if name == 'begins_with':
+            return isinstance(first, (str, bytes)) and first.startswith(second)
+        return second in first
+    raise ValueError(f'Nodo no soportado: {kind}')
+
+
+def parse_condition(expression, names=None, values=None):
+    parser = _Parser(expression, names, values)
+    node = parser.parse_condition()
+    if parser.peek() is not None:
+        raise ValueError(f'Token inesperado: {parser.peek()}')
+    return node
+
+
+def parse_projection(expression, names=None):
+    return [_resolve_path(part.strip(), names or {}) for part in expression.split(',')]
+
+
+def apply_projection(item, paths):
+    projected = {}
+    for parts in paths:
+        value = _get_path(item, parts)
+        if value is _MISSING:
+            continue
+        target = projected
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return projected
+
+
+_UPDATE_SECTION = re.compile(r'\b(SET|ADD|REMOVE|DELETE)\b', re.IGNORECASE)
+
+
+def _split_top_level(text):
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _set_path(item, parts, value):
+    target = item
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+    target[parts[-1]] = value
+
+
+def _remove_path(item, parts):
+    target = _get_path(item, parts[:-1]) if len(parts) > 1 else item
+    if isinstance(target, dict):
+        target.pop(parts[-1], None)
+
+
+def _set_value(expression, item, names, values):
+    parser = _Parser(expression, names, values)
+
+    def term():
+        token = parser.peek()
+        if token in ('if_not_exists', 'list_append'):
+            parser.take()
+            parser.take('(')
+            first = term()
+            parser.take(',')
+            second = term()
+            parser.take(')')
+            if token == 'if_not_exists':
+                return second if first is _MISSING else first
+            return list(first) + list(second)
+        return _operand_value(item, parser.operand())
+
+    result = term()
+    while parser.peek() in ('+', '-'):
+        operator = parser.take()
+        other = term()
+        result = result + other if operator == '+' else result - other
+    return result
+
+
+def apply_update(item, expression, names=None, values=None):
+    names = names or {}
+    values = values or {}
+    pieces = _UPDATE_SECTION.split(expression)
+    for index in range(1, len(pieces), 2):
+        section = pieces[index].upper()
+        for clause in _split_top_level(pieces[index + 1]):
+            if section == 'SET':
+                path, value_expression = clause.split('=', 1)
+                _set_path(item, _resolve_path(path.strip(), names), _set_value(value_expression, item, names, values))
+            elif section == 'ADD':
+                path, placeholder = clause.split()
+                parts = _resolve_path(path, names)
+                increment = _normalize(values[placeholder])
+                current = _get_path(item, parts)
+                if isinstance(increment, set):
+                    _set_path(item, parts, (current if current is not _MISSING else set()) | increment)
+                else:
+                    _set_path(item, parts, (current if current is not _MISSING else Decimal(0)) + increment)
+            elif section == 'REMOVE':
+                _remove_path(item, _resolve_path(clause, names))
+            elif section == 'DELETE':
+                path, placeholder = clause.split()
+                parts = _resolve_path(path, names)
+                current = _get_path(item, parts)
+                if current is not _MISSING:
+                    _set_path(item, parts, current - _normalize(values[placeholder]))
+    return item
+
+
+def _key_ranges(node, sort_key):
+    """Extrae restricciones sobre la sort key para acotar la query con bisect"""
+    low, high, prefix = None, None, None
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current[0] == 'and':
+            stack.extend([current[1], current[2]])
+        elif current[0] == 'compare' and current[2] == ('path', [sort_key]):
+            value = current[3][1]
+            if current[1] == '=':
+                low = high = (value, True)
+            elif current[1] in ('>', '>='):
+                low = (value, current[1] == '>=')
+            elif current[1] in ('<', '<='):
+                high = (value, current[1] == '<=')
+        elif current[0] == 'between' and current[1] == ('path', [sort_key]):
+            low = (current[2][1], True)
+            high = (current[3][1], True)
+        elif current[0] == 'func' and current[1] == 'begins_with' and current[2][0] == ('path', [sort_key]):
+            prefix = current[2][1][1]
+    return low, high, prefix
+
+
+def _partition_value(node, partition_key):
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current[0] == 'and':
+            stack.extend([current[1], current[2]])
+        elif current[0] == 'compare' and current[1] == '=' and current[2] == ('path', [partition_key]):
+            return current[3][1]
+    raise ValueError(f'KeyConditionExpression sin igualdad sobre {partition_key}')
+
+
+# ---------------------------------------------------------------------------
+# DynamoDB
+# ---------------------------------------------------------------------------
+
+class _Partition:
+    __slots__ = ('sort_values', 'items')
+
+    def __init__(self):
+        self.sort_values = []
+        self.items = {}
+
+
+class FakeTable:
+    """Tabla en memoria con la interfaz de boto3.resource('dynamodb').Table"""
+
+    def __init__(self, service, name, partition_key, sort_key=None, indexes=None):
+        self.service = service
+        self.name = name
+        self.table_name = name
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+        self.indexes = indexes or {}
+        self.consumed_rcu = 0.0
+        self.consumed_wcu = 0.0
+        # Items serializados: cada lectura devuelve objetos nuevos como boto3
+        self._data = {}
+        # Tamaño de cada item según las reglas de DynamoDB (capacidad y páginas de 1 MB)
+        self._sizes = {}
+        self._order = []
+        self._position = {}
+        self._partitions = {}
+        self._index_cache = {}
+        self._lock = threading.RLock()
+
+    # -- helpers -----------------------------------------------------------
+
+    def _key_of(self, item):
+        return (item[self.partition_key], item[self.sort_key] if self.sort_key else None)
+
+    def _key_dict(self, key):
+        result = {self.partition_key: key[0]}
+        if self.sort_key:
+            result[self.sort_key] = key[1]
+        return result
+
+    def _load(self, key):
+        return pickle.loads(self._data[key])
+
+    def _capacity(self, size, unit, strongly_consistent=False):
+        units = max(1, math.ceil(size / unit))
+        return units if unit == WCU_BYTES or strongly_consistent else units / 2
+
+    def _consumed(self, read=0.0, write=0.0):
+        with self._lock:
+            self.consumed_rcu += read
+            self.consumed_wcu += write
+        return {'TableName': self.name, 'CapacityUnits': read + write}
+
+    def _response(self, response, params, read=0.0, write=0.0):
+        capacity = self._consumed(read, write)
+        if params.get('ReturnConsumedCapacity', 'NONE') != 'NONE':
+            response['ConsumedCapacity'] = capacity
+        return response
+
+    def _store(self, item, operation=None):
+        """Guarda item; con operation (escrituras de la API) rechaza items de más de 400 KB como DynamoDB"""
+        size = item_size(item)
+        if operation and size > MAX_ITEM_BYTES:
+            raise client_error('ValidationException', 'Item size has exceeded the maximum allowed size', operation)
+        key = self._key_of(item)
+        blob = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if key not in self._data:
+                self._position[key] = len(self._order)
+                self._order.append(key)
+                partition = self._partitions.setdefault(key[0], _Partition())
+                if self.sort_key:
+                    bisect.insort(partition.sort_values, key[1])
+                else:
+                    partition.sort_values.append(None)
+                partition.items[key[1]] = key
+            self._data[key] = blob
+            self._sizes[key] = size
+            self._index_cache.clear()
+        return size
+
+    def _remove(self, key):
+        with self._lock:
+            blob = self._data.pop(key, None)
+            if blob is None:
+                return None
+            self._sizes.pop(key)
+            self._order[self._position.pop(key)] = None
+            partition = self._partitions[key[0]]
+            del partition.items[key[1]]
+            if self.sort_key:
+                del partition.sort_values[bisect.bisect_left(partition.sort_values, key[1])]
+            else:
+                partition.sort_values.clear()
+            if not partition.items:
+                del self._partitions[key[0]]
+            self._index_cache.clear()
+            return blob
+
+    def _check_condition(self, key, params, operation):
+        expression = params.get('ConditionExpression')
+        if not expression:
+            return
+        current = self._load(key) if key in self._data else {}
+        node = parse_condition(expression, params.get('ExpressionAttributeNames'), params.get('ExpressionAttributeValues'))
+        if not _evaluate(node, current):
+            # Una escritura condicional rechazada igual consume WCU según el item existente (mínimo 1)
+            self._consumed(write=self._capacity(self._sizes.get(key, 0), WCU_BYTES))
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed', operation)
+
+    def _throttle(self, operation):
+        if self.service._call(operation):
+            raise client_error('ProvisionedThroughputExceededException', 'Rate exceeded', operation)
+
+    def load(self, items):
+        """Carga inicial sin latencia ni contadores (datasets sintéticos)"""
+        for item in items:
+            self._store(_normalize(item))
+
+    def item_count(self):
+        return len(self._data)
+
+    # -- API de boto3 ---------------------------------------------------------
+
+    def put_item(self, **params):
+        self._throttle('PutItem')
+        item = _normalize(params['Item'])
+        key = self._key_of(item)
+        with self._lock:
+            self._check_condition(key, params, 'PutItem')
+            old = self._data.get(key)
+            size = self._store(item, 'PutItem')
+        response = {}
+        if old is not None and params.get('ReturnValues') == 'ALL_OLD':
+            response['Attributes'] = pickle.loads(old)
+        return self._response(response, params, write=self._capacity(size, WCU_BYTES))
+
+    def get_item(self, **params):
+        self._throttle('GetItem')
+        key = self._key_of(_normalize(params['Key']))
+        with self._lock:
+            blob = self._data.get(key)
+            size = self._sizes.get(key, 0)
+        if blob is None:
+            return self._response({}, params, read=0.5)
+        item = pickle.loads(blob)
+        if 'ProjectionExpression' in params:
+            item = apply_projection(item, parse_projection(params['ProjectionExpression'], params.get('ExpressionAttributeNames')))
+        return self._response({'Item': item}, params, read=self._capacity(size, RCU_BYTES, params.get('ConsistentRead', False)))
+
+    def delete_item(self, **params):
+        self._throttle('DeleteItem')
+        key = self._key_of(_normalize(params['Key']))
+        with self._lock:
+            self._check_condition(key, params, 'DeleteItem')
+            size = self._sizes.get(key, 0)
+            blob = self._remove(key)
+        response = {}
+        if blob is not None and params.get('ReturnValues') == 'ALL_OLD':
+            response['Attributes'] = pickle.loads(blob)
+        return self._response(response, params, write=self._capacity(size, WCU_BYTES))
+
+    def update_item(self, **params):
+        self._throttle('UpdateItem')
+        key_item = _normalize(params['Key'])
+        key = self._key_of(key_item)
+        with self._lock:
+            self._check_condition(key, params, 'UpdateItem')
+            item = self._load(key) if key in self._data else dict(key_item)
+            old = pickle.loads(pickle.dumps(item)) if params.get('ReturnValues') == 'ALL_OLD' else None
+            apply_update(item, params['UpdateExpression'], params.get('ExpressionAttributeNames'), params.get('ExpressionAttributeValues'))
+            size = self._store(item, 'UpdateItem')
+        response = {}
+        return_values = params.get('ReturnValues', 'NONE')
+        if return_values in ('ALL_NEW', 'UPDATED_NEW'):
+            response['Attributes'] = item
+        elif return_values == 'ALL_OLD' and old:
+            response['Attributes'] = old
+        return self._response(response, params, write=self._capacity(size, WCU_BYTES))
+
+    def _index_schema(self, index_name):
+        """(pk, sk, atributos proyectados) de un GSI; None proyecta todos (ALL)"""
+        partition_key, sort_key, *include = self.indexes[index_name]
+        return partition_key, sort_key, include[0] if include else None
+
+    def _page(self, keys, params, operation, include=None):
+        """Lee claves en orden aplicando Limit, límite de 1 MB, filtro y proyección.
+
+        include limita el item a las claves y esos atributos (GSI con proyección
+        INCLUDE), y la capacidad y el límite de 1 MB se calculan sobre lo proyectado.
+        """
+        limit = params.get('Limit')
+        projection = None
+        if 'ProjectionExpression' in params:
+            projection = parse_projection(params['ProjectionExpression'], params.get('ExpressionAttributeNames'))
+        item_filter = None
+        if 'FilterExpression' in params:
+            item_filter = parse_condition(params['FilterExpression'], params.get('ExpressionAttributeNames'), params.get('ExpressionAttributeValues'))
+        count_only = params.get('Select') == 'COUNT'
+
+        items, scanned, read_bytes, last_key = [], 0, 0, None
+        for key in keys:
+            with self._lock:
+                blob = self._data.get(key)
+                size = self._sizes.get(key, 0)
+            if blob is None:
+                continue
+            item = pickle.loads(blob)
+            if include is not None:
+                item = {name: value for name, value in item.items() if name in include}
+                size = item_size(item)
+            scanned += 1
+            read_bytes += size
+            last_key = key
+            if item_filter is None or _evaluate(item_filter, item):
+                items.append(item if projection is None else apply_projection(item, projection))
+            if (limit and scanned >= limit) or read_bytes >= PAGE_BYTES:
+                break
+        else:
+            last_key = None
+
+        response = {'Count': len(items), 'ScannedCount': scanned}
+        if not count_only:
+            response['Items'] = items
+        if last_key is not None:
+            response['LastEvaluatedKey'] = self._key_dict(last_key)
+        return self._response(response, params, read=self._capacity(read_bytes, RCU_BYTES, params.get('ConsistentRead', False)))
+
+    def scan(self, **params):
+        self._throttle('Scan')
+        segment = params.get('Segment', 0)
+        total_segments = params.get('TotalSegments', 1)
+        start = segment
+        if 'ExclusiveStartKey' in params:
+            start = self._position[self._key_of(_normalize(params['ExclusiveStartKey']))] + total_segments
+
+        def keys():
+            position = start
+            while position < len(self._order):
+                key = self._order[position]
+                if key is not None:
+                    yield key
+                position += total_segments
+
+        return self._page(keys(), params, 'Scan')
+
+    def _index_entries(self, index_name):
+        """Vista (pk, sk, clave de tabla) de un GSI, reconstruida tras cada escritura"""
+        with self._lock:
+            cached = self._index_cache.get(index_name)
+            if cached is None:
+                partition_key, sort_key, _ = self._index_schema(index_name)
+                cached = {}
+                for key, blob in self._data.items():
+                    item = pickle.loads(blob)
+                    if partition_key in item and (sort_key is None or sort_key in item):
+                        cached.setdefault(item[partition_key], []).append((item.get(sort_key), key))
+                for entries in cached.values():
+                    entries.sort(key=lambda entry: (entry[0], entry[1][1]))
+                self._index_cache[index_name] = cached
+            return cached
+
+    def query(self, **params):
+        self._throttle('Query')
+        node = parse_condition(params['KeyConditionExpression'], params.get('ExpressionAttributeNames'), params.get('ExpressionAttributeValues'))
+        index_name = params.get('IndexName')
+        include = None
+        if index_name:
+            partition_key, sort_key, include = self._index_schema(index_name)
+            if include is not None:
+                include = {partition_key, sort_key, self.partition_key, self.sort_key, *include}
+        else:
+            partition_key, sort_key = self.partition_key, self.sort_key
+        partition_value = _partition_value(node, partition_key)
+
+        if index_name:
+            entries = self._index_entries(index_name).get(partition_value, [])
+            sort_values = [entry[0] for entry in entries]
+            table_keys = [entry[1] for entry in entries]
+        else:
+            with self._lock:
+                partition = self._partitions.get(partition_value)
+                sort_values = list(partition.sort_values) if partition else []
+            table_keys = [(partition_value, value) for value in sort_values]
+
+        low, high, prefix = _key_ranges(node, sort_key) if sort_key else (None, None, None)
+        begin, end = 0, len(sort_values)
+        if low is not None:
+            begin = (bisect.bisect_left if low[1] else bisect.bisect_right)(sort_values, low[0])
+        if high is not None:
+            end = (bisect.bisect_right if high[1] else bisect.bisect_left)(sort_values, high[0])
+        if prefix is not None:
+            begin = max(begin, bisect.bisect_left(sort_values, prefix))
+        positions = range(begin, end)
+
+        forward = params.get('ScanIndexForward', True)
+        if not forward:
+            positions = reversed(positions)
+        if 'ExclusiveStartKey' in params:
+            start_key = self._key_of(_normalize(params['ExclusiveStartKey']))
+            start_index = table_keys.index(start_key)
+            positions = [p for p in positions if (p > start_index if forward else p < start_index)]
+
+        def keys():
+            for position in positions:
+                if prefix is not None and not str(sort_values[position]).startswith(prefix):
+                    if sort_values[position] > prefix:
+                        break
+                    continue
+                yield table_keys[position]
+
+        return self._page(keys(), params, 'Query', include)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _BatchWriter(self, overwrite_by_pkeys)
+
+
+class _BatchWriter:
+    """Equivalente a Table.batch_writer(): agrupa de a 25 y reintenta no procesados"""
+
+    def __init__(self, table, overwrite_by_pkeys):
+        self.table = table
+        self.overwrite_by_pkeys = overwrite_by_pkeys
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        while self.buffer:
+            self._flush()
+
+    def _add(self, request, key_source):
+        if self.overwrite_by_pkeys:
+            key = tuple(key_source.get(name) for name in self.overwrite_by_pkeys)
+            self.buffer = [r for r in self.buffer if r[1] != key]
+        else:
+            key = None
+        self.buffer.append((request, key))
+        if len(self.buffer) >= 25:
+            self._flush()
+
+    def put_item(self, Item):
+        self._add({'PutRequest': {'Item': Item}}, Item)
+
+    def delete_item(self, Key):
+        self._add({'DeleteRequest': {'Key': Key}}, Key)
+
+    def _flush(self):
+        batch, self.buffer = self.buffer[:25], self.buffer[25:]
+        response = self.table.service.batch_write_item(RequestItems={self.table.name: [r[0] for r in batch]})
+        for request in response.get('UnprocessedItems', {}).get(self.table.name, []):
+            self.buffer.append((request, None))
+
+
+class FakeDynamoDB(AwsStandIn):
+    """Equivalente a boto3.resource('dynamodb') con tablas en memoria"""
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, seed=0):
+        super().__init__(latency, throttle_rate, seed)
+        self.tables = {}
+        self.schemas = {
+            'epi-user-analysis': ('userId', 'timestamp', {
+                'userId-timestamp-summary': ('userId', 'timestamp', ('summary',)),
+                'userId-typeTs': ('userId', 'typeTs', ('summary',)),
+            }),
+            'epi-analysis-stats': ('pk', 'sk', {'pk-count': ('pk', 'count', ())}),
+            'UserProfiles': ('userId', None, {}),
+            'epi-summary-cache': ('cacheKey', None, {}),
+        }
+        self._client = None
+
+    def client(self):
+        """Equivalente a boto3.client('dynamodb') sobre las mismas tablas"""
+        if self._client is None:
+            self._client = FakeDynamoDBClient(self)
+        return self._client
+
+    def create_table(self, name, partition_key, sort_key=None, indexes=None):
+        self.schemas[name] = (partition_key, sort_key, indexes or {})
+        self.tables.pop(name, None)
+        return self.Table(name)
+
+    def Table(self, name):
+        if name not in self.tables:
+            partition_key, sort_key, indexes = self.schemas.get(name, ('pk', 'sk', {}))
+            self.tables[name] = FakeTable(self, name, partition_key, sort_key, indexes)
+        return self.tables[name]
+
+    def batch_write_item(self, **params):
+        self._call('BatchWriteItem', throttle=False)
+        unprocessed = {}
+        capacity = []
+        for table_name, requests in params['RequestItems'].items():
+            if len(requests) > 25:
+                raise client_error('ValidationException', 'Too many items requested for the BatchWriteItem call', 'BatchWriteItem')
+            table = self.Table(table_name)
+            write = 0.0
+            for request in requests:
+                if self.throttle_rate and self._throttled():
+                    unprocessed.setdefault(table_name, []).append(request)
+                    continue
+                if 'PutRequest' in request:
+                    write += table._capacity(table._store(_normalize(request['PutRequest']['Item']), 'BatchWriteItem'), WCU_BYTES)
+                else:
+                    key = table._key_of(_normalize(request['DeleteRequest']['Key']))
+                    with table._lock:
+                        size = table._sizes.get(key, 0)
+                        table._remove(key)
+                    write += table._capacity(size, WCU_BYTES)
+            capacity.append(table._consumed(write=write))
+        response = {'UnprocessedItems': unprocessed}
+        if params.get('ReturnConsumedCapacity', 'NONE') != 'NONE':
+            response['ConsumedCapacity'] = capacity
+        return response
+
+    def batch_get_item(self, **params):
+        self._call('BatchGetItem', throttle=False)
+        responses, unprocessed, capacity = {}, {}, []
+        for table_name, request in params['RequestItems'].items():
+            if len(request['Keys']) > 100:
+                raise client_error('ValidationException', 'Too many items requested for the BatchGetItem call', 'BatchGetItem')
+            table = self.Table(table_name)
+            projection = None
+            if 'ProjectionExpression' in request:
+                projection = parse_projection(request['ProjectionExpression'], request.get('ExpressionAttributeNames'))
+            read = 0.0
+            for key_item in request['Keys']:
+                if self.throttle_rate and self._throttled():
+                    unprocessed.setdefault(table_name, {**request, 'Keys': []})['Keys'].append(key_item)
+                    continue
+                key = table._key_of(_normalize(key_item))
+                with table._lock:
+                    blob = table._data.get(key)
+                    size = table._sizes.get(key, 0)
+                if blob is None:
+                    continue
+                read += table._capacity(size, RCU_BYTES, request.get('ConsistentRead', False))
+                item = pickle.loads(blob)
+                responses.setdefault(table_name, []).append(item if projection is None else apply_projection(item, projection))
+            capacity.append(table._consumed(read=read))
+        response = {'Responses': responses, 'UnprocessedKeys': unprocessed}
+        if params.get('ReturnConsumedCapacity', 'NONE') != 'NONE':
+            response['ConsumedCapacity'] = capacity
+        return response
+
+
+class FakeDynamoDBClient:
+    """Cliente de bajo nivel: convierte los AttributeValue y delega en el FakeDynamoDB"""
+
+    def __init__(self, resource):
+        self.resource = resource
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+    @property
+    def calls(self):
+        return self.resource.calls
+
+    def _python(self, item):
+        return {name: self._deserializer.deserialize(value) for name, value in item.items()}
+
+    def _wire(self, item):
+        return {name: self._serializer.serialize(value) for name, value in item.items()}
+
+    def _table_call(operation):
+        def call(self, TableName, **params):
+            for name in ('Item', 'Key', 'ExclusiveStartKey', 'ExpressionAttributeValues'):
+                if name in params:
+                    params[name] = self._python(params[name])
+            response = getattr(self.resource.Table(TableName), operation)(**params)
+            for name in ('Item', 'Attributes', 'LastEvaluatedKey'):
+                if name in response:
+                    response[name] = self._wire(response[name])
+            if 'Items' in response:
+                response['Items'] = [self._wire(item) for item in response['Items']]
+            return response
+        return call
+
+    get_item = _table_call('get_item')
+    put_item = _table_call('put_item')
+    update_item = _table_call('update_item')
+    delete_item = _table_call('delete_item')
+    query = _table_call('query')
+    scan = _table_call('scan')
+
+    def _write_request(self, request, convert):
+        if 'PutRequest' in request:
+            return {'PutRequest': {'Item': convert(request['PutRequest']['Item'])}}
+        return {'DeleteRequest': {'Key': convert(request['DeleteRequest']['Key'])}}
+
+    def batch_write_item(self, RequestItems, **params):
+        response = self.resource.batch_write_item(RequestItems={
+            table_name: [self._write_request(request, self._python) for request in requests]
+            for table_name, requests in RequestItems.items()
+        }, **params)
+        response['UnprocessedItems'] = {
+            table_name: [self._write_request(request, self._wire) for request in requests]
+            for table_name, requests in response['UnprocessedItems'].items()
+        }
+        return response
+
+    def batch_get_item(self, RequestItems, **params):
+        response = self.resource.batch_get_item(RequestItems={
+            table_name: {**request, 'Keys': [self._python(key) for key in request['Keys']]}
+            for table_name, request in RequestItems.items()
+        }, **params)
+        response['Responses'] = {table_name: [self._wire(item) for item in items]
+                                 for table_name, items in response['Responses'].items()}
+        response['UnprocessedKeys'] = {table_name: {**request, 'Keys': [self._wire(key) for key in request['Keys']]}
+                                       for table_name, request in response['UnprocessedKeys'].items()}
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Cognito
+# ---------------------------------------------------------------------------
+
+class FakeCognito(AwsStandIn):
+    """Equivalente a boto3.client('cognito-idp') para un user pool en memoria"""
+
+    def __init__(self, users=None, latency=0.0, throttle_rate=0.0, seed=0):
+        super().__init__(latency, throttle_rate, seed)
+        self.users = []
+        self._by_name = {}
+        for user in users or []:
+            self.add_user(user)
+
+    def add_user(self, user):
+        self._by_name[user['Username']] = user
+        self.users.append(user)
+
+    def _throttle(self, operation):
+        if self._call(operation):
+            raise client_error('TooManyRequestsException', 'Too many requests', operation)
+
+    def _user(self, username, operation):
+        if username not in self._by_name:
+            raise client_error('UserNotFoundException', 'User does not exist.', operation)
+        return self._by_name[username]
+
+    def list_users(self, UserPoolId, Limit=60, PaginationToken=None, AttributesToGet=None, Filter=None):
+        self._throttle('ListUsers')
+        if Limit > 60:
+            raise client_error('InvalidParameterException', 'Limit must be <= 60', 'ListUsers')
+        start = int(PaginationToken or 0)
+        page = []
+        for user in self.users[start:start + Limit]:
+            if AttributesToGet is not None:
+                user = {**user, 'Attributes': [a for a in user.get('Attributes', []) if a['Name'] in AttributesToGet]}
+            page.append(user)
+        response = {'Users': page}
+        if start + Limit < len(self.users):
+            response['PaginationToken'] = str(start + Limit)
+        return response
+
+    def admin_get_user(self, UserPoolId, Username):
+        self._throttle('AdminGetUser')
+        user = self._user(Username, 'AdminGetUser')
+        return {**user, 'UserAttributes': user.get('Attributes', [])}
+
+    def admin_update_user_attributes(self, UserPoolId, Username, UserAttributes):
+        self._throttle('AdminUpdateUserAttributes')
+        user = self._user(Username, 'AdminUpdateUserAttributes')
+        attributes = {a['Name']: a['Value'] for a in user.get('Attributes', [])}
+        attributes.update({a['Name']: a['Value'] for a in UserAttributes})
+        user['Attributes'] = [{'Name': k, 'Value': v} for k, v in attributes.items()]
+        return {}
+
+    def admin_set_user_password(self, UserPoolId, Username, Password, Permanent=False):
+        self._throttle('AdminSetUserPassword')
+        self._user(Username, 'AdminSetUserPassword')['UserStatus'] = 'CONFIRMED' if Permanent else 'FORCE_CHANGE_PASSWORD'
+        return {}
+
+
+# ---------------------------------------------------------------------------
+# Bedrock
+# ---------------------------------------------------------------------------
+
+class _Body:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def read(self):
+        return self._payload
+
+
+class FakeBedrock(AwsStandIn):
+    """Equivalente a boto3.client('bedrock-runtime') con un modelo de texto fijo"""
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, seed=0, text=None, output_tokens=400):
+        super().__init__(latency, throttle_rate, seed)
+        self.text = text or (
+            '**DETECCIÓN Y CUMPLIMIENTO**\nResumen generado por el stand-in de Bedrock.\n\n'
+            '**ANÁLISIS DE EQUIPOS Y RIESGOS**\nSin observaciones.\n\n'
+            '**RECOMENDACIONES**\n\n• **Acción Correctiva Inmediata**: Mantener el estándar.'
+        )
+        self.output_tokens = output_tokens
+        self.prompts = []
+
+    def _throttle(self, operation):
+        if self._call(operation):
+            raise client_error('ThrottlingException', 'Too many requests, please wait before trying again.', operation)
+
+    def _record(self, body):
+        request = json.loads(body)
+        prompt = request['messages'][0]['content']
+        with self._lock:
+            self.prompts.append(prompt)
+        return len(prompt) // 4
+
+    def invoke_model(self, modelId, body, **params):
+        self._throttle('InvokeModel')
+        input_tokens = self._record(body)
+        return {'body': _Body(json.dumps({
+            'content': [{'type': 'text', 'text': self.text}],
+            'usage': {'input_tokens': input_tokens, 'output_tokens': self.output_tokens},
+        }).encode('utf-8'))}
+
+
+# ---------------------------------------------------------------------------
+# S3
+# ---------------------------------------------------------------------------
+
+class FakeS3(AwsStandIn):
+    """Equivalente a boto3.client('s3') con objetos en memoria.
+
+    Además de la latencia por llamada, bandwidth (bytes/s) agrega el tiempo de
+    transferencia del cuerpo en put_object y get_object.
+    """
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, seed=0, bandwidth=None):
+        super().__init__(latency, throttle_rate, seed)
+        self.bandwidth = bandwidth
+        self.objects = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _throttle(self, operation):
+        if self._call(operation):
+            raise client_error('SlowDown', 'Please reduce your request rate.', operation)
+
+    def _transfer(self, size):
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def put_object(self, Bucket, Key, Body, **params):
+        self._throttle('PutObject')
+        body = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        self._transfer(len(body))
+        with self._lock:
+            self.objects[(Bucket, Key)] = body
+            self.bytes_in += len(body)
+        return {'ETag': f'"{hash(body) & 0xffffffff:08x}"'}
+
+    def get_object(self, Bucket, Key, **params):
+        self._throttle('GetObject')
+        with self._lock:
+            body = self.objects.get((Bucket, Key))
+            if body is not None:
+                self.bytes_out += len(body)
+        if body is None:
+            raise client_error('NoSuchKey', 'The specified key does not exist.', 'GetObject')
+        self._transfer(len(body))
+        return {'Body': _Body(body), 'ContentLength': len(body)}
+
+    def delete_object(self, Bucket, Key, **params):
+        self._throttle('DeleteObject')
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete):
+        self._throttle('DeleteObjects')
+        if len(Delete['Objects']) > 1000:
+            raise client_error('MalformedXML', 'The XML you provided was not well-formed', 'DeleteObjects')
+        with self._lock:
+            for entry in Delete['Objects']:
+                self.objects.pop((Bucket, entry['Key']), None)
+        return {} if Delete.get('Quiet') else {'Deleted': [{'Key': entry['Key']} for entry in Delete['Objects']]}
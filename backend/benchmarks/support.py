@@ -0,0 +1,181 @@
+"""Utilidades comunes de los benchmarks: rutas, medición y datos sintéticos."""
+import gc
+import importlib.util
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDAS_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'lambdas')
+SHARED_DIR = os.path.join(LAMBDAS_DIR, 'shared')
+
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+# Los handlers crean clientes boto3 al importarse; los benchmarks los reemplazan por stand-ins
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+# Clave fija para los cursores firmados (cursor.py)
+os.environ.setdefault('CURSOR_SECRET', 'bench-cursor-secret')
+
+DETECTION_TYPES = ('ppe_detection', 'realtime_epp', 'face_detection', 'label_detection', 'text_detection')
+EPP_BODY_PARTS = (
+    ('HEAD', 'HEAD_COVER'),
+    ('FACE', 'FACE_COVER'),
+    ('LEFT_HAND', 'HAND_COVER'),
+    ('RIGHT_HAND', 'HAND_COVER'),
+    ('FOOT', 'FOOT_COVER'),
+)
+DAY_MS = 86400000
+
+
+def load_handler(relative_path, module_name=None):
+    """Importa un handler por ruta (los nombres con guiones no son importables)"""
+    path = os.path.join(LAMBDAS_DIR, relative_path)
+    module_name = module_name or os.path.splitext(os.path.basename(path))[0].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(function, *args, **kwargs):
+    """Devuelve (resultado, segundos, pico de memoria en MB) de function.
+
+    Se ejecuta dos veces: una cronometrada y otra bajo tracemalloc (que
+    distorsiona mucho los tiempos), por eso function debe ser repetible.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def user_ids(count, seed=0):
+    rng = random.Random(seed)
+    return [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)]
+
+
+def bounding_box(rng):
+    return {
+        'Width': rng.random() * 0.3,
+        'Height': rng.random() * 0.3,
+        'Left': rng.random() * 0.7,
+        'Top': rng.random() * 0.7,
+    }
+
+
+def protective_equipment(rng, persons):
+    """ProtectiveEquipment con la forma de la respuesta de Rekognition"""
+    result = []
+    for person_id in range(persons):
+        body_parts = []
+        for name, epp_type in EPP_BODY_PARTS:
+            if rng.random() < 0.15:
+                continue
+            detections = []
+            if rng.random() < 0.7:
+                detections.append({
+                    'Type': epp_type,
+                    'Confidence': 40 + rng.random() * 60,
+                    'BoundingBox': bounding_box(rng),
+                    'CoversBodyPart': {'Confidence': 50 + rng.random() * 50, 'Value': rng.random() < 0.9},
+                })
+            body_parts.append({'Name': name, 'Confidence': 80 + rng.random() * 20, 'EquipmentDetections': detections})
+        result.append({
+            'Id': person_id,
+            'Confidence': 80 + rng.random() * 20,
+            'BoundingBox': bounding_box(rng),
+            'BodyParts': body_parts,
+        })
+    return result
+
+
+def analysis_data(rng, timestamp, detection_type=None, persons=None):
+    """analysisData tal como lo envía el frontend a save-analysis"""
+    detection_type = detection_type or rng.choice(DETECTION_TYPES)
+    data = {
+        'timestamp': timestamp,
+        'analysisId': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        'DetectionType': detection_type,
+        'imageUrl': f'https://rekognition-gcontreras.s3.amazonaws.com/input/{timestamp}.jpg',
+        'MinConfidence': 75,
+    }
+    if detection_type in ('ppe_detection', 'realtime_epp'):
+        persons = rng.randint(1, 6) if persons is None else persons
+        data['ProtectiveEquipment'] = protective_equipment(rng, persons)
+        data['Summary'] = {'totalPersons': persons}
+        data['selectedEPPs'] = ['HEAD_COVER', 'HAND_COVER']
+    return data
+
+
+def analysis_items(count, users=100, days=60, seed=0, now_ms=None, as_decimal=False):
+    """Genera items de epi-user-analysis repartidos entre usuarios y días"""
+    from decimal import Decimal
+
+    rng = random.Random(seed)
+    ids = user_ids(users, seed)
+    now_ms = now_ms or int(time.time() * 1000)
+    for index in range(count):
+        timestamp = now_ms - rng.randrange(days * DAY_MS) - index % 1000
+        data = analysis_data(rng, timestamp)
+        if as_decimal:
+            data = _to_decimal(data, Decimal)
+        yield {'userId': ids[index % users], 'timestamp': timestamp, 'analysisData': data}
+
+
+def _to_decimal(value, decimal_type):
+    if isinstance(value, float):
+        return decimal_type(str(value))
+    if isinstance(value, dict):
+        return {k: _to_decimal(v, decimal_type) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_decimal(v, decimal_type) for v in value]
+    return value
+
+
+def cognito_users(count, seed=0, supervisors=10, admins=3):
+    """Usuarios de Cognito (formato de list_users) con algunos supervisores y admins"""
+    from datetime import datetime, timedelta
+
+    rng = random.Random(seed)
+    created = datetime(2024, 1, 1)
+    users = []
+    for index, user_id in enumerate(user_ids(count, seed)):
+        role = 'admin' if index < admins else 'supervisor' if index < admins + supervisors else 'user'
+        users.append({
+            'Username': user_id,
+            'UserCreateDate': created + timedelta(minutes=rng.randrange(500000)),
+            'UserStatus': 'CONFIRMED',
+            'Enabled': True,
+            'Attributes': [
+                {'Name': 'sub', 'Value': user_id},
+                {'Name': 'email', 'Value': f'user{index}@example.com'},
+                {'Name': 'email_verified', 'Value': 'true'},
+                {'Name': 'given_name', 'Value': f'Nombre{index}'},
+                {'Name': 'family_name', 'Value': f'Apellido{index}'},
+                {'Name': 'name', 'Value': f'Nombre{index} Apellido{index}'},
+                {'Name': 'custom:role', 'Value': role},
+            ],
+        })
+    rng.shuffle(users)
+    return users
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
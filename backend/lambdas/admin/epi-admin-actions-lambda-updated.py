@@ -1,114 +1,79 @@
-import json
-import boto3
 import string
 import secrets
-from decimal import Decimal
+from aws_clients import lazy_client, lazy_table
+from http_api import HttpError, Router
+from role_index import ROLE_INDEX_TABLE, set_role
+from stats_store import STATS_TABLE
+from user_directory import invalidate
 
 # Inicializar clientes AWS
-cognito = boto3.client('cognito-idp')
+cognito = lazy_client('cognito-idp')
+cache_table = lazy_table(STATS_TABLE)
+index_table = lazy_table(ROLE_INDEX_TABLE)
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+router = Router(allow_headers='Content-Type', error_message='Error interno del servidor')
 
-def lambda_handler(event, context):
-    print(f"Event received: {json.dumps(event, default=str)}")
+@router.route('POST')
+def run_action(request):
+    body = request.body
+    action = body.get('action')
+    username = body.get('username')
+    
+    if not action or not username:
+        raise HttpError(400, 'action y username son requeridos')
     
-    # Headers CORS
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type',
-        'Access-Control-Allow-Methods': 'POST,OPTIONS'
-    }
+    user_pool_id = 'us-east-1_zrdfN7OKN'  # User Pool de epi-dashboard
     
-    # Manejar OPTIONS para CORS
-    if event.get('httpMethod') == 'OPTIONS':
+    if action == 'reset-password':
+        # Generar contraseña temporal de 12 caracteres
+        alphabet = string.ascii_letters + string.digits
+        temp_password = ''.join(secrets.choice(alphabet) for _ in range(12))
+        
+        # Establecer contraseña temporal
+        cognito.admin_set_user_password(
+            UserPoolId=user_pool_id,
+            Username=username,
+            Password=temp_password,
+            Permanent=False  # Usuario debe cambiarla en el primer login
+        )
+        invalidate(user_pool_id, cache_table)
+        
         return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': ''
+            'message': 'Contraseña reseteada exitosamente',
+            'temporaryPassword': temp_password
         }
-    
-    try:
-        # Parsear el body
-        body = json.loads(event.get('body', '{}'))
-        action = body.get('action')
-        username = body.get('username')
         
-        if not action or not username:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({'error': 'action y username son requeridos'})
-            }
+    elif action == 'change-role':
+        role = body.get('role', 'user')
         
-        user_pool_id = 'us-east-1_zrdfN7OKN'  # User Pool de epi-dashboard
+        # Validar roles permitidos
+        if role not in ['user', 'admin', 'supervisor']:
+            raise HttpError(400, 'Rol no válido. Debe ser: user, admin o supervisor')
         
-        if action == 'reset-password':
-            # Generar contraseña temporal de 12 caracteres
-            alphabet = string.ascii_letters + string.digits
-            temp_password = ''.join(secrets.choice(alphabet) for _ in range(12))
-            
-            # Establecer contraseña temporal
-            cognito.admin_set_user_password(
-                UserPoolId=user_pool_id,
-                Username=username,
-                Password=temp_password,
-                Permanent=False  # Usuario debe cambiarla en el primer login
-            )
-            
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'body': json.dumps({
-                    'message': 'Contraseña reseteada exitosamente',
-                    'temporaryPassword': temp_password
-                })
-            }
-            
-        elif action == 'change-role':
-            role = body.get('role', 'user')
-            
-            # Validar roles permitidos
-            if role not in ['user', 'admin', 'supervisor']:
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'Rol no válido. Debe ser: user, admin o supervisor'})
+        # Actualizar atributo custom:role
+        cognito.admin_update_user_attributes(
+            UserPoolId=user_pool_id,
+            Username=username,
+            UserAttributes=[
+                {
+                    'Name': 'custom:role',
+                    'Value': role
                 }
-            
-            # Actualizar atributo custom:role
-            cognito.admin_update_user_attributes(
-                UserPoolId=user_pool_id,
-                Username=username,
-                UserAttributes=[
-                    {
-                        'Name': 'custom:role',
-                        'Value': role
-                    }
-                ]
-            )
-            
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'body': json.dumps({
-                    'message': f'Rol actualizado a {role} exitosamente'
-                })
-            }
+            ]
+        )
+        invalidate(user_pool_id, cache_table)
+        
+        # Mantener el índice de roles que consulta epi-get-supervisors
+        user = cognito.admin_get_user(UserPoolId=user_pool_id, Username=username)
+        attributes = {attr['Name']: attr['Value'] for attr in user.get('UserAttributes', [])}
+        set_role(index_table, username, role, attributes.get('email', ''), attributes.get('name', ''))
         
-        else:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({'error': f'Acción no válida: {action}'})
-            }
-            
-    except Exception as e:
-        print(f"Error: {str(e)}")
         return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({'error': 'Error interno del servidor'})
-        }
\ No newline at end of file
+            'message': f'Rol actualizado a {role} exitosamente'
+        }
+    
+    else:
+        raise HttpError(400, f'Acción no válida: {action}')
+
+def lambda_handler(event, context):
+    return router(event, context)
@@ -1,74 +1,145 @@
-import json
-import boto3
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+import os
+from boto3.dynamodb.conditions import Attr, Key
+from analysis_codec import (MAX_TIMESTAMP, TYPE_SORT_KEY, decode_analysis, fetch_details, summarize_analysis,
+                            summary_projection, type_sort_key)
+from aws_clients import lazy_client, lazy_table
+from cursor import InvalidCursor, decode, encode
+from dynamodb_items import batch_get
+from http_api import HttpError, Router
 
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-table = dynamodb.Table('epi-user-analysis')
+ANALYSIS_TABLE = 'epi-user-analysis'
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+dynamodb = lazy_client('dynamodb', region_name='us-east-1')
+table = lazy_table(ANALYSIS_TABLE, region_name='us-east-1')
+s3 = lazy_client('s3', region_name='us-east-1')
 
-def lambda_handler(event, context):
+# GSI con la proyección de resumen para view=summary; vacío consulta la tabla con ProjectionExpression
+SUMMARY_INDEX = os.environ.get('SUMMARY_INDEX', 'userId-timestamp-summary')
+# GSI (userId, typeTs) para filtrar por tipo; vacío filtra con FilterExpression sobre la partición
+TYPE_INDEX = os.environ.get('TYPE_INDEX', 'userId-typeTs')
+
+def fetch_items(keys):
+    """Items completos (en el orden de keys) de una página leída del índice por tipo"""
+    found = {(item['userId'], item['timestamp']): item for item in batch_get(dynamodb, ANALYSIS_TABLE, keys)}
+    return [found[(key['userId'], key['timestamp'])] for key in keys if (key['userId'], key['timestamp']) in found]
+
+def key_condition(user_id, start, end, detection_type):
+    """(IndexName, KeyConditionExpression) del rango pedido; el tipo va en la sort key del índice por tipo"""
+    if detection_type and TYPE_INDEX:
+        low = type_sort_key(detection_type, start if start is not None else 0)
+        high = type_sort_key(detection_type, end if end is not None else MAX_TIMESTAMP)
+        return TYPE_INDEX, Key('userId').eq(user_id) & Key(TYPE_SORT_KEY).between(low, high)
+    condition = Key('userId').eq(user_id)
+    if start is not None and end is not None:
+        condition = condition & Key('timestamp').between(start, end)
+    elif start is not None:
+        condition = condition & Key('timestamp').gte(start)
+    elif end is not None:
+        condition = condition & Key('timestamp').lte(end)
+    return None, condition
+
+def get_analysis(user_id, timestamp):
+    """Análisis completo de un item (detalle de S3 incluido) para 'Ver Informe Completo'"""
+    item = table.get_item(Key={'userId': user_id, 'timestamp': timestamp}).get('Item')
+    if not item:
+        raise HttpError(404, 'Analysis not found')
+    return {'analysis': decode_analysis(item, fetch_details(s3, [item]))}
+
+router = Router()
+
+@router.route('GET')
+def get_history(request):
+    params = request.params
+    user_id = params.get('userId')
+    
+    if not user_id:
+        raise HttpError(400, 'Missing userId parameter')
+    
+    # Un análisis puntual con todo su detalle
+    if params.get('timestamp'):
+        try:
+            timestamp = int(params['timestamp'])
+        except ValueError:
+            raise HttpError(400, 'timestamp must be an integer in milliseconds')
+        return get_analysis(user_id, timestamp)
+    
+    # view=summary: solo tipo, timestamp, conteos y cumplimiento para el listado
+    view = params.get('view', 'full')
+    if view not in ('summary', 'full'):
+        raise HttpError(400, 'view must be summary or full')
+    
+    # Filtros: from/to (timestamps en ms, inclusivos) y type (DetectionType)
+    try:
+        start = int(params['from']) if params.get('from') else None
+        end = int(params['to']) if params.get('to') else None
+    except ValueError:
+        raise HttpError(400, 'from and to must be timestamps in milliseconds')
+    detection_type = params.get('type')
+    
+    # Paginación
     try:
-        params = event.get('queryStringParameters', {})
-        user_id = params.get('userId')
-        
-        if not user_id:
-            return {
-                'statusCode': 400,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Missing userId parameter'})
-            }
-        
-        # Paginación
         limit = int(params.get('limit', 10))
-        last_key = params.get('lastKey')
-        
-        query_params = {
-            'KeyConditionExpression': Key('userId').eq(user_id),
-            'ScanIndexForward': False,
-            'Limit': limit
-        }
+    except ValueError:
+        raise HttpError(400, 'limit must be an integer')
+    last_key = params.get('lastKey')
+    
+    index_name, condition = key_condition(user_id, start, end, detection_type)
+    query_params = {
+        'KeyConditionExpression': condition,
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    
+    if index_name:
+        # El índice por tipo proyecta solo el resumen; view=full lee los items con batch_get_item
+        query_params['IndexName'] = index_name
+    
+    if view == 'summary' and not index_name:
+        if SUMMARY_INDEX:
+            query_params['IndexName'] = SUMMARY_INDEX
+        else:
+            query_params['ProjectionExpression'], query_params['ExpressionAttributeNames'] = summary_projection()
+    
+    if detection_type and not index_name:
+        # Sin índice por tipo: Limit cuenta los items leídos, las páginas pueden venir con menos.
+        # El índice de resumen solo tiene 'summary'
+        attribute = 'summary' if query_params.get('IndexName') else 'analysisData'
+        query_params['FilterExpression'] = Attr(f'{attribute}.DetectionType').eq(detection_type)
+    
+    # lastKey es un cursor firmado ligado al usuario, al índice y a los filtros de la consulta
+    # (con otros filtros la posición no corresponde a la KeyCondition y DynamoDB la rechaza)
+    scope = f"history:{user_id}:{query_params.get('IndexName', '')}:{detection_type or ''}:{start}:{end}"
+    if last_key:
+        try:
+            query_params['ExclusiveStartKey'] = {**decode(last_key, scope), 'userId': user_id}
+        except InvalidCursor as e:
+            raise HttpError(400, str(e))
+    
+    # Query historial del usuario
+    response = table.query(**query_params)
+    
+    items = response.get('Items', [])
+    if index_name and view == 'full':
+        items = fetch_items([{'userId': item['userId'], 'timestamp': item['timestamp']} for item in items])
+    
+    if view == 'summary':
+        history = [summarize_analysis(item) for item in items]
+    else:
+        # Detalles guardados en S3: en paralelo para la página, salvo detail=false (esos items vuelven
+        # con el resumen y su detailKey)
+        details = fetch_details(s3, items) if params.get('detail') != 'false' else None
         
-        if last_key:
-            query_params['ExclusiveStartKey'] = json.loads(last_key)
-        
-        # Query historial del usuario
-        response = table.query(**query_params)
-        
-        items = response.get('Items', [])
-        
-        # Extraer analysisData
-        history = []
-        for item in items:
-            if 'analysisData' in item:
-                history.append(item['analysisData'])
-            else:
-                history.append(item)
-        
-        result = {'history': history, 'count': len(history)}
-        
-        # Incluir lastKey si hay más resultados
-        if 'LastEvaluatedKey' in response:
-            result['lastKey'] = json.dumps(response['LastEvaluatedKey'], default=decimal_default)
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,OPTIONS'
-            },
-            'body': json.dumps(result, default=decimal_default)
-        }
-        
-    except Exception as e:
-        print(f'Error: {str(e)}')
-        return {
-            'statusCode': 500,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)})
-        }
+        # Extraer analysisData (descomprime los items en formato compacto)
+        history = [decode_analysis(item, details) for item in items]
+    
+    result = {'history': history, 'count': len(history), 'view': view}
+    
+    # Incluir lastKey si hay más resultados
+    if 'LastEvaluatedKey' in response:
+        position = {key: value for key, value in response['LastEvaluatedKey'].items() if key != 'userId'}
+        result['lastKey'] = encode(position, scope)
+    
+    return result
+
+def lambda_handler(event, context):
+    return router(event, context)
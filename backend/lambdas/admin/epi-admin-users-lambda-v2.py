@@ -1,103 +1,144 @@
-import json
-import boto3
-from collections import defaultdict
+import bisect
+import os
 from datetime import datetime
+from aws_clients import lazy_client, lazy_table
+from cursor import InvalidCursor, decode, encode
+from http_api import HttpError, Router
+from stats_store import STATS_TABLE, active_users, all_user_activity, user_activity
+from user_directory import get_users
 
-cognito = boto3.client('cognito-idp', region_name='us-east-1')
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-table = dynamodb.Table('epi-user-analysis')
+cognito = lazy_client('cognito-idp', region_name='us-east-1')
+dynamodb = lazy_client('dynamodb', region_name='us-east-1')
+cache_table = lazy_table(STATS_TABLE, region_name='us-east-1')
 
 USER_POOL_ID = 'us-east-1_zrdfN7OKN'
 
-def lambda_handler(event, context):
-    try:
-        # Listar usuarios de Cognito
-        cognito_users = []
-        pagination_token = None
-        
-        while True:
-            if pagination_token:
-                response = cognito.list_users(
-                    UserPoolId=USER_POOL_ID,
-                    Limit=60,
-                    PaginationToken=pagination_token
-                )
-            else:
-                response = cognito.list_users(
-                    UserPoolId=USER_POOL_ID,
-                    Limit=60
-                )
-            
-            cognito_users.extend(response.get('Users', []))
-            
-            pagination_token = response.get('PaginationToken')
-            if not pagination_token:
+# Paginación del listado: limit por defecto y máximo
+USERS_PAGE_SIZE = int(os.environ.get('USERS_PAGE_SIZE', '50'))
+MAX_USERS_PAGE_SIZE = 200
+# Órdenes del listado: más activos primero (por defecto) o por email
+SORTS = ('activity', 'email')
+# GSI de epi-analysis-stats (pk, count; KEYS_ONLY) para sort=activity; vacío lee todas las filas USER
+ACTIVITY_INDEX = os.environ.get('ACTIVITY_INDEX', 'pk-count')
+# Filas USER por batch_get_item al buscar usuarios sin análisis
+IDLE_BATCH = 100
+
+
+def activity_page(directory, limit, position):
+    """(usuarios de la página, posición siguiente o None) en orden de actividad.
+
+    Primero los usuarios con análisis desde el GSI ACTIVITY_INDEX (position
+    ['index', LastEvaluatedKey]); agotado el índice, los del directorio sin
+    análisis por username (position ['idle', último username]), comprobados
+    con batch_get_item de las filas USER de los candidatos.
+    """
+    page = []
+    phase, start = position
+    if phase == 'index':
+        while len(page) < limit:
+            user_ids, start = active_users(cache_table, ACTIVITY_INDEX, limit - len(page), start)
+            # Filas de usuarios que ya no están en Cognito: se saltean
+            page.extend(directory[user_id] for user_id in user_ids if user_id in directory)
+            if not start:
                 break
+        if start:
+            return page, ['index', start]
+        if len(page) == limit:
+            return page, ['idle', None]
+        start = None
+    candidates = sorted(username for username in directory if start is None or username > start)
+    for offset in range(0, len(candidates), IDLE_BATCH):
+        chunk = candidates[offset:offset + IDLE_BATCH]
+        activity = user_activity(dynamodb, cache_table, chunk)
+        for username in chunk:
+            if activity.get(username, (0, None))[0] > 0:
+                continue
+            page.append(directory[username])
+            if len(page) == limit:
+                return page, ['idle', username] if username != candidates[-1] else None
+    return page, None
+
+router = Router()
+
+@router.route('GET')
+def list_users(request):
+    params = request.params
+    try:
+        limit = min(max(int(params.get('limit', USERS_PAGE_SIZE)), 1), MAX_USERS_PAGE_SIZE)
+    except ValueError:
+        raise HttpError(400, 'limit must be an integer')
+    sort = params.get('sort', 'activity')
+    if sort not in SORTS:
+        raise HttpError(400, f"sort must be one of {', '.join(SORTS)}")
+    
+    # lastKey: cursor con la posición tras la última fila de la página anterior
+    after = None
+    if params.get('lastKey'):
+        try:
+            after = decode(params['lastKey'], f'users:{sort}')
+        except InvalidCursor:
+            raise HttpError(400, 'Invalid cursor')
+    
+    # Listar usuarios de Cognito (caché compartida del directorio)
+    cognito_users = get_users(cognito, USER_POOL_ID, cache_table)
+    
+    # Contadores por usuario (filas USER de epi-analysis-stats, mantenidas por save/delete-analysis).
+    if sort == 'activity' and ACTIVITY_INDEX:
+        # El orden sale del GSI; solo se leen las filas USER de la página
+        if after is not None and not (isinstance(after, list) and len(after) == 2 and after[0] in ('index', 'idle')):
+            raise HttpError(400, 'Invalid cursor')
+        directory = {user.username: user for user in cognito_users}
+        page, position = activity_page(directory, limit, after or ['index', None])
+        next_key = encode(position, f'users:{sort}') if position else None
+        activity = user_activity(dynamodb, cache_table, [user.username for user in page])
+    else:
+        # Sin índice, ordenar por actividad necesita todas las filas USER (una query sobre items
+        # chicos); por email, solo las de la página. username desempata para que el cursor sea estable
+        try:
+            after = tuple(after) if after else None
+        except TypeError:
+            raise HttpError(400, 'Invalid cursor')
+        if sort == 'activity':
+            activity = all_user_activity(cache_table)
+            ranked = sorted(((-activity.get(user.username, (0, None))[0], user.username), user) for user in cognito_users)
+        else:
+            ranked = sorted(((user.email or '', user.username), user) for user in cognito_users)
+        keys = [key for key, _ in ranked]
+        start = bisect.bisect_right(keys, after) if after else 0
+        page = [user for _, user in ranked[start:start + limit]]
+        next_key = encode(ranked[start + limit - 1][0], f'users:{sort}') if start + limit < len(ranked) else None
+        if sort != 'activity':
+            activity = user_activity(dynamodb, cache_table, [user.username for user in page])
+    
+    # Formatear usuarios de la página
+    users = []
+    for user in page:
+        count, last_analysis = activity.get(user.username, (0, None))
         
-        # Obtener estadísticas de análisis por usuario
-        analysis_response = table.scan()
-        items = analysis_response.get('Items', [])
-        
-        while 'LastEvaluatedKey' in analysis_response:
-            analysis_response = table.scan(ExclusiveStartKey=analysis_response['LastEvaluatedKey'])
-            items.extend(analysis_response.get('Items', []))
-        
-        # Contar análisis por usuario
-        user_stats = defaultdict(lambda: {'count': 0, 'lastAnalysis': None})
-        
-        for item in items:
-            user_id = item.get('userId')
-            timestamp = item.get('timestamp', 0)
-            
-            user_stats[user_id]['count'] += 1
-            
-            if user_stats[user_id]['lastAnalysis'] is None or timestamp > user_stats[user_id]['lastAnalysis']:
-                user_stats[user_id]['lastAnalysis'] = timestamp
-        
-        # Formatear usuarios
-        users = []
-        for user in cognito_users:
-            username = user.get('Username')
-            attributes = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
-            
-            stats = user_stats.get(username, {'count': 0, 'lastAnalysis': None})
-            
-            # Formatear última fecha de análisis
-            last_analysis_str = ''
-            if stats['lastAnalysis']:
-                try:
-                    dt = datetime.fromtimestamp(stats['lastAnalysis'] / 1000)
-                    last_analysis_str = dt.strftime('%d/%m/%Y')
-                except:
-                    last_analysis_str = '-'
-            
-            users.append({
-                'username': username,
-                'email': attributes.get('email', ''),
-                'name': f"{attributes.get('given_name', '')} {attributes.get('family_name', '')}".strip() or '-',
-                'role': attributes.get('custom:role', 'user'),
-                'createdAt': user.get('UserCreateDate').isoformat() if user.get('UserCreateDate') else '',
-                'analysisCount': stats['count'],
-                'lastAnalysis': last_analysis_str
-            })
-        
-        # Ordenar por análisis (más activos primero)
-        users.sort(key=lambda x: x['analysisCount'], reverse=True)
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,OPTIONS'
-            },
-            'body': json.dumps({'users': users})
-        }
+        # Formatear última fecha de análisis
+        last_analysis_str = ''
+        if last_analysis:
+            try:
+                dt = datetime.fromtimestamp(last_analysis / 1000)
+                last_analysis_str = dt.strftime('%d/%m/%Y')
+            except:
+                last_analysis_str = '-'
         
-    except Exception as e:
-        print(f'Error: {str(e)}')
-        return {
-            'statusCode': 500,
-            'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)})
-        }
+        users.append({
+            'username': user.username,
+            'email': user.email,
+            'name': f"{user.given_name} {user.family_name}".strip() or '-',
+            'role': user.role,
+            'createdAt': user.created_at,
+            'analysisCount': count,
+            'lastAnalysis': last_analysis_str
+        })
+    
+    result = {'users': users, 'total': len(cognito_users)}
+    if next_key:
+        result['lastKey'] = next_key
+    
+    return result
+
+def lambda_handler(event, context):
+    return router(event, context)
@@ -1,149 +1,118 @@
 import json
-import boto3
+import os
 import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
+from aws_clients import lazy_client, lazy_table
+from compliance import compliance_metrics
+from http_api import HttpError, Router
+from metrics import debug, observe
+from summary_cache import SUMMARY_CACHE_TABLE, SummaryCache, cache_key
 
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+bedrock = lazy_client('bedrock-runtime', region_name='us-east-1')
 
-def lambda_handler(event, context):
-    try:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-        
-        analysis_results = body.get('analysisResults', {})
-        image_url = body.get('imageUrl', '')
-        required_epps = body.get('requiredEPPs', [])
-        
-        # Extraer datos del análisis
-        summary = analysis_results.get('Summary', {})
-        total_persons_detected = summary.get('totalPersons', 0)
-        min_confidence = analysis_results.get('MinConfidence', 75)
-        protective_equipment = analysis_results.get('ProtectiveEquipment', [])
-        
-        # FILTRAR PERSONAS EVALUABLES
-        # Persona es evaluable si tiene AL MENOS UNA parte visible de los EPPs requeridos
-        def is_evaluable_person(person):
-            visible_parts = set()
-            for body_part in person.get('BodyParts', []):
-                visible_parts.add(body_part.get('Name'))
-            
-            # Mapeo de EPP a partes del cuerpo necesarias
-            epp_to_parts = {
-                'HEAD_COVER': ['HEAD'],
-                'EYE_COVER': ['FACE'],
-                'FACE_COVER': ['FACE'],
-                'HAND_COVER': ['LEFT_HAND', 'RIGHT_HAND'],
-                'FOOT_COVER': ['FOOT'],
-                'EAR_COVER': ['HEAD']
-            }
-            
-            # Verificar que tenga AL MENOS UNA parte necesaria para ALGUNO de los EPPs requeridos
-            for epp in required_epps:
-                required_parts = epp_to_parts.get(epp, [])
-                if any(part in visible_parts for part in required_parts):
-                    return True
-            return False
-        
-        evaluable_persons = [p for p in protective_equipment if is_evaluable_person(p)]
-        total_persons = len(evaluable_persons)
-        filtered_persons = total_persons_detected - total_persons
-        
-        # Validar coherencia EPP-BodyPart
-        def validate_epp_for_bodypart(epp_type, body_part):
-            valid_combinations = {
-                'HEAD_COVER': ['HEAD'],
-                'EYE_COVER': ['FACE', 'HEAD'],
-                'FACE_COVER': ['FACE'],
-                'HAND_COVER': ['LEFT_HAND', 'RIGHT_HAND'],
-                'FOOT_COVER': ['FOOT', 'LEFT_FOOT', 'RIGHT_FOOT'],
-                'EAR_COVER': ['HEAD']
-            }
-            return body_part in valid_combinations.get(epp_type, [])
-        
-        # Analizar EPPs detectados (solo personas evaluables)
-        epp_detected = {}
-        compliant = 0
-        for person in evaluable_persons:
-            person_epps = set()
-            for body_part in person.get('BodyParts', []):
-                body_part_name = body_part.get('Name')
-                for equipment in body_part.get('EquipmentDetections', []):
-                    epp_type = equipment.get('Type')
-                    confidence = equipment.get('Confidence', 0)
-                    # Solo contar si confianza suficiente Y corresponde a la parte del cuerpo
-                    if confidence >= min_confidence and validate_epp_for_bodypart(epp_type, body_part_name):
-                        person_epps.add(epp_type)
-                        epp_detected[epp_type] = epp_detected.get(epp_type, 0) + 1
-            
-            # Verificar si persona cumple con todos los EPPs requeridos
-            if required_epps and all(epp in person_epps for epp in required_epps):
-                compliant += 1
-        
-        # Mapeo de nombres
-        epp_names = {
-            'HEAD_COVER': 'Casco',
-            'EYE_COVER': 'Gafas de seguridad',
-            'HAND_COVER': 'Guantes',
-            'FOOT_COVER': 'Calzado de seguridad',
-            'FACE_COVER': 'Mascarilla',
-            'EAR_COVER': 'Protección auditiva'
-        }
-        
-        # DEBUG: Imprimir datos recibidos
-        print(f"DEBUG - Total personas evaluables: {total_persons}")
-        print(f"DEBUG - Min confidence: {min_confidence}")
-        print(f"DEBUG - Required EPPs: {required_epps}")
-        
-        # FILTRAR solo EPPs requeridos
-        detected_list = [f"{epp_names.get(k, k)}: {v}/{total_persons} personas evaluables" for k, v in epp_detected.items() if k in required_epps]
-        detected_str = "\n".join(detected_list) if detected_list else "Ninguno"
-        
-        # Usar EPPs requeridos del frontend
-        total_epp_types = len(required_epps) if required_epps else 6
-        detected_epp_types = sum(1 for epp in required_epps if epp in epp_detected) if required_epps else len(epp_detected)
-        
-        # Identificar EPPs faltantes y bajo umbral
-        missing_epps = [epp_names.get(epp, epp) for epp in required_epps if epp not in epp_detected] if required_epps else []
-        missing_str = ", ".join(missing_epps) if missing_epps else "Ninguno"
-        
-        # Detectar EPPs que NO cumplen umbral (detectados pero < min_confidence)
-        # Incluye TODOS los EPPs detectados bajo umbral, sin importar si ya están en epp_detected
-        below_threshold_epps = {}
-        below_threshold_max_conf = {}  # Guardar máxima confianza de cada EPP bajo umbral
-        
-        for person in evaluable_persons:
-            for body_part in person.get('BodyParts', []):
-                body_part_name = body_part.get('Name')
-                for equipment in body_part.get('EquipmentDetections', []):
-                    epp_type = equipment.get('Type')
-                    confidence = equipment.get('Confidence', 0)
-                    if validate_epp_for_bodypart(epp_type, body_part_name) and epp_type in required_epps:
-                        if confidence < min_confidence:
-                            print(f"DEBUG - EPP bajo umbral encontrado: {epp_type} con {confidence}% en {body_part_name}")
-                            below_threshold_epps[epp_type] = below_threshold_epps.get(epp_type, 0) + 1
-                            # Guardar la máxima confianza detectada para este EPP
-                            if epp_type not in below_threshold_max_conf or confidence > below_threshold_max_conf[epp_type]:
-                                below_threshold_max_conf[epp_type] = confidence
-        
-        below_threshold_list = [f"{epp_names.get(k, k)}: {v} detección(es) con {below_threshold_max_conf[k]:.1f}% (NO cumplen umbral {min_confidence}%)" for k, v in below_threshold_epps.items()]
-        below_threshold_str = "\n".join(below_threshold_list) if below_threshold_list else "Ninguno"
-        
-        # DEBUG: Imprimir EPPs bajo umbral detectados
-        print(f"DEBUG - EPPs bajo umbral detectados: {below_threshold_epps}")
-        print(f"DEBUG - Confianzas máximas: {below_threshold_max_conf}")
-        print(f"DEBUG - String para prompt: {below_threshold_str}")
-        
-        # Calcular porcentajes
-        person_compliance_percentage = round((compliant / total_persons * 100)) if total_persons > 0 else 0
-        epp_compliance_percentage = round((detected_epp_types / total_epp_types * 100)) if total_epp_types > 0 else 0
-        
-        # Información sobre filtrado
-        filter_info = ""
-        if filtered_persons > 0:
-            filter_info = f"\n- Personas excluidas del análisis: {filtered_persons} (parcialmente visibles, muy lejos, o en vehículos)"
-        
-        # Información sobre personas no evaluables
-        non_evaluable_info = ""
-        if filtered_persons > 0:
-            non_evaluable_info = f"""
+MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+# Incrementar al cambiar render_prompt para no servir resúmenes del prompt anterior
+PROMPT_VERSION = '1'
+
+# Caché de resúmenes por contenido (SUMMARY_CACHE_TABLE vacío = solo memoria)
+summary_cache = SummaryCache(
+    lazy_table(SUMMARY_CACHE_TABLE, region_name='us-east-1') if SUMMARY_CACHE_TABLE else None
+)
+
+# Modo batch: cantidad máxima de análisis por request e invocaciones simultáneas
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '50'))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '4'))
+
+# Mapeo de nombres
+EPP_NAMES = {
+    'HEAD_COVER': 'Casco',
+    'EYE_COVER': 'Gafas de seguridad',
+    'HAND_COVER': 'Guantes',
+    'FOOT_COVER': 'Calzado de seguridad',
+    'FACE_COVER': 'Mascarilla',
+    'EAR_COVER': 'Protección auditiva'
+}
+
+# Clases de resultado que se redactan con plantilla sin invocar al modelo:
+# 'compliant' (todas las personas evaluables cumplen) y 'empty' (ninguna persona evaluable)
+TEMPLATE_CLASSES = {name.strip() for name in os.environ.get('SUMMARY_TEMPLATES', 'compliant,empty').split(',') if name.strip()}
+
+# Sin Decimal: el body se pasa tal cual a las métricas y al prompt
+router = Router(allow_headers='Content-Type', decimal_body=False)
+
+def compute_metrics(analysis_results, required_epps):
+    """Métricas de cumplimiento de EPP de un análisis (personas evaluables, EPPs detectados y bajo umbral)"""
+    metrics = compliance_metrics(analysis_results, required_epps)
+    
+    # Datos recibidos, solo en invocaciones muestreadas (LOG_SAMPLE_RATE)
+    debug('Total personas evaluables: %s', metrics['total_persons'])
+    debug('Min confidence: %s', metrics['min_confidence'])
+    debug('Required EPPs: %s', required_epps)
+    debug('EPPs bajo umbral detectados: %s', metrics['below_threshold_epps'])
+    debug('Confianzas máximas: %s', metrics['below_threshold_max_conf'])
+    
+    return metrics
+
+def render_non_evaluable_section(filtered_persons):
+    """Explicación de las personas excluidas (vacía si no hay)"""
+    if filtered_persons <= 0:
+        return ""
+    return f"""**⚠️ POR QUÉ ALGUNAS PERSONAS NO SON EVALUABLES**
+Se excluyeron {filtered_persons} persona(s) porque no se detectaron las partes del cuerpo necesarias para evaluar los EPP. El sistema requiere detectar primero la parte del cuerpo (cabeza, manos, rostro) antes de poder validar el EPP correspondiente (casco, guantes, gafas). Esto ocurre cuando las personas están muy lejos, parcialmente visibles, dentro de vehículos o en ángulos difíciles. Aunque los EPP sean visibles, sin la detección de la parte del cuerpo asociada, no pueden evaluarse con precisión.
+
+**📸 RECOMENDACIONES PARA MEJORAR LA DETECCIÓN:**
+• Tome fotos a 3-5 metros de distancia de las personas
+• Use ángulos frontales o de 45° máximo (evite tomas desde muy arriba o muy abajo)
+• Capture a las personas de cuerpo completo en el encuadre
+• Evite que vehículos, equipos u objetos obstruyan la vista de las personas
+• Asegúrese de buena iluminación (evite contraluz y sombras fuertes)
+• Verifique que la imagen no esté borrosa antes de analizarla
+
+"""
+
+def render_prompt(metrics):
+    """Arma el prompt para el modelo a partir de las métricas"""
+    total_persons_detected = metrics['total_persons_detected']
+    total_persons = metrics['total_persons']
+    filtered_persons = metrics['filtered_persons']
+    compliant = metrics['compliant']
+    min_confidence = metrics['min_confidence']
+    required_epps = metrics['required_epps']
+    epp_detected = metrics['epp_detected']
+    below_threshold_epps = metrics['below_threshold_epps']
+    below_threshold_max_conf = metrics['below_threshold_max_conf']
+    
+    # FILTRAR solo EPPs requeridos
+    detected_list = [f"{EPP_NAMES.get(k, k)}: {v}/{total_persons} personas evaluables" for k, v in epp_detected.items() if k in required_epps]
+    detected_str = "\n".join(detected_list) if detected_list else "Ninguno"
+    
+    # Usar EPPs requeridos del frontend
+    total_epp_types = len(required_epps) if required_epps else 6
+    detected_epp_types = sum(1 for epp in required_epps if epp in epp_detected) if required_epps else len(epp_detected)
+    
+    # Identificar EPPs faltantes y bajo umbral
+    missing_epps = [EPP_NAMES.get(epp, epp) for epp in required_epps if epp not in epp_detected] if required_epps else []
+    missing_str = ", ".join(missing_epps) if missing_epps else "Ninguno"
+    
+    below_threshold_list = [f"{EPP_NAMES.get(k, k)}: {v} detección(es) con {below_threshold_max_conf[k]:.1f}% (NO cumplen umbral {min_confidence}%)" for k, v in below_threshold_epps.items()]
+    below_threshold_str = "\n".join(below_threshold_list) if below_threshold_list else "Ninguno"
+    
+    debug('String para prompt: %s', below_threshold_str)
+    
+    # Calcular porcentajes
+    person_compliance_percentage = round((compliant / total_persons * 100)) if total_persons > 0 else 0
+    epp_compliance_percentage = round((detected_epp_types / total_epp_types * 100)) if total_epp_types > 0 else 0
+    
+    # Información sobre filtrado
+    filter_info = ""
+    if filtered_persons > 0:
+        filter_info = f"\n- Personas excluidas del análisis: {filtered_persons} (parcialmente visibles, muy lejos, o en vehículos)"
+    
+    # Información sobre personas no evaluables
+    non_evaluable_info = ""
+    if filtered_persons > 0:
+        non_evaluable_info = f"""
 
 IMPORTANTE - PERSONAS NO EVALUABLES:
 - {filtered_persons} persona(s) fueron excluidas del análisis
@@ -163,27 +132,14 @@ RECOMENDACIONES PARA MEJORAR LA DETECCIÓN:
 5. Obstrucciones: Evitar que vehículos, equipos u objetos tapen a las personas
 6. Enfoque: Verificar que la imagen no esté borrosa
 """
-        
-        # Construir sección de personas no evaluables
-        non_evaluable_section = ""
-        if filtered_persons > 0:
-            non_evaluable_section = f"""**⚠️ POR QUÉ ALGUNAS PERSONAS NO SON EVALUABLES**
-Se excluyeron {filtered_persons} persona(s) porque no se detectaron las partes del cuerpo necesarias para evaluar los EPP. El sistema requiere detectar primero la parte del cuerpo (cabeza, manos, rostro) antes de poder validar el EPP correspondiente (casco, guantes, gafas). Esto ocurre cuando las personas están muy lejos, parcialmente visibles, dentro de vehículos o en ángulos difíciles. Aunque los EPP sean visibles, sin la detección de la parte del cuerpo asociada, no pueden evaluarse con precisión.
-
-**📸 RECOMENDACIONES PARA MEJORAR LA DETECCIÓN:**
-• Tome fotos a 3-5 metros de distancia de las personas
-• Use ángulos frontales o de 45° máximo (evite tomas desde muy arriba o muy abajo)
-• Capture a las personas de cuerpo completo en el encuadre
-• Evite que vehículos, equipos u objetos obstruyan la vista de las personas
-• Asegúrese de buena iluminación (evite contraluz y sombras fuertes)
-• Verifique que la imagen no esté borrosa antes de analizarla
-
-"""
-        
-        exclusion_note = f" ({filtered_persons} excluidas - ver explicación abajo)" if filtered_persons > 0 else ""
-        
-        # Crear prompt mejorado
-        prompt = f"""Redacta un resumen ejecutivo de seguridad industrial en español basado en estándares OSHA e ISO 45001.
+    
+    # Construir sección de personas no evaluables
+    non_evaluable_section = render_non_evaluable_section(filtered_persons)
+    
+    exclusion_note = f" ({filtered_persons} excluidas - ver explicación abajo)" if filtered_persons > 0 else ""
+    
+    # Crear prompt mejorado
+    prompt = f"""Redacta un resumen ejecutivo de seguridad industrial en español basado en estándares OSHA e ISO 45001.
 
 RESULTADOS DEL ANÁLISIS:
 - Personas detectadas: {total_persons_detected}
@@ -213,40 +169,170 @@ Los EPP detectados (cumplen umbral {min_confidence}%) incluyen: {detected_str}.
 NO uses formato de documento oficial. NO incluyas campos vacíos como [Insertar]. Escribe el contenido completo.
 """
 
-        # Llamar a Claude 3 Haiku
-        response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-haiku-20240307-v1:0',
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1024,
-                "temperature": 0.7,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            })
+    return prompt
+
+def classify_result(metrics):
+    """Clase de resultado trivial ('compliant' o 'empty') o None si requiere al modelo"""
+    if metrics['total_persons'] == 0:
+        return 'empty'
+    if (metrics['required_epps'] and metrics['compliant'] == metrics['total_persons']
+            and not metrics['below_threshold_epps']):
+        return 'compliant'
+    return None
+
+def render_template(metrics, result_class):
+    """Resumen determinístico con las mismas secciones que pide el prompt"""
+    total_persons_detected = metrics['total_persons_detected']
+    total_persons = metrics['total_persons']
+    filtered_persons = metrics['filtered_persons']
+    min_confidence = metrics['min_confidence']
+    required_names = ", ".join(EPP_NAMES.get(epp, epp) for epp in metrics['required_epps']) or "los EPP requeridos"
+    non_evaluable_section = render_non_evaluable_section(filtered_persons)
+    
+    if result_class == 'compliant':
+        detected_str = ", ".join(
+            f"{EPP_NAMES.get(epp, epp)} ({metrics['epp_detected'].get(epp, 0)}/{total_persons} personas evaluables)"
+            for epp in metrics['required_epps']
         )
-        
-        response_body = json.loads(response['body'].read())
-        summary = response_body['content'][0]['text'].strip()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'POST,OPTIONS'
-            },
-            'body': json.dumps({'summary': summary})
-        }
-        
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        exclusion_note = f" ({filtered_persons} excluidas - ver explicación abajo)" if filtered_persons > 0 else ""
+        return f"""**DETECCIÓN Y CUMPLIMIENTO**
+Se detectaron {total_persons_detected} persona(s) en la imagen, de las cuales {total_persons} fueron incluidas en el análisis{exclusion_note}. El cumplimiento total es de 100% ({total_persons} de {total_persons} personas evaluables con todos los EPP requeridos). Se detectaron {len(metrics['required_epps'])} de {len(metrics['required_epps'])} tipos de EPP requeridos presentes en la imagen. Este nivel de cumplimiento es el esperado según OSHA e ISO 45001 para las tareas evaluadas.
+
+{non_evaluable_section}**ANÁLISIS DE EQUIPOS Y RIESGOS**
+Los EPP detectados (cumplen umbral {min_confidence}%) incluyen: {detected_str}. No hay EPP ausentes ni detecciones por debajo del umbral. Se felicita al equipo por el uso correcto de los elementos de protección: el riesgo residual asociado a los EPP evaluados es bajo mientras se mantenga este estándar.
+
+**RECOMENDACIONES**
+
+• **Acción Correctiva Inmediata**: No se requieren acciones correctivas. Mantener el estándar actual y verificar dentro de 7 días el estado y la disponibilidad de reposición de {required_names}.
+
+• **Capacitación y Procedimientos**: Reforzar trimestralmente las buenas prácticas observadas y el procedimiento de inspección previa al uso de los EPP, incluyendo al personal nuevo o temporal.
+
+• **Seguimiento e Inspección**: Mantener inspecciones mensuales para sostener el cumplimiento y registrar los resultados para detectar desvíos a tiempo.
+"""
+    
+    if total_persons_detected == 0:
+        detection = "No se detectaron personas en la imagen, por lo que no es posible evaluar el cumplimiento de EPP."
+    else:
+        detection = f"Se detectaron {total_persons_detected} persona(s) en la imagen, pero ninguna pudo incluirse en el análisis porque no se identificaron las partes del cuerpo necesarias para evaluar {required_names}. El resultado no permite concluir sobre el cumplimiento."
+    return f"""**DETECCIÓN Y CUMPLIMIENTO**
+{detection}
+
+{non_evaluable_section}**ANÁLISIS DE EQUIPOS Y RIESGOS**
+Sin personas evaluables no es posible determinar la presencia de {required_names} ni los riesgos asociados a su ausencia. La imagen no debe considerarse evidencia de cumplimiento ni de incumplimiento.
+
+**RECOMENDACIONES**
+
+• **Acción Correctiva Inmediata**: Repetir la captura dentro de 24-48h a 3-5 metros de distancia, con buena iluminación, encuadre de cuerpo completo y sin obstrucciones, antes de emitir conclusiones.
+
+• **Capacitación y Procedimientos**: Instruir mensualmente a quienes realizan las capturas sobre distancia, ángulo y encuadre adecuados para la evaluación de EPP.
+
+• **Seguimiento e Inspección**: Realizar una inspección presencial semanal mientras no se disponga de imágenes evaluables del área.
+"""
+
+def model_request(prompt):
+    """Body de la invocación a Claude 3 Haiku"""
+    return json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 1024,
+        "temperature": 0.7,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    })
+
+def invoke_summary(prompt):
+    """Invoca al modelo y devuelve el texto del resumen"""
+    start = time.perf_counter()
+    # Llamar a Claude 3 Haiku
+    response = bedrock.invoke_model(modelId=MODEL_ID, body=model_request(prompt))
+    
+    response_body = json.loads(response['body'].read())
+    summary = response_body['content'][0]['text'].strip()
+    
+    observe('ModelTotalMs', round((time.perf_counter() - start) * 1000))
+    return summary
+
+def summarize(metrics):
+    """Resumen por plantilla, caché o modelo; devuelve (summary, source, nivel de caché o None)"""
+    result_class = classify_result(metrics)
+    if result_class in TEMPLATE_CLASSES:
+        return render_template(metrics, result_class), 'template', None
+    key = cache_key(metrics, MODEL_ID, PROMPT_VERSION)
+    summary, tier = summary_cache.get(key)
+    if summary is not None:
+        return summary, 'cache', tier
+    summary = invoke_summary(render_prompt(metrics))
+    summary_cache.put(key, summary)
+    return summary, 'model', None
+
+def summarize_batch(items):
+    """Resúmenes de varios análisis: métricas y caché primero, luego el modelo en paralelo.
+    
+    Los análisis equivalentes (misma clave de caché) comparten una sola invocación.
+    Devuelve un resultado por item en el mismo orden, con 'summary', 'source' y 'cache' o 'error'.
+    """
+    results = [None] * len(items)
+    pending = {}
+    for index, item in enumerate(items):
+        try:
+            metrics = compute_metrics(item.get('analysisResults', {}), item.get('requiredEPPs', []))
+            result_class = classify_result(metrics)
+            if result_class in TEMPLATE_CLASSES:
+                results[index] = {'summary': render_template(metrics, result_class), 'source': 'template', 'cache': None}
+                continue
+            key = cache_key(metrics, MODEL_ID, PROMPT_VERSION)
+        except Exception as e:
+            results[index] = {'error': str(e)}
+            continue
+        if key in pending:
+            pending[key][1].append(index)
+            continue
+        summary, tier = summary_cache.get(key)
+        if summary is not None:
+            results[index] = {'summary': summary, 'source': 'cache', 'cache': tier}
+        else:
+            pending[key] = (metrics, [index])
+    
+    def run(key):
+        try:
+            summary = invoke_summary(render_prompt(pending[key][0]))
+            summary_cache.put(key, summary)
+            return key, {'summary': summary, 'source': 'model', 'cache': None}
+        except Exception as e:
+            return key, {'error': str(e)}
+    
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(pending))) as executor:
+            for key, result in executor.map(run, list(pending)):
+                first, *duplicates = pending[key][1]
+                results[first] = result
+                for index in duplicates:
+                    results[index] = dict(result, cache='batch') if 'summary' in result else result
+    
+    return results
+
+@router.route('POST')
+def summarize_analysis(request):
+    body = request.body
+    
+    # Modo batch: {"batch": [{"analysisResults": ..., "requiredEPPs": [...]}, ...]}
+    if 'batch' in body:
+        items = body.get('batch') or []
+        if not isinstance(items, list) or len(items) > MAX_BATCH_SIZE:
+            raise HttpError(400, f'batch debe ser una lista de hasta {MAX_BATCH_SIZE} análisis')
+        results = summarize_batch(items)
+        return {'results': results, 'count': len(results), 'cacheStats': summary_cache.stats}
+    
+    analysis_results = body.get('analysisResults', {})
+    image_url = body.get('imageUrl', '')
+    required_epps = body.get('requiredEPPs', [])
+    
+    summary, source, tier = summarize(compute_metrics(analysis_results, required_epps))
+    
+    return {'summary': summary, 'source': source, 'cache': tier, 'cacheStats': summary_cache.stats}
+
+def lambda_handler(event, context):
+    return router(event, context)
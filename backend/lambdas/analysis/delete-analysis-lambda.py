@@ -1,15 +1,18 @@
-import json
-import boto3
 import re
-from decimal import Decimal
+from analysis_codec import delete_detail
+from aws_clients import lazy_client, lazy_table
+from bulk_delete import MAX_BULK_DELETE, delete_items, find_range, find_timestamps
+from http_api import HttpError, Router
+from stats_store import STATS_TABLE, detection_type_of, record_analysis
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('epi-user-analysis')
+dynamodb = lazy_client('dynamodb')
+table = lazy_table('epi-user-analysis')
+stats_table = lazy_table(STATS_TABLE)
+s3 = lazy_client('s3')
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+router = Router(allow_headers='Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                error_message='Internal server error', decimal_body=False,
+                value_error_message='Invalid parameter format')
 
 def validate_user_id(user_id):
     """Valida formato de userId (UUID de Cognito)"""
@@ -29,96 +32,134 @@ def validate_timestamp(timestamp_str):
     except (ValueError, TypeError):
         return False
 
-def lambda_handler(event, context):
-    # Log de intento (sin datos sensibles)
-    print(f"DELETE request from IP: {event.get('requestContext', {}).get('identity', {}).get('sourceIp', 'unknown')}")
-    # CORS headers
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-        'Access-Control-Allow-Methods': 'DELETE,OPTIONS'
-    }
+def bulk_delete(user_id, params):
+    """Eliminación en lote: 'timestamps' (lista), rango 'from'/'to' o 'all'; devuelve el resultado de cada análisis"""
+    if not validate_user_id(user_id):
+        print(f"Invalid userId format: {user_id}")
+        raise HttpError(400, 'Invalid userId format')
     
-    # Handle OPTIONS preflight
-    if event.get('httpMethod') == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({'message': 'OK'})
-        }
+    remaining = False
+    if 'timestamps' in params:
+        timestamps = params['timestamps']
+        if not isinstance(timestamps, list) or len(timestamps) > MAX_BULK_DELETE:
+            raise HttpError(400, f'timestamps debe ser una lista de hasta {MAX_BULK_DELETE} timestamps')
+        # Timestamps inválidos o repetidos se informan por item; el resto se busca con batch_get_item
+        results = [None] * len(timestamps)
+        positions = {}
+        for index, value in enumerate(timestamps):
+            if not validate_timestamp(value):
+                results[index] = {'timestamp': value, 'status': 'error', 'error': 'Invalid timestamp'}
+            elif int(value) in positions:
+                results[index] = {'timestamp': int(value), 'status': 'duplicate'}
+            else:
+                positions[int(value)] = index
+        found = find_timestamps(dynamodb, table.name, user_id, list(positions))
+        for timestamp, index in positions.items():
+            if timestamp not in found:
+                results[index] = {'timestamp': timestamp, 'status': 'not_found'}
+        items = list(found.values())
+    else:
+        start, end = params.get('from'), params.get('to')
+        # Todo el historial solo con all=true explícito (un from/to nulo no alcanza)
+        all_history = params.get('all') in (True, 'true')
+        if start is None and end is None and not all_history:
+            raise HttpError(400, 'Indicar from, to o all=true para eliminar todo el historial')
+        if all_history and (start is not None or end is not None):
+            raise HttpError(400, 'all=true no admite from ni to')
+        if any(value is not None and not validate_timestamp(value) for value in (start, end)):
+            print(f"Invalid range: {start} - {end}")
+            raise HttpError(400, 'Invalid timestamp')
+        start = int(start) if start is not None else None
+        end = int(end) if end is not None else None
+        if start is not None and end is not None and start > end:
+            raise HttpError(400, 'from debe ser menor o igual que to')
+        # Hasta MAX_BULK_DELETE por request; con remaining el cliente repite el mismo request
+        items, remaining = find_range(table, user_id, start, end, MAX_BULK_DELETE, all_history)
+        results = [None] * len(items)
+        positions = {int(item['timestamp']): index for index, item in enumerate(items)}
     
-    try:
-        # Obtener parámetros
-        if event.get('httpMethod') == 'DELETE':
-            query_params = event.get('queryStringParameters', {})
-            user_id = query_params.get('userId')
-            timestamp_str = query_params.get('timestamp')
-            
-            # Validaciones de seguridad
-            if not user_id or not timestamp_str:
-                print("Missing required parameters")
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'userId y timestamp son requeridos'})
-                }
-            
-            if not validate_user_id(user_id):
-                print(f"Invalid userId format: {user_id}")
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'Invalid userId format'})
-                }
-            
-            if not validate_timestamp(timestamp_str):
-                print(f"Invalid timestamp: {timestamp_str}")
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'Invalid timestamp'})
-                }
-            
-            # Convertir timestamp a número
-            timestamp = int(timestamp_str)
-            
-            print(f"Deleting analysis for user: {user_id[:8]}... timestamp: {timestamp}")
-            
-            # Eliminar de DynamoDB
-            response = table.delete_item(
-                Key={
-                    'userId': user_id,
-                    'timestamp': timestamp
-                }
-            )
-            
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'body': json.dumps({
-                    'message': 'Análisis eliminado exitosamente',
-                    'userId': user_id,
-                    'timestamp': timestamp
-                }, default=decimal_default)
-            }
+    print(f"Bulk deleting {len(items)} analyses for user: {user_id[:8]}...")
+    
+    # BatchWriteItem de a 25 en paralelo; agregados y detalles de S3 de los borrados
+    errors = delete_items(dynamodb, table, stats_table, s3, items)
+    for item, error in zip(items, errors):
+        timestamp = int(item['timestamp'])
+        if error:
+            results[positions[timestamp]] = {'timestamp': timestamp, 'status': 'error', 'error': error}
         else:
-            return {
-                'statusCode': 405,
-                'headers': headers,
-                'body': json.dumps({'error': 'Método no permitido'})
-            }
-            
-    except ValueError as e:
-        print(f'Value error: {str(e)}')
-        return {
-            'statusCode': 400,
-            'headers': headers,
-            'body': json.dumps({'error': 'Invalid parameter format'})
-        }
-    except Exception as e:
-        print(f'Unexpected error: {str(e)}')
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({'error': 'Internal server error'})
-        }
+            results[positions[timestamp]] = {'timestamp': timestamp, 'status': 'deleted'}
+    
+    counts = {status: sum(1 for result in results if result['status'] == status) for status in ('deleted', 'not_found', 'error')}
+    return {
+        'success': counts['error'] == 0,
+        'deleted': counts['deleted'],
+        'notFound': counts['not_found'],
+        'failed': counts['error'],
+        'remaining': remaining,
+        'results': results
+    }
+
+@router.route('DELETE')
+def delete_analysis(request):
+    # Log de intento (sin datos sensibles)
+    print(f"DELETE request from IP: {request.source_ip}")
+    
+    # Obtener parámetros
+    query_params = request.params
+    body = request.body
+    user_id = query_params.get('userId') or body.get('userId')
+    timestamp_str = query_params.get('timestamp')
+    
+    # Eliminación en lote: {"timestamps": [...]} en el body, rango from/to o all=true (query o body)
+    params = {**body, **query_params}
+    if 'timestamps' in params or 'from' in params or 'to' in params or 'all' in params:
+        return bulk_delete(user_id, params)
+    
+    # Validaciones de seguridad
+    if not user_id or not timestamp_str:
+        print("Missing required parameters")
+        raise HttpError(400, 'userId y timestamp son requeridos')
+    
+    if not validate_user_id(user_id):
+        print(f"Invalid userId format: {user_id}")
+        raise HttpError(400, 'Invalid userId format')
+    
+    if not validate_timestamp(timestamp_str):
+        print(f"Invalid timestamp: {timestamp_str}")
+        raise HttpError(400, 'Invalid timestamp')
+    
+    # Convertir timestamp a número
+    timestamp = int(timestamp_str)
+    
+    print(f"Deleting analysis for user: {user_id[:8]}... timestamp: {timestamp}")
+    
+    # Eliminar de DynamoDB
+    response = table.delete_item(
+        Key={
+            'userId': user_id,
+            'timestamp': timestamp
+        },
+        ReturnValues='ALL_OLD'
+    )
+    
+    # Descontar de los agregados solo si el análisis existía (y recalcular lastAnalysis si era el último)
+    deleted = response.get('Attributes')
+    if deleted:
+        try:
+            record_analysis(stats_table, user_id, timestamp, detection_type_of(deleted), delta=-1, analysis_table=table)
+        except Exception as e:
+            print(f'Stats update error: {str(e)}')
+        # Detalle en S3 (análisis grandes); un objeto huérfano no afecta al historial
+        try:
+            delete_detail(s3, deleted)
+        except Exception as e:
+            print(f'Detail delete error: {str(e)}')
+    
+    return {
+        'message': 'Análisis eliminado exitosamente',
+        'userId': user_id,
+        'timestamp': timestamp
+    }
+
+def lambda_handler(event, context):
+    return router(event, context)
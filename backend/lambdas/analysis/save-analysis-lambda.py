@@ -1,55 +1,165 @@
-import json
-import boto3
-from decimal import Decimal
+import os
+from analysis_codec import delete_replaced_details, prepare_item, store_details
+from aws_clients import lazy_client, lazy_table
+from batch_write import batch_write
+from http_api import HttpError, Router
+from idempotency import (DUPLICATE, IDEMPOTENCY_ATTRIBUTE, SAVED, UPDATED, DedupeCache, conditional_put, content_key,
+                         release_key, request_key, stored_items)
+from stats_store import STATS_TABLE, detection_type_of, record_analyses, record_analysis, record_type_changes
 
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-table = dynamodb.Table('epi-user-analysis')
+ANALYSIS_TABLE = 'epi-user-analysis'
 
-def lambda_handler(event, context):
+# Modo batch: cantidad máxima de análisis por request
+MAX_SAVE_BATCH = int(os.environ.get('MAX_SAVE_BATCH', '500'))
+
+dynamodb = lazy_client('dynamodb', region_name='us-east-1')
+table = lazy_table(ANALYSIS_TABLE, region_name='us-east-1')
+stats_table = lazy_table(STATS_TABLE, region_name='us-east-1')
+# Detalles que superan DETAIL_OFFLOAD_BYTES van a S3 (analysis_codec), después de escribir el item
+s3 = lazy_client('s3', region_name='us-east-1')
+# Claves de idempotencia ya aplicadas en este contenedor: (userId, timestamp, clave)
+recent = DedupeCache()
+
+router = Router(allow_headers='Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,Idempotency-Key')
+
+def save_batch(user_id, analyses):
+    """Guarda varios análisis del usuario con BatchWriteItem; devuelve el estado de cada uno en orden"""
+    results = [None] * len(analyses)
+    # Un lote no admite claves repetidas: si dos análisis comparten timestamp, queda el último
+    positions = {}
+    for index, analysis_data in enumerate(analyses):
+        try:
+            timestamp = int(analysis_data['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            results[index] = {'status': 'error', 'error': 'timestamp requerido'}
+            continue
+        if timestamp in positions:
+            results[positions[timestamp]] = {'timestamp': timestamp, 'status': 'duplicate'}
+        positions[timestamp] = index
+    
+    # Idempotencia por análisis (hash del contenido): los ya aplicados en el contenedor
+    # o guardados con la misma clave no se reescriben ni se vuelven a contar
+    keys = {timestamp: content_key(user_id, analyses[index]) for timestamp, index in positions.items()}
+    for timestamp, index in list(positions.items()):
+        if recent.seen((user_id, timestamp, keys[timestamp])):
+            results[index] = {'timestamp': timestamp, 'status': DUPLICATE}
+            del positions[timestamp]
+    stored = stored_items(dynamodb, ANALYSIS_TABLE, user_id, list(positions))
+    for timestamp, index in list(positions.items()):
+        if timestamp in stored and stored[timestamp].get(IDEMPOTENCY_ATTRIBUTE) == keys[timestamp]:
+            results[index] = {'timestamp': timestamp, 'status': DUPLICATE}
+            recent.remember((user_id, timestamp, keys[timestamp]))
+            del positions[timestamp]
+    
+    items, details = [], {}
+    for timestamp, index in positions.items():
+        item, detail = prepare_item(user_id, timestamp, analyses[index])
+        items.append({**item, IDEMPOTENCY_ATTRIBUTE: keys[timestamp]})
+        if detail is not None:
+            details[timestamp] = detail
+    errors = batch_write(dynamodb, ANALYSIS_TABLE, [{'PutRequest': {'Item': item}} for item in items], ('userId', 'timestamp'))
+    
+    # Detalles en S3 solo de los items escritos; si una subida falla se libera la clave del item
+    written = [item for item, error in zip(items, errors) if not error]
+    pending = [(item, details[item['timestamp']]) for item in written if item['timestamp'] in details]
+    upload_errors = {item['timestamp']: error for (item, _), error in zip(pending, store_details(s3, pending)) if error}
+    for timestamp in upload_errors:
+        release_key(table, user_id, timestamp, keys[timestamp])
+    
+    saved = []
+    replaced = []
+    for item, error in zip(items, errors):
+        timestamp = item['timestamp']
+        index = positions[timestamp]
+        if error:
+            results[index] = {'timestamp': timestamp, 'status': 'error', 'error': error}
+            continue
+        # Reescribir un análisis existente (otro contenido) no suma a los agregados;
+        # si cambió el DetectionType se mueve su contador por tipo
+        if timestamp in stored:
+            replaced.append((stored[timestamp], item))
+        else:
+            saved.append((user_id, timestamp, detection_type_of(item['analysisData'])))
+        if timestamp in upload_errors:
+            results[index] = {'timestamp': timestamp, 'status': 'error', 'error': upload_errors[timestamp]}
+            continue
+        recent.remember((user_id, timestamp, keys[timestamp]))
+        results[index] = {'timestamp': timestamp, 'status': UPDATED if timestamp in stored else SAVED}
+    
+    try:
+        delete_replaced_details(s3, replaced)
+    except Exception as e:
+        print(f'Detail delete error: {str(e)}')
+    
     try:
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-        
-        user_id = body.get('userId')
-        analysis_data = body.get('analysisData')
-        
-        # Convertir floats a Decimal para DynamoDB
-        def convert_floats(obj):
-            if isinstance(obj, float):
-                return Decimal(str(obj))
-            elif isinstance(obj, dict):
-                return {k: convert_floats(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_floats(v) for v in obj]
-            return obj
-        
-        analysis_data = convert_floats(analysis_data)
-        
-        # Guardar en DynamoDB
-        table.put_item(
-            Item={
-                'userId': user_id,
-                'timestamp': int(analysis_data['timestamp']),
-                'analysisData': analysis_data
-            }
-        )
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-                'Access-Control-Allow-Methods': 'POST,OPTIONS,GET'
-            },
-            'body': json.dumps({'success': True})
-        }
-        
+        record_analyses(stats_table, saved)
+        record_type_changes(stats_table, [(detection_type_of(old), detection_type_of(new['analysisData']))
+                                          for old, new in replaced])
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-                'Access-Control-Allow-Methods': 'POST,OPTIONS,GET'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        print(f'Stats update error: {str(e)}')
+    return results
+
+@router.route('POST')
+def save_analysis(request):
+    # Los números con decimales llegan como Decimal, listos para DynamoDB
+    body = request.body
+    
+    user_id = body.get('userId')
+    
+    # Modo batch: {"userId": ..., "analyses": [analysisData, ...]} (frames de realtime_epp o video)
+    if 'analyses' in body:
+        analyses = body.get('analyses') or []
+        if not isinstance(analyses, list) or len(analyses) > MAX_SAVE_BATCH:
+            raise HttpError(400, f'analyses debe ser una lista de hasta {MAX_SAVE_BATCH} análisis')
+        results = save_batch(user_id, analyses)
+        saved = sum(1 for result in results if result['status'] in (SAVED, UPDATED))
+        duplicates = sum(1 for result in results if result['status'] == DUPLICATE)
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return {'success': failed == 0, 'saved': saved, 'duplicates': duplicates, 'failed': failed, 'results': results}
+    
+    analysis_data = body.get('analysisData')
+    timestamp = int(analysis_data['timestamp'])
+    
+    # Clave de idempotencia (del cliente o hash del contenido); un reintento ya aplicado
+    # en este contenedor corta acá
+    try:
+        key = request_key(request.event, body, user_id, analysis_data)
+    except ValueError as e:
+        raise HttpError(400, str(e))
+    if recent.seen((user_id, timestamp, key)):
+        return {'success': True, 'status': DUPLICATE}
+    
+    # Guardar en DynamoDB (formato compacto si COMPACT_STORAGE=true, detalle grande en S3);
+    # el put condicional no reescribe un item guardado con la misma clave
+    item, detail = prepare_item(user_id, timestamp, analysis_data)
+    status, previous = conditional_put(table, item, key)
+    if status == DUPLICATE:
+        recent.remember((user_id, timestamp, key))
+        return {'success': True, 'status': status}
+    
+    # Actualizar agregados solo si el análisis es nuevo; uno reescrito solo mueve su contador
+    # por tipo si cambió el DetectionType
+    try:
+        if status == SAVED:
+            record_analysis(stats_table, user_id, timestamp, detection_type_of(analysis_data))
+        else:
+            record_type_changes(stats_table, [(detection_type_of(previous), detection_type_of(analysis_data))])
+    except Exception as e:
+        print(f'Stats update error: {str(e)}')
+    
+    # El detalle va a S3 recién con el item escrito; si la subida falla, el reintento
+    # del cliente con la misma clave vuelve a escribir (sin volver a sumar)
+    if detail is not None and store_details(s3, [(item, detail)])[0]:
+        release_key(table, user_id, timestamp, key)
+        raise HttpError(502, 'No se pudo guardar el detalle del análisis')
+    if previous:
+        try:
+            delete_replaced_details(s3, [(previous, item)])
+        except Exception as e:
+            print(f'Detail delete error: {str(e)}')
+    recent.remember((user_id, timestamp, key))
+    
+    return {'success': True, 'status': status}
+
+def lambda_handler(event, context):
+    return router(event, context)
@@ -1,80 +1,52 @@
-import json
-import boto3
-from decimal import Decimal
+from aws_clients import lazy_client, lazy_table
+from http_api import Router
+from role_index import ROLE_INDEX_TABLE, is_initialized, users_with_roles
+from stats_store import STATS_TABLE
+from user_directory import get_users
 
 # Inicializar clientes AWS
-cognito = boto3.client('cognito-idp')
+cognito = lazy_client('cognito-idp')
+index_table = lazy_table(ROLE_INDEX_TABLE)
+# Snapshot del directorio en la misma tabla que invalida epi-admin-actions
+cache_table = lazy_table(STATS_TABLE)
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+# La marca de reconcile no se borra: una vez vista no se vuelve a leer en el contenedor
+index_ready = False
 
-def lambda_handler(event, context):
-    print(f"Event received: {json.dumps(event, default=str)}")
+router = Router(allow_headers='Content-Type', error_message='Error interno del servidor')
+
+@router.route('GET')
+def get_supervisors(request):
+    global index_ready
+    user_pool_id = 'us-east-1_zrdfN7OKN'  # User Pool de epi-dashboard
     
-    # Headers CORS
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type',
-        'Access-Control-Allow-Methods': 'GET,OPTIONS'
-    }
+    if not index_ready:
+        index_ready = is_initialized(index_table)
+    
+    supervisors = []
+    if index_ready:
+        # Una query por rol sobre el índice mantenido por epi-admin-actions
+        supervisors = users_with_roles(index_table, ['supervisor', 'admin'])
+    else:
+        # Sin role_index.py reconcile el índice solo tiene los cambios de rol posteriores:
+        # recorrer el directorio
+        for user in get_users(cognito, user_pool_id, cache_table):
+            # Solo incluir supervisores y admins
+            if user.role in ['supervisor', 'admin']:
+                supervisors.append({
+                    'username': user.username,
+                    'email': user.email,
+                    'name': user.name,
+                    'role': user.role
+                })
     
-    # Manejar OPTIONS para CORS
-    if event.get('httpMethod') == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': ''
-        }
+    # Ordenar por rol (admin primero) y luego por email
+    supervisors.sort(key=lambda x: (x['role'] != 'admin', x['email']))
     
-    try:
-        user_pool_id = 'us-east-1_zrdfN7OKN'  # User Pool de epi-dashboard
-        supervisors = []
-        
-        # Obtener todos los usuarios
-        paginator = cognito.get_paginator('list_users')
-        
-        for page in paginator.paginate(UserPoolId=user_pool_id):
-            for user in page['Users']:
-                # Buscar el atributo custom:role
-                role = 'user'  # Default
-                name = ''
-                email = ''
-                
-                for attr in user.get('Attributes', []):
-                    if attr['Name'] == 'custom:role':
-                        role = attr['Value']
-                    elif attr['Name'] == 'name':
-                        name = attr['Value']
-                    elif attr['Name'] == 'email':
-                        email = attr['Value']
-                
-                # Solo incluir supervisores y admins
-                if role in ['supervisor', 'admin']:
-                    supervisors.append({
-                        'username': user['Username'],
-                        'email': email,
-                        'name': name,
-                        'role': role
-                    })
-        
-        # Ordenar por rol (admin primero) y luego por email
-        supervisors.sort(key=lambda x: (x['role'] != 'admin', x['email']))
-        
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                'supervisors': supervisors,
-                'count': len(supervisors)
-            }, default=decimal_default)
-        }
-        
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({'error': 'Error interno del servidor'})
-        }
\ No newline at end of file
+    return {
+        'supervisors': supervisors,
+        'count': len(supervisors)
+    }
+
+def lambda_handler(event, context):
+    return router(event, context)
@@ -0,0 +1,406 @@
+"""Formato compacto de los items de epi-user-analysis.
+
+Un item compacto guarda en analysisData solo los campos de resumen (tipo,
+timestamp, imagen, umbral, conteos de Summary, EPPs seleccionados) y el resto
+de la respuesta de Rekognition (ProtectiveEquipment, Labels, aiSummary, ...)
+como JSON comprimido con zlib en el atributo binario 'detail':
+
+    {'userId', 'timestamp', 'analysisData': {...resumen}, 'compliance': {...},
+     'detail': <zlib(JSON)>, 'encoding': 'zlib-json/1'}
+
+'compliance' trae personas evaluables y conformes calculadas al guardar, para
+listar sin descomprimir. Si el detalle (JSON) supera DETAIL_OFFLOAD_BYTES, el
+blob va a DETAIL_BUCKET y el item guarda solo el resumen y 'detailKey';
+fetch_details() los descarga en paralelo cuando se piden.
+
+save-analysis arma el item con prepare_item() y sube el detalle con
+store_details() recién después de que la escritura condicional se aplicó: un
+duplicado rechazado no deja objetos sueltos. Al reemplazar un análisis,
+delete_replaced_details() borra el objeto anterior si el nuevo ya no lo usa.
+decode_analysis() devuelve el analysisData original de items compactos, con
+detalle en S3 o con el formato anterior.
+
+Para listar sin leer el análisis, todo item lleva además 'summary', la fila del
+listado precalculada al guardar (campos de resumen y cumplimiento, ver
+summary_row()). El GSI de resumen (mismas claves que la tabla, proyección
+INCLUDE de SUMMARY_INDEX_ATTRIBUTES) copia solo esa fila: ni el analysisData ni
+el detalle se escriben dos veces. summarize_analysis() devuelve la fila de cada
+item (o la arma en items anteriores a 'summary'). Todo item lleva
+además 'typeTs' ('<DetectionType>#<timestamp de 13 dígitos>'), sort key del GSI
+por tipo que permite pedir un tipo en un rango de fechas con una sola query.
+
+migrate e index-types escriben por segmento del scan, con la condición de que
+idempotencyKey no haya cambiado desde la lectura: un guardado concurrente
+prevalece sobre la reescritura.
+
+    python analysis_codec.py migrate [--dry-run]      # items existentes -> compacto
+    python analysis_codec.py expand                   # vuelta al formato anterior
+    python analysis_codec.py index-types [--dry-run]  # typeTs y summary en items anteriores
+"""
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from compliance import compliance_metrics
+from decimal_json import decimal_default
+from dynamodb_items import serialize
+from idempotency import IDEMPOTENCY_ATTRIBUTE
+from parallel_scan import build_projection, parallel_scan
+
+ENCODING = 'zlib-json/1'
+COMPACT_STORAGE = os.environ.get('COMPACT_STORAGE', 'false').lower() == 'true'
+ANALYSIS_TABLE = os.environ.get('ANALYSIS_TABLE', 'epi-user-analysis')
+DETAIL_BUCKET = os.environ.get('DETAIL_BUCKET', 'rekognition-gcontreras')
+DETAIL_PREFIX = os.environ.get('DETAIL_PREFIX', 'analysis-detail/')
+DETAIL_OFFLOAD_BYTES = int(os.environ.get('DETAIL_OFFLOAD_BYTES', '65536'))
+DETAIL_FETCH_CONCURRENCY = int(os.environ.get('DETAIL_FETCH_CONCURRENCY', '8'))
+
+# Campos que quedan legibles en analysisData; el resto va a 'detail'
+SUMMARY_FIELDS = ('analysisId', 'timestamp', 'DetectionType', 'imageUrl', 'MinConfidence', 'Summary', 'selectedEPPs')
+# Fila del listado precalculada al guardar; es lo único que proyecta el GSI de resumen
+SUMMARY_ATTRIBUTE = 'summary'
+SUMMARY_INDEX_ATTRIBUTES = (SUMMARY_ATTRIBUTE,)
+# Sort key del GSI por tipo (userId, typeTs), con la misma proyección
+TYPE_SORT_KEY = 'typeTs'
+MAX_TIMESTAMP = 10 ** 13 - 1
+PPE_TYPES = ('ppe_detection', 'realtime_epp')
+
+
+def compliance_summary(analysis_data):
+    """Personas detectadas, evaluables y conformes de un análisis EPP (None para otros tipos)"""
+    if analysis_data.get('DetectionType') not in PPE_TYPES or 'ProtectiveEquipment' not in analysis_data:
+        return None
+    metrics = compliance_metrics(analysis_data, analysis_data.get('selectedEPPs') or [])
+    return {
+        'persons': metrics['total_persons_detected'],
+        'evaluable': metrics['total_persons'],
+        'compliant': metrics['compliant']
+    }
+
+
+def summary_row(analysis_data, compliance=None):
+    """Fila del listado de un análisis: campos de resumen y, en análisis EPP, su cumplimiento"""
+    row = {key: analysis_data[key] for key in SUMMARY_FIELDS if key in analysis_data}
+    if compliance is None:
+        compliance = compliance_summary(analysis_data)
+    if compliance is not None:
+        row['compliance'] = compliance
+    return row
+
+
+def type_sort_key(detection_type, timestamp):
+    """typeTs de un análisis: ordena por tipo y, dentro del tipo, por timestamp"""
+    return f'{detection_type}#{int(timestamp):013d}'
+
+
+def _dumps(value):
+    return json.dumps(value, default=decimal_default, separators=(',', ':')).encode('utf-8')
+
+
+def detail_key(user_id, timestamp):
+    return f'{DETAIL_PREFIX}{user_id}/{timestamp}.json.zlib'
+
+
+def _encode(user_id, timestamp, analysis_data, offload):
+    """(item compacto, blob del detalle a subir a S3 o None)"""
+    summary = {key: analysis_data[key] for key in SUMMARY_FIELDS if key in analysis_data}
+    detail = {key: value for key, value in analysis_data.items() if key not in summary}
+    raw = _dumps(detail)
+    blob = zlib.compress(raw, 6)
+    item = {
+        'userId': user_id,
+        'timestamp': timestamp,
+        'analysisData': summary,
+        TYPE_SORT_KEY: type_sort_key(analysis_data.get('DetectionType') or 'unknown', timestamp),
+        'encoding': ENCODING
+    }
+    pending = None
+    if offload and len(raw) > DETAIL_OFFLOAD_BYTES:
+        item['detailKey'] = detail_key(user_id, timestamp)
+        pending = blob
+    else:
+        item['detail'] = blob
+    compliance = compliance_summary(analysis_data)
+    if compliance is not None:
+        item['compliance'] = compliance
+    item[SUMMARY_ATTRIBUTE] = summary_row(analysis_data, compliance)
+    return item, pending
+
+
+def _plain_item(user_id, timestamp, analysis_data):
+    """Item en el formato original (analysisData completo)"""
+    return {
+        'userId': user_id,
+        'timestamp': timestamp,
+        'analysisData': analysis_data,
+        TYPE_SORT_KEY: type_sort_key(analysis_data.get('DetectionType') or 'unknown', timestamp),
+        SUMMARY_ATTRIBUTE: summary_row(analysis_data)
+    }
+
+
+def _upload(s3, key, blob):
+    s3.put_object(Bucket=DETAIL_BUCKET, Key=key, Body=blob, ContentType='application/octet-stream')
+
+
+def encode_item(user_id, timestamp, analysis_data, s3=None):
+    """Item compacto para put_item (con el detalle en S3 si es grande y hay cliente).
+
+    Sube el detalle antes de devolver el item: sirve para reescribir items que
+    ya existen (migrate), donde el item nunca apunta a un objeto que no existe.
+    """
+    item, pending = _encode(user_id, timestamp, analysis_data, s3 is not None)
+    if pending is not None:
+        _upload(s3, item['detailKey'], pending)
+    return item
+
+
+def prepare_item(user_id, timestamp, analysis_data, compact=None):
+    """(item, detalle pendiente) para un guardado nuevo en el formato configurado (COMPACT_STORAGE).
+
+    Un análisis que supera DETAIL_OFFLOAD_BYTES se guarda compacto con
+    'detailKey' aunque COMPACT_STORAGE esté apagado; el detalle pendiente (o
+    None) se sube con store_details() después de escribir el item.
+    """
+    if compact is None:
+        compact = COMPACT_STORAGE
+    if compact or len(_dumps(analysis_data)) > DETAIL_OFFLOAD_BYTES:
+        return _encode(user_id, timestamp, analysis_data, True)
+    return _plain_item(user_id, timestamp, analysis_data), None
+
+
+def build_item(user_id, timestamp, analysis_data, compact=None, s3=None):
+    """Item para epi-user-analysis en el formato configurado (COMPACT_STORAGE).
+
+    Con s3, un análisis que supera DETAIL_OFFLOAD_BYTES se guarda compacto con
+    el detalle en S3 (subido antes de devolver el item) aunque COMPACT_STORAGE
+    esté apagado.
+    """
+    if compact is None:
+        compact = COMPACT_STORAGE
+    if compact or (s3 is not None and len(_dumps(analysis_data)) > DETAIL_OFFLOAD_BYTES):
+        return encode_item(user_id, timestamp, analysis_data, s3)
+    return _plain_item(user_id, timestamp, analysis_data)
+
+
+def store_details(s3, pending, max_workers=DETAIL_FETCH_CONCURRENCY):
+    """Sube en paralelo los detalles pendientes [(item, blob)] de items ya escritos; devuelve el error por item (o None)"""
+    if not pending:
+        return []
+
+    def upload(entry):
+        item, blob = entry
+        try:
+            _upload(s3, item['detailKey'], blob)
+            return None
+        except Exception as e:
+            print(f'Detail upload error for {item["detailKey"]}: {str(e)}')
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+        return list(executor.map(upload, pending))
+
+
+def delete_replaced_details(s3, replaced):
+    """Borra los detalles en S3 de items reemplazados [(item anterior, item nuevo)] que el nuevo ya no usa"""
+    stale = [old for old, new in replaced if old and 'detailKey' in old and old['detailKey'] != new.get('detailKey')]
+    if stale:
+        delete_details(s3, stale)
+
+
+def is_compact(item):
+    return item.get('encoding') == ENCODING
+
+
+def _load_detail(blob):
+    return json.loads(zlib.decompress(getattr(blob, 'value', blob)), parse_float=Decimal)
+
+
+def fetch_details(s3, items, max_workers=DETAIL_FETCH_CONCURRENCY):
+    """Detalles en S3 de los items que los tienen, descargados en paralelo: {detailKey: detalle}"""
+    keys = [item['detailKey'] for item in items if 'detailKey' in item]
+    if not keys:
+        return {}
+
+    def fetch(key):
+        try:
+            body = s3.get_object(Bucket=DETAIL_BUCKET, Key=key)['Body'].read()
+            return key, _load_detail(body)
+        except Exception as e:
+            print(f'Detail fetch error for {key}: {str(e)}')
+            return key, None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+        return {key: detail for key, detail in executor.map(fetch, keys) if detail is not None}
+
+
+def decode_analysis(item, details=None):
+    """analysisData completo de un item; items sin analysisData se devuelven tal cual.
+
+    Si el detalle está en S3 y no viene en details (fetch_details), se devuelve
+    el resumen con 'detailKey' para que el cliente lo pida aparte.
+    """
+    analysis_data = item.get('analysisData')
+    if analysis_data is None:
+        return item
+    if not is_compact(item):
+        return analysis_data
+    if 'detail' in item:
+        return {**analysis_data, **_load_detail(item['detail'])}
+    detail = (details or {}).get(item.get('detailKey'))
+    if detail is None:
+        return {**analysis_data, 'detailKey': item.get('detailKey')}
+    return {**analysis_data, **detail}
+
+
+def summary_projection():
+    """(ProjectionExpression, ExpressionAttributeNames) de la fila de resumen, para leer sin el GSI.
+
+    Incluye los campos sueltos para los items anteriores a 'summary'.
+    """
+    return build_projection(['userId', 'timestamp', SUMMARY_ATTRIBUTE, 'compliance', 'encoding', 'detailKey'] +
+                            [f'analysisData.{field}' for field in SUMMARY_FIELDS])
+
+
+def summarize_analysis(item):
+    """Campos de resumen y cumplimiento de un item (completo, proyectado o del GSI) para listar"""
+    if SUMMARY_ATTRIBUTE in item:
+        return item[SUMMARY_ATTRIBUTE]
+    analysis_data = item.get('analysisData') or {}
+    summary = {key: analysis_data[key] for key in SUMMARY_FIELDS if key in analysis_data}
+    compliance = item.get('compliance')
+    if compliance is None and not is_compact(item):
+        # Formato anterior: se calcula si vino el análisis completo
+        compliance = compliance_summary(analysis_data)
+    if compliance is not None:
+        summary['compliance'] = compliance
+    return summary
+
+
+def delete_detail(s3, item):
+    """Elimina el objeto de detalle de un item borrado (si lo tenía)"""
+    if item and 'detailKey' in item:
+        s3.delete_object(Bucket=DETAIL_BUCKET, Key=item['detailKey'])
+
+
+def delete_details(s3, items):
+    """Elimina los objetos de detalle de varios items borrados con delete_objects de a 1000"""
+    keys = [item['detailKey'] for item in items if 'detailKey' in item]
+    for start in range(0, len(keys), 1000):
+        s3.delete_objects(Bucket=DETAIL_BUCKET, Delete={
+            'Objects': [{'Key': key} for key in keys[start:start + 1000]],
+            'Quiet': True
+        })
+
+
+def _unchanged(item):
+    """Parámetros de condición que se cumplen solo si el item sigue como se leyó.
+
+    Cada guardado escribe idempotencyKey: si otro guardado (o un borrado) pasa
+    durante migrate/index-types la condición falla y prevalece el guardado.
+    """
+    if IDEMPOTENCY_ATTRIBUTE in item:
+        return {'ConditionExpression': '#key = :key', 'ExpressionAttributeNames': {'#key': IDEMPOTENCY_ATTRIBUTE},
+                'ExpressionAttributeValues': serialize({':key': item[IDEMPOTENCY_ATTRIBUTE]})}
+    return {'ConditionExpression': 'attribute_exists(#user) AND attribute_not_exists(#key)',
+            'ExpressionAttributeNames': {'#user': 'userId', '#key': IDEMPOTENCY_ATTRIBUTE}}
+
+
+def _rewrite_table(dynamodb, table_name, select, write, dry_run, max_workers, attributes=None):
+    """Escribe con write(item) los items que select(item) elige; devuelve (revisados, escritos).
+
+    Cada segmento del scan escribe su página en paralelo, fuera del lock de
+    parallel_scan; un write que falla (la condición de _unchanged incluida)
+    se informa y no cuenta.
+    """
+    counts = {'seen': 0, 'written': 0}
+    lock = threading.Lock()
+
+    def attempt(item):
+        try:
+            write(item)
+            return True
+        except Exception as e:
+            print(f'Rewrite error for {item["userId"][:8]}.../{item["timestamp"]}: {str(e)}')
+            return False
+
+    def consume(items):
+        pending = [item for item in items if select(item)]
+        written = len(pending) if dry_run else 0
+        if pending and not dry_run:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+                written = sum(executor.map(attempt, pending))
+        with lock:
+            counts['seen'] += len(items)
+            counts['written'] += written
+
+    parallel_scan(dynamodb, table_name, consume, attributes=attributes, serialized=False)
+    return counts['seen'], counts['written']
+
+
+def migrate(dynamodb, table_name, expand=False, dry_run=False, s3=None, max_workers=8):
+    """Reescribe los items al formato compacto (o al anterior con expand); devuelve (revisados, reescritos).
+
+    Con s3 los detalles grandes se mueven a S3; expand deja en S3 los que ya están ahí.
+    """
+    def select(item):
+        return 'analysisData' in item and is_compact(item) == expand and 'detailKey' not in item
+
+    def write(item):
+        rewritten = build_item(item['userId'], item['timestamp'], decode_analysis(item), compact=not expand, s3=s3)
+        # Conservar atributos agregados por otras versiones del guardado
+        for key, value in item.items():
+            if key not in rewritten and key not in ('detail', 'detailKey', 'encoding', 'compliance'):
+                rewritten[key] = value
+        dynamodb.put_item(TableName=table_name, Item=serialize(rewritten), **_unchanged(item))
+
+    return _rewrite_table(dynamodb, table_name, select, write, dry_run, max_workers)
+
+
+def index_types(dynamodb, table_name, dry_run=False, max_workers=8):
+    """Agrega typeTs y summary a los items guardados antes de los GSI; devuelve (revisados, actualizados)"""
+    def select(item):
+        return TYPE_SORT_KEY not in item or SUMMARY_ATTRIBUTE not in item
+
+    def write(item):
+        analysis_data = item.get('analysisData') or {}
+        condition = _unchanged(item)
+        dynamodb.update_item(
+            TableName=table_name,
+            Key=serialize({'userId': item['userId'], 'timestamp': item['timestamp']}),
+            UpdateExpression='SET #typeTs = :typeTs, #summary = :summary',
+            ConditionExpression=condition['ConditionExpression'],
+            ExpressionAttributeNames={**condition['ExpressionAttributeNames'], '#typeTs': TYPE_SORT_KEY,
+                                      '#summary': SUMMARY_ATTRIBUTE},
+            ExpressionAttributeValues={**condition.get('ExpressionAttributeValues', {}), **serialize({
+                ':typeTs': type_sort_key(analysis_data.get('DetectionType') or 'unknown', item['timestamp']),
+                ':summary': summarize_analysis(item)
+            })}
+        )
+
+    # Sin 'detail': los items compactos ya traen 'compliance'; los demás lo calculan desde analysisData
+    return _rewrite_table(dynamodb, table_name, select, write, dry_run, max_workers,
+                          attributes=['userId', 'timestamp', TYPE_SORT_KEY, SUMMARY_ATTRIBUTE, IDEMPOTENCY_ATTRIBUTE,
+                                      'compliance', 'encoding', 'analysisData'])
+
+
+if __name__ == '__main__':
+    import argparse
+    import boto3
+
+    parser = argparse.ArgumentParser(description='Formato compacto de epi-user-analysis')
+    parser.add_argument('command', choices=['migrate', 'expand', 'index-types'])
+    parser.add_argument('--dry-run', action='store_true', help='solo contar los items a reescribir')
+    parser.add_argument('--region', default='us-east-1')
+    args = parser.parse_args()
+
+    dynamodb = boto3.client('dynamodb', region_name=args.region)
+    if args.command == 'index-types':
+        seen, written = index_types(dynamodb, ANALYSIS_TABLE, dry_run=args.dry_run)
+    else:
+        s3_client = boto3.client('s3', region_name=args.region)
+        seen, written = migrate(dynamodb, ANALYSIS_TABLE, expand=args.command == 'expand', dry_run=args.dry_run, s3=s3_client)
+    action = 'a reescribir' if args.dry_run else 'reescritos'
+    print(f'{args.command}: {seen} items revisados, {written} {action}')
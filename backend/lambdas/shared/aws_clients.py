@@ -0,0 +1,122 @@
+"""Clientes de AWS perezosos, compartidos por contenedor.
+
+Los handlers creaban sus clientes al importarse: cada boto3.client/resource
+carga y parsea el modelo JSON del servicio y arma su endpoint (el primero,
+además, la sesión y el loader), y boto3.resource suma la capa de recursos con
+un cliente propio. En un cold start se pagaban todos aunque el request no los
+usara: delete-analysis construye S3 y solo lo usa si el análisis tiene detalle,
+epi-admin-users solo llama a Cognito cuando vence el directorio.
+
+lazy_client, lazy_resource y lazy_table devuelven un proxy que construye el
+objeto en el primer acceso a un atributo y lo memoiza en el registro del
+módulo: todos los handlers y módulos compartidos del contenedor usan la misma
+instancia, creada desde una única boto3.Session. boto3 se importa recién ahí.
+
+Las tablas de DynamoDB (lazy_table) son boto3.resource('dynamodb').Table:
+serializan Decimal, dict y conditions, y un solo recurso por contenedor sirve
+a todas. Los recursos no son thread-safe, así que se usan solo desde el hilo
+del handler; lo que reparte llamadas entre hilos (parallel_scan, batch_write)
+y las lecturas en lote reciben lazy_client('dynamodb'), que sí lo es, y
+convierten los items con dynamodb_items. Cognito, S3 y Bedrock son clientes
+de bajo nivel.
+
+Con provisioned concurrency el init no se cobra al usuario: AWS_CLIENTS_EAGER=1
+construye cada cliente al declararlo, como antes.
+
+Cada proxy usa el objeto envuelto por metrics.instrument: las llamadas quedan
+cronometradas y contadas en la invocación en curso.
+"""
+import os
+import threading
+import time
+from metrics import instrument
+
+EAGER = os.environ.get('AWS_CLIENTS_EAGER', '') == '1'
+
+_session = None
+_instances = {}
+_declared = []
+_lock = threading.RLock()
+
+# Segundos que tardó en construirse cada cliente ({(tipo, servicio, región): s}); lo lee bench_cold_start.py
+build_times = {}
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.Session()
+    return _session
+
+
+def _build(key):
+    """Instancia memoizada para key = (tipo, servicio o tabla, región)"""
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+    with _lock:
+        instance = _instances.get(key)
+        if instance is None:
+            kind, name, region = key
+            # La tabla no cuenta el recurso que la contiene (tiene su propia entrada)
+            dynamodb = _build(('resource', 'dynamodb', region)) if kind == 'table' else None
+            started = time.perf_counter()
+            if kind == 'client':
+                instance = _get_session().client(name, region_name=region)
+            elif kind == 'resource':
+                instance = _get_session().resource(name, region_name=region)
+            else:
+                instance = dynamodb.Table(name)
+            build_times[key] = time.perf_counter() - started
+            _instances[key] = instance
+    return instance
+
+
+class LazyClient:
+    """Proxy que construye el cliente en el primer uso"""
+    __slots__ = ('_key', '_target')
+
+    def __init__(self, key):
+        self._key = key
+        _declared.append(key)
+        self._target = None
+        if EAGER:
+            self._resolve()
+
+    def _resolve(self):
+        if self._target is None:
+            kind, name, _ = self._key
+            self._target = instrument(_build(self._key), 'dynamodb' if kind == 'table' else name)
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __repr__(self):
+        state = 'construido' if self._target is not None else 'pendiente'
+        return f'<LazyClient {self._key[0]} {self._key[1]} ({state})>'
+
+
+def lazy_client(service, region_name=None):
+    return LazyClient(('client', service, region_name))
+
+
+def lazy_resource(service, region_name=None):
+    return LazyClient(('resource', service, region_name))
+
+
+def lazy_table(name, region_name=None):
+    """dynamodb.Table(name) sobre el recurso compartido de la región"""
+    return LazyClient(('table', name, region_name))
+
+
+def preload():
+    """Construye los clientes declarados hasta ahora (lo que hace AWS_CLIENTS_EAGER=1 al importar)"""
+    for key in _declared:
+        _build(key)
+
+
+def declared():
+    """Claves (tipo, servicio o tabla, región) de los clientes declarados, construidos o no"""
+    return list(dict.fromkeys(_declared))
@@ -0,0 +1,83 @@
+"""Escrituras BatchWriteItem en lotes de 25 con reintento de UnprocessedItems.
+
+DynamoDB acepta hasta 25 requests por llamada y puede devolver parte de ellos
+sin procesar (throttling) o rechazar la llamada completa por exceso de
+throughput; ambos casos se reintentan con backoff exponencial con jitter.
+El resultado es una lista paralela a los requests con None (escrito) o el
+motivo del fallo, para informar el estado de cada item. Los lotes van en
+paralelo con el cliente de bajo nivel (ver dynamodb_items).
+"""
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from dynamodb_items import serialize
+
+BATCH_SIZE = 25
+MAX_ATTEMPTS = int(os.environ.get('BATCH_WRITE_MAX_ATTEMPTS', '8'))
+BASE_DELAY = float(os.environ.get('BATCH_WRITE_BASE_DELAY', '0.05'))
+MAX_DELAY = 2.0
+DEFAULT_CONCURRENCY = int(os.environ.get('BATCH_WRITE_CONCURRENCY', '4'))
+
+RETRYABLE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded',
+                    'InternalServerError')
+
+
+def _request_key(request, key_names):
+    values = request['PutRequest']['Item'] if 'PutRequest' in request else request['DeleteRequest']['Key']
+    return tuple(next(iter(values[name].items())) for name in key_names)
+
+
+def _serialize_request(request):
+    if 'PutRequest' in request:
+        return {'PutRequest': {'Item': serialize(request['PutRequest']['Item'])}}
+    return {'DeleteRequest': {'Key': serialize(request['DeleteRequest']['Key'])}}
+
+
+def _backoff(attempt):
+    time.sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt)))
+
+
+def _write_chunk(dynamodb, table_name, key_names, chunk):
+    """Escribe un lote; devuelve {índice: error} de los requests que no se pudieron escribir"""
+    pending = {_request_key(request, key_names): index for index, request in chunk}
+    requests = [request for _, request in chunk]
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            response = dynamodb.batch_write_item(RequestItems={table_name: requests})
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code not in RETRYABLE_ERRORS:
+                return {index: str(e) for index in pending.values()}
+            _backoff(attempt)
+            continue
+        requests = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not requests:
+            return {}
+        pending = {key: pending[key] for key in (_request_key(request, key_names) for request in requests)}
+        _backoff(attempt)
+    return {index: f'sin procesar tras {MAX_ATTEMPTS} intentos' for index in pending.values()}
+
+
+def batch_write(dynamodb, table_name, requests, key_names, max_workers=DEFAULT_CONCURRENCY):
+    """Escribe PutRequest/DeleteRequest de una tabla con el cliente dynamodb; devuelve None o el error por request.
+
+    Las claves (key_names) deben ser únicas entre los requests: DynamoDB rechaza
+    un lote con claves repetidas.
+    """
+    indexed = list(enumerate(_serialize_request(request) for request in requests))
+    chunks = [indexed[start:start + BATCH_SIZE] for start in range(0, len(indexed), BATCH_SIZE)]
+    errors = [None] * len(requests)
+    if not chunks:
+        return errors
+
+    def run(chunk):
+        return _write_chunk(dynamodb, table_name, key_names, chunk)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        for chunk_errors in executor.map(run, chunks):
+            for index, error in chunk_errors.items():
+                errors[index] = error
+    return errors
@@ -0,0 +1,139 @@
+"""Eliminación en lote de análisis de epi-user-analysis.
+
+BatchWriteItem borra de a 25 claves por llamada (batch_write: lotes en paralelo
+y reintento de UnprocessedItems), pero a diferencia de delete_item no devuelve
+el item borrado. Por eso primero se leen los items con una proyección mínima
+(timestamp, DetectionType y detailKey): los que no existen se informan como
+not_found, y con lo leído se descuentan los agregados (una actualización por
+usuario, día y tipo en lugar de tres por análisis) y se borran los detalles de
+S3 con delete_objects.
+
+Un análisis borrado por otro request entre la lectura y el lote se descuenta
+dos veces (ver record_analyses).
+
+    python bulk_delete.py purge --days 365 [--dry-run]   # retención, todos los usuarios
+"""
+import os
+from analysis_codec import ANALYSIS_TABLE, delete_details
+from batch_write import DEFAULT_CONCURRENCY, batch_write
+from dynamodb_items import batch_get
+from parallel_scan import build_projection, parallel_scan
+from stats_store import STATS_TABLE, detection_type_of, record_analyses
+
+# Análisis por request de delete-analysis en modo lote
+MAX_BULK_DELETE = int(os.environ.get('MAX_BULK_DELETE', '1000'))
+
+DELETE_ATTRIBUTES = ('userId', 'timestamp', 'analysisData.DetectionType', 'detailKey')
+
+
+def find_timestamps(dynamodb, table_name, user_id, timestamps):
+    """{timestamp: item proyectado} de los análisis del usuario que existen, con batch_get_item de a 100"""
+    projection, names = build_projection(DELETE_ATTRIBUTES)
+    keys = [{'userId': user_id, 'timestamp': timestamp} for timestamp in timestamps]
+    items = batch_get(dynamodb, table_name, keys, ProjectionExpression=projection, ExpressionAttributeNames=names)
+    return {int(item['timestamp']): item for item in items}
+
+
+def find_range(table, user_id, start=None, end=None, limit=MAX_BULK_DELETE, all_history=False):
+    """Hasta limit análisis del usuario con start <= timestamp <= end, los más antiguos primero.
+
+    Devuelve (items, quedan_más). Como los borrados dejan de aparecer, repetir la
+    misma consulta continúa donde terminó la anterior. Sin start ni end el rango
+    es todo el historial: solo con all_history, para que un límite perdido en el
+    request no lo borre entero.
+    """
+    if start is None and end is None and not all_history:
+        raise ValueError('find_range sin start ni end requiere all_history')
+    projection, names = build_projection(DELETE_ATTRIBUTES)
+    condition = '#user = :user'
+    names = {**names, '#user': 'userId'}
+    values = {':user': user_id}
+    if start is not None or end is not None:
+        names['#ts'] = 'timestamp'
+    if start is not None and end is not None:
+        condition += ' AND #ts BETWEEN :start AND :end'
+        values.update({':start': start, ':end': end})
+    elif start is not None:
+        condition += ' AND #ts >= :start'
+        values[':start'] = start
+    elif end is not None:
+        condition += ' AND #ts <= :end'
+        values[':end'] = end
+    query_params = {
+        'KeyConditionExpression': condition,
+        'ProjectionExpression': projection,
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values,
+        'Limit': limit + 1
+    }
+    items = []
+    while len(items) <= limit:
+        response = table.query(**query_params)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        query_params['Limit'] = limit + 1 - len(items)
+    return items[:limit], len(items) > limit
+
+
+def delete_items(dynamodb, table, stats_table, s3, items, max_workers=DEFAULT_CONCURRENCY):
+    """Borra items leídos con DELETE_ATTRIBUTES; devuelve None o el error de cada uno.
+
+    Los fallos de agregados o de S3 no invalidan el borrado (se registran).
+    """
+    requests = [{'DeleteRequest': {'Key': {'userId': item['userId'], 'timestamp': item['timestamp']}}} for item in items]
+    errors = batch_write(dynamodb, table.name, requests, ('userId', 'timestamp'), max_workers)
+    deleted = [item for item, error in zip(items, errors) if not error]
+    try:
+        record_analyses(stats_table, [(item['userId'], item['timestamp'], detection_type_of(item)) for item in deleted],
+                        delta=-1, analysis_table=table)
+    except Exception as e:
+        print(f'Stats update error: {str(e)}')
+    if s3 is not None:
+        try:
+            delete_details(s3, deleted)
+        except Exception as e:
+            print(f'Detail delete error: {str(e)}')
+    return errors
+
+
+def purge(table, dynamodb, stats_table, s3, before, dry_run=False):
+    """Elimina los análisis de todos los usuarios con timestamp < before (ms); devuelve (encontrados, eliminados)"""
+    counts = {'found': 0, 'deleted': 0}
+
+    def consume(items):
+        counts['found'] += len(items)
+        if items and not dry_run:
+            errors = delete_items(dynamodb, table, stats_table, s3, items)
+            for error in errors:
+                if error:
+                    print(f'Purge delete error: {error}')
+            counts['deleted'] += sum(1 for error in errors if not error)
+
+    parallel_scan(dynamodb, table.name, consume, attributes=DELETE_ATTRIBUTES,
+                  FilterExpression='#ts < :before',
+                  ExpressionAttributeNames={'#ts': 'timestamp'},
+                  ExpressionAttributeValues={':before': before})
+    return counts['found'], counts['deleted']
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    import boto3
+
+    parser = argparse.ArgumentParser(description='Eliminación en lote de análisis de epi-user-analysis')
+    parser.add_argument('command', choices=['purge'])
+    parser.add_argument('--days', type=int, required=True, help='conservar los análisis de los últimos N días')
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--region', default='us-east-1')
+    args = parser.parse_args()
+
+    resource = boto3.resource('dynamodb', region_name=args.region)
+    before = int((time.time() - args.days * 86400) * 1000)
+    found, deleted = purge(resource.Table(ANALYSIS_TABLE), boto3.client('dynamodb', region_name=args.region),
+                           resource.Table(STATS_TABLE),
+                           boto3.client('s3', region_name=args.region), before, dry_run=args.dry_run)
+    action = 'a eliminar' if args.dry_run else f'{deleted} eliminados'
+    print(f'Purge: {found} análisis anteriores a {before}, {action}')
@@ -0,0 +1,154 @@
+"""Motor de cumplimiento de EPP sobre la respuesta de Rekognition.
+
+flatten() recorre ProtectiveEquipment una sola vez y lo deja en columnas
+(máscara de partes visibles por persona; persona, tipo, parte y confianza por
+detección). evaluate() calcula sobre esas columnas personas evaluables,
+conteos por EPP, cumplimiento y máximos bajo umbral, con las partes del cuerpo
+y los EPPs codificados como bits en tablas fijas. Las mismas columnas sirven
+para evaluar otros EPPs requeridos u otro umbral sin volver a recorrer el
+análisis.
+
+Las confianzas pueden venir como float (frontend) o Decimal (DynamoDB).
+"""
+
+# Partes del cuerpo que devuelve Rekognition (y variantes de pie)
+PART_BITS = {
+    'HEAD': 1,
+    'FACE': 2,
+    'LEFT_HAND': 4,
+    'RIGHT_HAND': 8,
+    'FOOT': 16,
+    'LEFT_FOOT': 32,
+    'RIGHT_FOOT': 64
+}
+
+EPP_BITS = {
+    'HEAD_COVER': 1,
+    'EYE_COVER': 2,
+    'FACE_COVER': 4,
+    'HAND_COVER': 8,
+    'FOOT_COVER': 16,
+    'EAR_COVER': 32
+}
+
+# Partes que deben verse para poder evaluar cada EPP
+EVALUABLE_PARTS = {
+    'HEAD_COVER': PART_BITS['HEAD'],
+    'EYE_COVER': PART_BITS['FACE'],
+    'FACE_COVER': PART_BITS['FACE'],
+    'HAND_COVER': PART_BITS['LEFT_HAND'] | PART_BITS['RIGHT_HAND'],
+    'FOOT_COVER': PART_BITS['FOOT'],
+    'EAR_COVER': PART_BITS['HEAD']
+}
+
+# Partes sobre las que una detección de cada EPP es coherente
+VALID_PARTS = {
+    'HEAD_COVER': PART_BITS['HEAD'],
+    'EYE_COVER': PART_BITS['FACE'] | PART_BITS['HEAD'],
+    'FACE_COVER': PART_BITS['FACE'],
+    'HAND_COVER': PART_BITS['LEFT_HAND'] | PART_BITS['RIGHT_HAND'],
+    'FOOT_COVER': PART_BITS['FOOT'] | PART_BITS['LEFT_FOOT'] | PART_BITS['RIGHT_FOOT'],
+    'EAR_COVER': PART_BITS['HEAD']
+}
+
+
+class EquipmentColumns:
+    """ProtectiveEquipment aplanado: una fila por persona y una por detección"""
+
+    __slots__ = ('person_parts', 'person', 'epp', 'part', 'confidence')
+
+    def __init__(self):
+        self.person_parts = []
+        self.person = []
+        self.epp = []
+        self.part = []
+        self.confidence = []
+
+
+def flatten(protective_equipment):
+    """Columnas de un ProtectiveEquipment en una sola pasada.
+
+    Las detecciones incoherentes con su parte del cuerpo (o de tipos
+    desconocidos) se descartan acá, así evaluate() no vuelve a validarlas.
+    """
+    columns = EquipmentColumns()
+    person_parts = columns.person_parts
+    person_column = columns.person
+    epp_column = columns.epp
+    part_column = columns.part
+    confidence_column = columns.confidence
+    for index, person in enumerate(protective_equipment):
+        mask = 0
+        for body_part in person.get('BodyParts', []):
+            part = PART_BITS.get(body_part.get('Name'), 0)
+            mask |= part
+            for equipment in body_part.get('EquipmentDetections', []):
+                epp_type = equipment.get('Type')
+                if VALID_PARTS.get(epp_type, 0) & part:
+                    person_column.append(index)
+                    epp_column.append(epp_type)
+                    part_column.append(part)
+                    confidence_column.append(float(equipment.get('Confidence', 0)))
+        person_parts.append(mask)
+    return columns
+
+
+def evaluate(columns, required_epps, min_confidence):
+    """Cumplimiento sobre columnas de flatten().
+
+    - evaluables: personas con al menos una parte visible de algún EPP requerido
+    - epp_detected: detecciones >= umbral por tipo (de personas evaluables)
+    - compliant: personas evaluables con todos los EPPs requeridos >= umbral
+    - below_threshold_*: detecciones < umbral de EPPs requeridos, cantidad y máxima confianza
+    """
+    required_parts = 0
+    required_bits = 0
+    for epp in required_epps:
+        required_parts |= EVALUABLE_PARTS.get(epp, 0)
+        required_bits |= EPP_BITS.get(epp, 0)
+    # Un EPP requerido sin tabla no puede detectarse: nadie cumple
+    can_comply = bool(required_epps) and all(epp in EPP_BITS for epp in required_epps)
+    required_set = set(required_epps)
+    threshold = float(min_confidence)
+
+    evaluable = [mask & required_parts != 0 for mask in columns.person_parts]
+    person_epps = [0] * len(evaluable)
+    epp_detected = {}
+    below_threshold_epps = {}
+    below_threshold_max_conf = {}
+    for person, epp_type, confidence in zip(columns.person, columns.epp, columns.confidence):
+        if not evaluable[person]:
+            continue
+        if confidence >= threshold:
+            epp_detected[epp_type] = epp_detected.get(epp_type, 0) + 1
+            person_epps[person] |= EPP_BITS[epp_type]
+        elif epp_type in required_set:
+            below_threshold_epps[epp_type] = below_threshold_epps.get(epp_type, 0) + 1
+            if confidence > below_threshold_max_conf.get(epp_type, -1.0):
+                below_threshold_max_conf[epp_type] = confidence
+
+    compliant = 0
+    if can_comply:
+        compliant = sum(1 for flag, epps in zip(evaluable, person_epps) if flag and epps & required_bits == required_bits)
+
+    return {
+        'total_persons': sum(evaluable),
+        'compliant': compliant,
+        'epp_detected': epp_detected,
+        'below_threshold_epps': below_threshold_epps,
+        'below_threshold_max_conf': below_threshold_max_conf
+    }
+
+
+def compliance_metrics(analysis_results, required_epps):
+    """Métricas completas de un análisis (analysisResults de bedrock-summary o analysisData guardado)"""
+    total_persons_detected = analysis_results.get('Summary', {}).get('totalPersons', 0)
+    min_confidence = analysis_results.get('MinConfidence', 75)
+    metrics = evaluate(flatten(analysis_results.get('ProtectiveEquipment', [])), required_epps, min_confidence)
+    metrics.update({
+        'total_persons_detected': total_persons_detected,
+        'filtered_persons': total_persons_detected - metrics['total_persons'],
+        'min_confidence': min_confidence,
+        'required_epps': required_epps
+    })
+    return metrics
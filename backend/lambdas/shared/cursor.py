@@ -0,0 +1,85 @@
+"""Cursores de paginación opacos para los listados de las Lambdas admin.
+
+Un cursor es base64url (sin relleno) de:
+
+    <versión: 1 byte> <posición: JSON compacto> <HMAC-SHA256 truncado a 16 bytes>
+
+La posición es lo que el handler necesita para retomar (LastEvaluatedKey sin
+los atributos que ya vienen en el request, o la última fila de un listado en
+memoria). El HMAC cubre versión, posición y un 'scope' que no viaja en el
+cursor (endpoint, usuario, índice): un cursor alterado o usado en otra consulta
+se rechaza con InvalidCursor en lugar de llegar a DynamoDB.
+
+La clave es la misma en todas las Lambdas que comparten cursores: viene de
+CURSOR_SECRET o de un parámetro SecureString de SSM (CURSOR_SECRET_PARAMETER),
+leído una vez por contenedor. Sin ninguno de los dos encode y decode fallan
+con CursorSecretMissing: una clave por contenedor emitiría cursores que el
+siguiente contenedor rechaza.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+from aws_clients import lazy_client
+from decimal_json import decimal_default
+
+VERSION = 1
+MAC_BYTES = 16
+MAX_CURSOR_LENGTH = 1024
+
+CURSOR_SECRET_PARAMETER = os.environ.get('CURSOR_SECRET_PARAMETER', '')
+
+_secret = os.environ.get('CURSOR_SECRET', '').encode('utf-8')
+_lock = threading.Lock()
+ssm = lazy_client('ssm')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorSecretMissing(RuntimeError):
+    """Ni CURSOR_SECRET ni CURSOR_SECRET_PARAMETER están configurados"""
+
+
+def _load_secret():
+    global _secret
+    if _secret:
+        return _secret
+    if not CURSOR_SECRET_PARAMETER:
+        raise CursorSecretMissing('CURSOR_SECRET or CURSOR_SECRET_PARAMETER must be configured')
+    with _lock:
+        if not _secret:
+            value = ssm.get_parameter(Name=CURSOR_SECRET_PARAMETER, WithDecryption=True)['Parameter']['Value']
+            if not value:
+                raise CursorSecretMissing(f'SSM parameter {CURSOR_SECRET_PARAMETER} is empty')
+            _secret = value.encode('utf-8')
+    return _secret
+
+
+def _mac(body, scope):
+    return hmac.new(_load_secret(), scope.encode('utf-8') + b'\0' + body, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def encode(position, scope=''):
+    """Cursor opaco de position (dict o lista JSON; Decimal enteros como int)"""
+    body = bytes([VERSION]) + json.dumps(position, default=decimal_default, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(body + _mac(body, scope)).rstrip(b'=').decode('ascii')
+
+
+def decode(cursor, scope=''):
+    """Posición de un cursor emitido por encode con el mismo scope; InvalidCursor si no lo es"""
+    if not isinstance(cursor, str) or len(cursor) > MAX_CURSOR_LENGTH:
+        raise InvalidCursor('Invalid cursor')
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    body, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if len(body) < 2 or not hmac.compare_digest(mac, _mac(body, scope)):
+        raise InvalidCursor('Invalid cursor')
+    if body[0] != VERSION:
+        raise InvalidCursor(f'Unsupported cursor version {body[0]}')
+    return json.loads(body[1:])
@@ -0,0 +1,50 @@
+"""JSON con números decimales listos para DynamoDB.
+
+boto3 no acepta float: los bodies se decodifican con parse_float=Decimal, que
+crea el Decimal directamente desde el texto del número (mismo valor que
+Decimal(str(float)) para lo que genera JSON.stringify) sin pasar por float ni
+reconstruir el árbol. Para eventos que ya llegan como dict (invocación directa)
+floats_to_decimal convierte en el lugar, de forma iterativa. Al volver a JSON
+(cursores, analysisData comprimido, hash de idempotencia) decimal_default pasa
+cada Decimal a int o float.
+"""
+import json
+from decimal import Decimal
+
+
+def loads(text):
+    return json.loads(text, parse_float=Decimal)
+
+
+def decimal_default(value):
+    """default de json.dumps: Decimal -> int/float (los Decimal vienen del texto JSON del body, sin pérdida)"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def floats_to_decimal(value):
+    """Reemplaza los float por Decimal dentro de dicts y listas sin copiarlos; devuelve value"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            entries = node.items()
+        elif isinstance(node, list):
+            entries = enumerate(node)
+        else:
+            continue
+        for key, child in entries:
+            if isinstance(child, float):
+                node[key] = Decimal(str(child))
+            elif isinstance(child, (dict, list)):
+                stack.append(child)
+    return value
+
+
+def decode_body(event):
+    """Body del evento de API Gateway con Decimal en lugar de float"""
+    body = event['body']
+    return loads(body) if isinstance(body, str) else floats_to_decimal(body)
@@ -0,0 +1,36 @@
+"""Items de DynamoDB para el cliente de bajo nivel (boto3.client('dynamodb')).
+
+boto3.resource('dynamodb') y sus Table no son thread-safe: la capa de recursos
+arma las condiciones y serializa los items con estado propio. Los caminos que
+reparten llamadas entre hilos (parallel_scan, batch_write, index-types) y las
+lecturas en lote de los handlers usan el cliente, que sí lo es y se comparte
+por contenedor, y convierten los items con TypeSerializer/TypeDeserializer: del
+lado de Python quedan los mismos Decimal, set y dict que devuelve la tabla.
+Los recursos quedan para las llamadas desde el hilo del handler.
+"""
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def serialize(item):
+    """{atributo: AttributeValue} de un item (o clave, o ExpressionAttributeValues) de Python"""
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
+
+def deserialize(item):
+    """Item de Python de un {atributo: AttributeValue}"""
+    return {name: _deserializer.deserialize(value) for name, value in item.items()}
+
+
+def batch_get(dynamodb, table_name, keys, **request):
+    """Items existentes de keys con batch_get_item de a 100 (request: ProjectionExpression, etc.)"""
+    items = []
+    for start in range(0, len(keys), 100):
+        pending = {table_name: {'Keys': [serialize(key) for key in keys[start:start + 100]], **request}}
+        while pending:
+            response = dynamodb.batch_get_item(RequestItems=pending)
+            items.extend(deserialize(item) for item in response.get('Responses', {}).get(table_name, []))
+            pending = response.get('UnprocessedKeys')
+    return items
@@ -0,0 +1,211 @@
+"""Núcleo de request/response de las Lambdas Python detrás de API Gateway (proxy).
+
+Cada handler repetía el parseo del body, los headers CORS, el preflight
+OPTIONS, decimal_default y los sobres de error, y varios imprimían el evento
+completo (json.dumps(event, default=str)) en cada request, con el análisis de
+Rekognition o la imagen incluidos.
+
+Router arma el lambda_handler a partir de funciones registradas por método:
+
+    router = Router(allow_headers='Content-Type')
+
+    @router.route('GET')
+    def get_profile(request):
+        ...
+        return {'profile': item}                  # 200 con el dict como JSON
+        return Response(404, {'profile': None})
+        raise HttpError(400, 'userId is required')
+
+    def lambda_handler(event, context):
+        return router(event, context)
+
+- OPTIONS responde el preflight con los headers CORS de los métodos registrados
+- el body se decodifica una sola vez y solo si se usa (request.body), con
+  Decimal en lugar de float para DynamoDB salvo decimal_body=False; un JSON
+  inválido responde 400
+- HttpError se responde como {'error': mensaje}; cualquier otra excepción se
+  registra y responde 500 con su mensaje o con error_message
+- un evento sin httpMethod (invocación directa) va a la primera ruta
+
+Las respuestas se serializan con un JSONEncoder compartido con default=float: el
+encoder en C llama al builtin por cada Decimal, sin el frame de Python de
+decimal_default por objeto ni armar un encoder por respuesta.
+
+Cada request abre una invocación de metrics.py (fases, llamadas a AWS y una
+línea EMF al terminar; el preflight OPTIONS no la abre). En las invocaciones
+muestreadas (LOG_SAMPLE_RATE) se registra además el request, acotado a
+LOG_MAX_BYTES: método, ruta, parámetros y el comienzo del body (log_body=False
+registra solo su tamaño).
+"""
+import json
+import os
+import time
+import metrics
+from decimal_json import floats_to_decimal, loads
+
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', '512'))
+
+_encoder = json.JSONEncoder(default=float, separators=(',', ':'))
+
+
+def dumps(value):
+    """JSON compacto con Decimal como número"""
+    return _encoder.encode(value)
+
+
+class HttpError(Exception):
+    """Error del cliente: se responde status con {'error': message}"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Response:
+    """Respuesta distinta de 200 con JSON, headers adicionales o un body de texto ya armado"""
+    __slots__ = ('status', 'payload', 'headers', 'text')
+
+    def __init__(self, status=200, payload=None, headers=None, text=None):
+        self.status = status
+        self.payload = payload
+        self.headers = headers
+        self.text = text
+
+
+class Request:
+    """Evento de API Gateway con el body decodificado a demanda"""
+    __slots__ = ('event', 'method', 'params', '_decimal', '_body')
+
+    def __init__(self, event, decimal_body=True):
+        self.event = event
+        self.method = event.get('httpMethod')
+        self.params = event.get('queryStringParameters') or {}
+        self._decimal = decimal_body
+        self._body = None
+
+    @property
+    def body(self):
+        if self._body is None:
+            body = self.event.get('body')
+            started = time.perf_counter()
+            if not body:
+                self._body = {}
+            elif isinstance(body, str):
+                try:
+                    self._body = loads(body) if self._decimal else json.loads(body)
+                except ValueError:
+                    raise HttpError(400, 'Invalid JSON format')
+                finally:
+                    metrics.record_phase('Parse', time.perf_counter() - started)
+            else:
+                self._body = floats_to_decimal(body) if self._decimal else body
+                metrics.record_phase('Parse', time.perf_counter() - started)
+            if not isinstance(self._body, dict):
+                raise HttpError(400, 'Invalid JSON format')
+        return self._body
+
+    def header(self, name, default=None):
+        name = name.lower()
+        for key, value in (self.event.get('headers') or {}).items():
+            if key.lower() == name:
+                return value
+        return default
+
+    @property
+    def source_ip(self):
+        return ((self.event.get('requestContext') or {}).get('identity') or {}).get('sourceIp', 'unknown')
+
+
+def log_request(request, with_body=True):
+    """Una línea acotada del request: método, ruta, parámetros y el comienzo del body"""
+    body = request.event.get('body')
+    if body is not None and not isinstance(body, str):
+        body = dumps(body)
+    line = dumps({
+        'method': request.method,
+        'path': request.event.get('path'),
+        'params': request.params,
+        'bodyBytes': len(body) if body else 0,
+        'body': body[:LOG_MAX_BYTES] if body and with_body else None,
+    })
+    print(f'Request: {line[:LOG_MAX_BYTES]}')
+
+
+class Router:
+    """lambda_handler con rutas por método HTTP, CORS y sobres de error comunes"""
+
+    def __init__(self, allow_headers='Content-Type,Authorization', error_message=None, decimal_body=True,
+                 value_error_message=None, log_body=True):
+        self.routes = {}
+        self.allow_headers = allow_headers
+        self.error_message = error_message
+        self.decimal_body = decimal_body
+        # ValueError de los parámetros como 400 con este mensaje (None: 500)
+        self.value_error_message = value_error_message
+        # False: el log muestreado no incluye el body (datos personales)
+        self.log_body = log_body
+        self.headers = {}
+
+    def route(self, *methods):
+        def register(function):
+            for method in methods:
+                self.routes[method] = function
+            self.headers = {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': self.allow_headers,
+                'Access-Control-Allow-Methods': ','.join([*self.routes, 'OPTIONS'])
+            }
+            return function
+        return register
+
+    def respond(self, status, payload=None, headers=None, text=None):
+        if text is None:
+            started = time.perf_counter()
+            text = dumps(payload)
+            metrics.record_phase('Serialize', time.perf_counter() - started)
+        return {
+            'statusCode': status,
+            'headers': {**self.headers, **headers} if headers else self.headers,
+            'body': text
+        }
+
+    def __call__(self, event, context):
+        request = Request(event, self.decimal_body)
+        if request.method == 'OPTIONS':
+            return self.respond(200, text='')
+        invocation = metrics.start()
+        if invocation.sampled:
+            log_request(request, self.log_body)
+        # La línea EMF sale aunque dispatch o respond fallen (p. ej. al serializar la respuesta)
+        status = 500
+        try:
+            response = self.dispatch(request)
+            status = response['statusCode']
+            return response
+        finally:
+            metrics.finish(context, request.method, status)
+
+    def dispatch(self, request):
+        if request.method is None:
+            function = next(iter(self.routes.values()))
+        else:
+            function = self.routes.get(request.method)
+            if function is None:
+                return self.respond(405, {'error': 'Method not allowed'})
+        try:
+            result = function(request)
+        except HttpError as e:
+            return self.respond(e.status, {'error': e.message})
+        except ValueError as e:
+            if self.value_error_message is not None:
+                print(f'Value error: {str(e)}')
+                return self.respond(400, {'error': self.value_error_message})
+            print(f'Error: {str(e)}')
+            return self.respond(500, {'error': self.error_message or str(e)})
+        except Exception as e:
+            print(f'Error: {str(e)}')
+            return self.respond(500, {'error': self.error_message or str(e)})
+        if isinstance(result, Response):
+            return self.respond(result.status, result.payload, result.headers, result.text)
+        return self.respond(200, result)
@@ -0,0 +1,131 @@
+"""Idempotencia de save-analysis frente a reintentos.
+
+Los clientes reintentan los guardados en redes móviles inestables; un put_item
+ciego reescribe el item completo (WCU de nuevo) y suma otra vez a los agregados.
+Cada guardado lleva una clave: la del header Idempotency-Key o el campo
+idempotencyKey del body, o si no viene un hash del contenido (userId +
+analysisData), que se repite en un reintento idéntico y cambia cuando el
+frontend vuelve a guardar el mismo análisis con aiSummary.
+
+La clave queda en el item (atributo idempotencyKey) y el put_item es condicional:
+un reintento falla la condición y se responde como duplicado sin reescribir;
+otra clave sobre el mismo timestamp es una actualización, que reescribe pero no
+vuelve a contar. El modo batch (BatchWriteItem no admite condiciones) lee las
+claves guardadas con batch_get_item antes de escribir. Si el guardado no
+termina después de escribir el item (la subida del detalle a S3),
+release_key() quita la clave para que el reintento lo reescriba.
+
+DedupeCache recuerda en el contenedor las claves ya aplicadas durante
+IDEMPOTENCY_TTL segundos: un reintento que cae en el mismo contenedor corta
+antes de armar el item, subir el detalle a S3 o llegar a DynamoDB.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from decimal_json import decimal_default
+from dynamodb_items import batch_get
+from parallel_scan import build_projection
+
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', '300'))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '4096'))
+
+IDEMPOTENCY_ATTRIBUTE = 'idempotencyKey'
+MAX_KEY_LENGTH = 128
+
+# Resultado de un guardado
+SAVED = 'saved'
+UPDATED = 'updated'
+DUPLICATE = 'duplicate'
+
+
+def content_key(user_id, analysis_data):
+    """Hash canónico del análisis (orden de claves irrelevante, Decimal como int/float)"""
+    encoded = json.dumps([user_id, analysis_data], default=decimal_default, sort_keys=True, separators=(',', ':'))
+    return 'sha256:' + hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def request_key(event, body, user_id, analysis_data):
+    """Clave del request: Idempotency-Key, idempotencyKey del body o content_key; ValueError si es inválida"""
+    headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+    key = headers.get('idempotency-key') or body.get('idempotencyKey')
+    if key is None:
+        return content_key(user_id, analysis_data)
+    if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise ValueError(f'idempotencyKey debe ser un texto de hasta {MAX_KEY_LENGTH} caracteres')
+    return key
+
+
+def conditional_put(table, item, key):
+    """put_item de item con su clave; devuelve (estado, item anterior o None).
+
+    El estado es SAVED, UPDATED (había otro item, que se devuelve) o DUPLICATE (misma clave).
+    """
+    try:
+        response = table.put_item(
+            Item={**item, IDEMPOTENCY_ATTRIBUTE: key},
+            ConditionExpression='attribute_not_exists(#ts) OR attribute_not_exists(#key) OR #key <> :key',
+            ExpressionAttributeNames={'#ts': 'timestamp', '#key': IDEMPOTENCY_ATTRIBUTE},
+            ExpressionAttributeValues={':key': key},
+            ReturnValues='ALL_OLD'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return DUPLICATE, None
+    previous = response.get('Attributes')
+    return (UPDATED if previous else SAVED), previous
+
+
+def release_key(table, user_id, timestamp, key):
+    """Quita la clave de un item escrito cuyo guardado no terminó; un reintento con la misma clave lo reescribe"""
+    try:
+        table.update_item(
+            Key={'userId': user_id, 'timestamp': timestamp},
+            UpdateExpression='REMOVE #key',
+            ConditionExpression='#key = :key',
+            ExpressionAttributeNames={'#key': IDEMPOTENCY_ATTRIBUTE},
+            ExpressionAttributeValues={':key': key}
+        )
+    except ClientError as e:
+        # Otro guardado ya reemplazó el item
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def stored_items(dynamodb, table_name, user_id, timestamps):
+    """{timestamp: item} de los análisis que ya existen, con su idempotencyKey (ausente en items anteriores), detailKey y DetectionType"""
+    projection, names = build_projection(['timestamp', IDEMPOTENCY_ATTRIBUTE, 'detailKey', 'DetectionType',
+                                          'analysisData.DetectionType'])
+    keys = [{'userId': user_id, 'timestamp': timestamp} for timestamp in timestamps]
+    items = batch_get(dynamodb, table_name, keys, ProjectionExpression=projection, ExpressionAttributeNames=names)
+    return {int(item['timestamp']): item for item in items}
+
+
+class DedupeCache:
+    """Claves aplicadas en este contenedor, con vencimiento y tope de entradas (LRU)"""
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL, max_entries=IDEMPOTENCY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+
+    def seen(self, key):
+        expires_at = self.entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self.entries[key]
+            return False
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True
+
+    def remember(self, key):
+        self.entries.pop(key, None)
+        self.entries[key] = time.time() + self.ttl
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
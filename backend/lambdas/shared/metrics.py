@@ -0,0 +1,279 @@
+"""Instrumentación de las Lambdas Python: fases del request, llamadas a AWS y una línea de métricas por invocación.
+
+La única observabilidad eran prints sueltos (los DEBUG de bedrock-summary con
+cada detección bajo umbral en todos los requests). Router (http_api.py) abre
+una Invocation por request y al terminar imprime una línea JSON en Embedded
+Metric Format: CloudWatch la convierte en métricas sin llamar a PutMetricData.
+
+Fases (ms):
+- Parse: decodificación del body (Request.body)
+- DynamoDB, Cognito, S3, Bedrock: suma de la duración de las llamadas a cada
+  servicio (con llamadas en paralelo puede superar a Duration)
+- Compute: Duration menos parse, serialize y el tiempo con alguna llamada a AWS
+  en curso
+- Serialize: armado del JSON de la respuesta
+
+Además cuenta llamadas y errores por servicio y la capacidad consumida de
+DynamoDB: instrument() agrega ReturnConsumedCapacity=TOTAL (o
+METRICS_CONSUMED_CAPACITY) a las operaciones que la informan y suma la
+respuesta en ConsumedRCU/ConsumedWCU. increment() suma contadores propios de
+los módulos (por ejemplo errores de una caché) a la misma línea y observe()
+agrega un valor medido por el handler (como el tiempo hasta el primer token de
+Bedrock).
+
+La verbosidad se decide por muestreo al abrir la invocación (LOG_SAMPLE_RATE):
+solo en las invocaciones muestreadas se registran el request (http_api), los
+mensajes de debug() y el detalle de cada llamada a AWS en la línea de métricas.
+Cambiar LOG_SAMPLE_RATE en la configuración de la función no requiere un
+despliegue nuevo.
+
+METRICS_ENABLED=0 desactiva la línea de métricas y la instrumentación de los
+clientes.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'EPI/Lambdas')
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+# ReturnConsumedCapacity que se pide a DynamoDB ('NONE' para no pedirla)
+CONSUMED_CAPACITY = os.environ.get('METRICS_CONSUMED_CAPACITY', 'TOTAL')
+# Llamadas detalladas como máximo en la línea de una invocación muestreada
+MAX_SAMPLED_CALLS = 50
+
+SERVICE_NAMES = {'dynamodb': 'DynamoDB', 'cognito-idp': 'Cognito', 's3': 'S3', 'bedrock-runtime': 'Bedrock'}
+
+# Operaciones de DynamoDB que aceptan ReturnConsumedCapacity: True lee, False escribe
+CAPACITY_OPERATIONS = {
+    'get_item': True, 'query': True, 'scan': True, 'batch_get_item': True, 'transact_get_items': True,
+    'put_item': False, 'update_item': False, 'delete_item': False, 'batch_write_item': False,
+    'transact_write_items': False,
+}
+
+# Métodos de los clientes que no son llamadas a AWS (o las hacen por su cuenta)
+UNTIMED = {'batch_writer', 'get_paginator', 'get_waiter', 'can_paginate', 'generate_presigned_url', 'close'}
+
+
+class Invocation:
+    """Fases, llamadas a AWS y capacidad de un request; las llamadas pueden venir de otros hilos"""
+
+    def __init__(self, sampled):
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.phases = {}
+        self.services = {}
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self.calls = []
+        self.values = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._since = 0.0
+        self.aws_wall = 0.0
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_value(self, name, value):
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + value
+
+    def set_value(self, name, value):
+        with self._lock:
+            self.values[name] = value
+
+    def call_started(self):
+        now = time.perf_counter()
+        with self._lock:
+            if not self._in_flight:
+                self._since = now
+            self._in_flight += 1
+        return now
+
+    def call_finished(self, service, operation, started, error=None, capacity=None, reads=False):
+        now = time.perf_counter()
+        with self._lock:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self.aws_wall += now - self._since
+            stats = self.services.get(service)
+            if stats is None:
+                stats = self.services[service] = [0.0, 0, 0]
+            stats[0] += now - started
+            stats[1] += 1
+            if error:
+                stats[2] += 1
+            if capacity is not None:
+                if reads:
+                    self.read_units += capacity_units(capacity)
+                else:
+                    self.write_units += capacity_units(capacity)
+            if self.sampled and len(self.calls) < MAX_SAMPLED_CALLS:
+                self.calls.append([service, operation, round((now - started) * 1000, 3), error])
+
+
+_current = None
+_encoder = json.JSONEncoder(separators=(',', ':'))
+_fragments = {}
+
+
+def capacity_units(capacity):
+    """CapacityUnits de ConsumedCapacity (un dict o una lista por tabla en las operaciones batch)"""
+    if isinstance(capacity, dict):
+        return float(capacity.get('CapacityUnits', 0))
+    return sum(float(entry.get('CapacityUnits', 0)) for entry in capacity)
+
+
+def start():
+    """Abre la invocación del request actual (una por contenedor a la vez)"""
+    global _current
+    _current = Invocation(bool(LOG_SAMPLE_RATE) and random.random() < LOG_SAMPLE_RATE)
+    return _current
+
+
+def current():
+    return _current
+
+
+def sampled():
+    """True si la invocación en curso está muestreada para logs detallados"""
+    return _current is not None and _current.sampled
+
+
+def record_phase(name, seconds):
+    if _current is not None:
+        _current.add_phase(name, seconds)
+
+
+def increment(name, value=1):
+    """Suma value al contador name (métrica Count) de la invocación en curso"""
+    if _current is not None:
+        _current.add_value(name, value)
+
+
+def observe(name, value):
+    """Registra value como la métrica name de la invocación en curso (Milliseconds si name termina en Ms)"""
+    if _current is not None:
+        _current.set_value(name, value)
+
+
+def debug(message, *args):
+    """Mensaje de debug solo en invocaciones muestreadas; args se formatean con % recién ahí"""
+    if _current is not None and _current.sampled:
+        print('DEBUG - ' + (message % args if args else message))
+
+
+def _definitions(names):
+    """Fragmento JSON de CloudWatchMetrics para estas métricas (memoizado: el conjunto se repite entre invocaciones)"""
+    fragment = _fragments.get(names)
+    if fragment is None:
+        fragment = _fragments[names] = _encoder.encode([{
+            'Namespace': METRICS_NAMESPACE,
+            'Dimensions': [['Function']],
+            'Metrics': [{'Name': name, 'Unit': 'Milliseconds' if name.endswith('Ms') else 'Count'} for name in names],
+        }])
+    return fragment
+
+
+def finish(context=None, method=None, status=None):
+    """Cierra la invocación e imprime su línea de métricas (EMF)"""
+    global _current
+    invocation, _current = _current, None
+    if invocation is None or not METRICS_ENABLED:
+        return None
+    duration = time.perf_counter() - invocation.started
+    phases = invocation.phases
+    function_name = getattr(context, 'function_name', None) or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+    values = {
+        'DurationMs': round(duration * 1000, 3),
+        'ParseMs': round(phases.get('Parse', 0.0) * 1000, 3),
+        'ComputeMs': round(max(0.0, duration - sum(phases.values()) - invocation.aws_wall) * 1000, 3),
+        'SerializeMs': round(phases.get('Serialize', 0.0) * 1000, 3),
+    }
+    for service, (seconds, calls, errors) in invocation.services.items():
+        name = SERVICE_NAMES.get(service, service)
+        values[f'{name}Ms'] = round(seconds * 1000, 3)
+        values[f'{name}Calls'] = calls
+        values[f'{name}Errors'] = errors
+    if invocation.read_units or invocation.write_units:
+        values['ConsumedRCU'] = invocation.read_units
+        values['ConsumedWCU'] = invocation.write_units
+    values.update(invocation.values)
+    line = {'Function': function_name, 'Method': method, 'StatusCode': status, **values}
+    if invocation.sampled:
+        line['calls'] = invocation.calls
+    text = _encoder.encode(line)[:-1]
+    print(f'{text},"_aws":{{"Timestamp":{int(time.time() * 1000)},"CloudWatchMetrics":{_definitions(tuple(values))}}}}}')
+    return line
+
+
+def _operation_name(name):
+    return ''.join(part.title() for part in name.split('_'))
+
+
+def _timed(method, service, name):
+    """method cronometrado y contado en la invocación en curso"""
+    operation = _operation_name(name)
+    capacity = service == 'dynamodb' and name in CAPACITY_OPERATIONS and CONSUMED_CAPACITY != 'NONE'
+    reads = CAPACITY_OPERATIONS.get(name, False)
+
+    def call(*args, **kwargs):
+        invocation = _current
+        if invocation is None:
+            return method(*args, **kwargs)
+        if capacity and 'ReturnConsumedCapacity' not in kwargs:
+            kwargs['ReturnConsumedCapacity'] = CONSUMED_CAPACITY
+        started = invocation.call_started()
+        try:
+            response = method(*args, **kwargs)
+        except Exception as e:
+            code = ((getattr(e, 'response', None) or {}).get('Error') or {}).get('Code') or type(e).__name__
+            invocation.call_finished(service, operation, started, error=code)
+            raise
+        consumed = response.get('ConsumedCapacity') if capacity and isinstance(response, dict) else None
+        invocation.call_finished(service, operation, started, capacity=consumed, reads=reads)
+        return response
+
+    call.__name__ = operation
+    return call
+
+
+class Instrumented:
+    """Proxy de un cliente, recurso o tabla de AWS que registra cada llamada en la invocación en curso.
+
+    Los métodos envueltos se guardan en el __dict__ del proxy: desde el segundo
+    acceso no pasan por __getattr__.
+    """
+
+    def __init__(self, target, service):
+        self.__dict__['_target'] = target
+        self.__dict__['_service'] = service
+
+    def __getattr__(self, name):
+        target = self.__dict__['_target']
+        value = getattr(target, name)
+        if name.startswith('_') or name in UNTIMED or not callable(value):
+            return value
+        if name == 'Table':
+            def wrapped(*args, **kwargs):
+                return Instrumented(value(*args, **kwargs), self._service)
+        else:
+            wrapped = _timed(value, self._service, name)
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    def __setattr__(self, name, value):
+        setattr(self.__dict__['_target'], name, value)
+
+    def __repr__(self):
+        return f'<Instrumented {self._service} {self._target!r}>'
+
+
+def instrument(target, service):
+    """target con sus llamadas registradas en la invocación en curso (sin cambios si METRICS_ENABLED=0)"""
+    if not METRICS_ENABLED or target is None or isinstance(target, Instrumented):
+        return target
+    return Instrumented(target, service)
@@ -0,0 +1,75 @@
+"""Scan paralelo por segmentos de DynamoDB.
+
+Reparte la tabla en TotalSegments segmentos escaneados en un pool de hilos y
+entrega cada página al consumidor a medida que llega, sin acumular todos los
+items en memoria. Los segmentos usan el cliente de bajo nivel, que se puede
+compartir entre hilos (ver dynamodb_items).
+"""
+import contextlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dynamodb_items import deserialize, serialize
+
+DEFAULT_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+
+# Atributos mínimos para estadísticas (DetectionType puede estar en raíz o en analysisData)
+ANALYSIS_SUMMARY_ATTRIBUTES = ('userId', 'timestamp', 'DetectionType', 'analysisData.DetectionType')
+
+
+def build_projection(attributes):
+    """Arma ProjectionExpression con placeholders (timestamp es palabra reservada)"""
+    placeholders = {}
+    paths = []
+    for attribute in attributes:
+        parts = []
+        for part in attribute.split('.'):
+            if part not in placeholders:
+                placeholders[part] = f'#p{len(placeholders)}'
+            parts.append(placeholders[part])
+        paths.append('.'.join(parts))
+    return ', '.join(paths), {placeholder: name for name, placeholder in placeholders.items()}
+
+
+def parallel_scan(dynamodb, table_name, consumer, total_segments=DEFAULT_SEGMENTS, attributes=None, max_workers=None,
+                  serialized=True, **scan_params):
+    """Escanea la tabla completa con el cliente dynamodb y llama consumer(items) por cada página.
+
+    Las llamadas a consumer se serializan con un lock, así puede acumular en
+    estructuras compartidas sin sincronización propia. Con serialized=False
+    corre sin el lock en el hilo de cada segmento (para escribir por segmento
+    en paralelo) y sincroniza por su cuenta lo que comparta. Devuelve la
+    cantidad de items leídos.
+    """
+    if attributes:
+        projection, names = build_projection(attributes)
+        scan_params['ProjectionExpression'] = projection
+        scan_params['ExpressionAttributeNames'] = {**scan_params.get('ExpressionAttributeNames', {}), **names}
+    if 'ExpressionAttributeValues' in scan_params:
+        scan_params['ExpressionAttributeValues'] = serialize(scan_params['ExpressionAttributeValues'])
+    scan_params['TableName'] = table_name
+
+    lock = threading.Lock() if serialized else contextlib.nullcontext()
+
+    def scan_segment(segment):
+        params = dict(scan_params)
+        if total_segments > 1:
+            params['Segment'] = segment
+            params['TotalSegments'] = total_segments
+        scanned = 0
+        while True:
+            response = dynamodb.scan(**params)
+            items = [deserialize(item) for item in response.get('Items', [])]
+            scanned += len(items)
+            with lock:
+                consumer(items)
+            if 'LastEvaluatedKey' not in response:
+                return scanned
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    if total_segments <= 1:
+        return scan_segment(0)
+
+    with ThreadPoolExecutor(max_workers=max_workers or total_segments) as executor:
+        return sum(executor.map(scan_segment, range(total_segments)))
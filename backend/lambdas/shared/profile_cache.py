@@ -0,0 +1,79 @@
+"""Caché de perfiles de UserProfiles por contenedor para user-profile.
+
+El frontend pide el perfil al montar casi cada página y componente, y cada GET
+era un get_item. ProfileCache guarda el item y su ETag por userId en un LRU
+acotado (PROFILE_CACHE_SIZE entradas) con vencimiento (PROFILE_CACHE_TTL
+segundos); el POST lo escribe en la caché después del put_item
+(write-through).
+
+La caché es del contenedor: un POST atendido por otro contenedor se ve acá
+recién cuando vence la entrada, por eso el TTL es corto. El navegador que hizo
+el POST manda el ETag nuevo en If-None-Match y, si no coincide con el
+cacheado, user-profile relee el item: quien edita su perfil no ve la versión
+anterior. Los perfiles inexistentes no se cachean (el 404 de un usuario nuevo
+no debe sobrevivir a su primer POST en otro contenedor). PROFILE_CACHE_SIZE=0
+la desactiva.
+
+El ETag es un hash del perfil, igual en todos los contenedores: un GET con
+If-None-Match que coincide responde 304 sin body aunque el item venga de
+DynamoDB.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', '60'))
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', '1024'))
+
+
+def profile_etag(item):
+    """ETag fuerte del perfil: hash canónico de sus atributos"""
+    encoded = json.dumps(item, sort_keys=True, separators=(',', ':'), default=str)
+    return '"' + hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """True si el header If-None-Match ('*' o una lista de ETags, débiles o no) incluye etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in if_none_match.split(','))
+
+
+class ProfileCache:
+    """LRU con vencimiento de (perfil, ETag) por userId, con contadores de aciertos por contenedor"""
+
+    def __init__(self, ttl=PROFILE_CACHE_TTL, max_entries=PROFILE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0}
+
+    def get(self, user_id):
+        """(perfil, ETag) vigente o None"""
+        entry = self.entries.get(user_id)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        item, etag, expires_at = entry
+        if expires_at <= time.time():
+            del self.entries[user_id]
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+        self.entries.move_to_end(user_id)
+        self.stats['hits'] += 1
+        return item, etag
+
+    def put(self, user_id, item):
+        """Guarda el perfil leído o escrito; devuelve (perfil, ETag)"""
+        etag = profile_etag(item)
+        if self.max_entries > 0:
+            self.entries.pop(user_id, None)
+            self.entries[user_id] = (item, etag, time.time() + self.ttl)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return item, etag
@@ -0,0 +1,111 @@
+"""Índice de usuarios por rol para consultar supervisores sin recorrer Cognito.
+
+Items en epi-analysis-stats (o ROLE_INDEX_TABLE):
+- ('ROLE#admin', <username>)       -> email, name
+- ('ROLE#supervisor', <username>)  -> email, name
+
+- ('ROLE_INDEX', 'INITIALIZED')    -> reconciledAt
+
+Solo se indexan los roles privilegiados (el rol 'user' es la mayoría y no se
+consulta). epi-admin-actions lo actualiza en cada change-role y
+`python role_index.py reconcile` lo reconstruye desde Cognito y escribe la
+marca INITIALIZED: hasta que existe, el índice puede tener solo los cambios
+de rol posteriores al despliegue y los lectores deben recorrer Cognito.
+"""
+import os
+import time
+
+ROLE_INDEX_TABLE = os.environ.get('ROLE_INDEX_TABLE', os.environ.get('STATS_TABLE', 'epi-analysis-stats'))
+USER_POOL_ID = os.environ.get('USER_POOL_ID', 'us-east-1_zrdfN7OKN')
+
+INDEXED_ROLES = ('admin', 'supervisor')
+ROLE_PREFIX = 'ROLE#'
+MARKER_KEY = {'pk': 'ROLE_INDEX', 'sk': 'INITIALIZED'}
+
+
+def set_role(table, username, role, email='', name=''):
+    """Mueve al usuario a la partición de su rol nuevo y lo quita de las demás"""
+    for indexed_role in INDEXED_ROLES:
+        if indexed_role != role:
+            table.delete_item(Key={'pk': ROLE_PREFIX + indexed_role, 'sk': username})
+    if role in INDEXED_ROLES:
+        table.put_item(Item={'pk': ROLE_PREFIX + role, 'sk': username, 'email': email, 'name': name})
+
+
+def is_initialized(table):
+    """True si reconcile ya completó el índice al menos una vez"""
+    return 'Item' in table.get_item(Key=MARKER_KEY, ConsistentRead=True)
+
+
+def users_with_roles(table, roles=INDEXED_ROLES):
+    """Usuarios indexados con alguno de los roles (una query por rol)"""
+    users = []
+    for role in roles:
+        query_params = {
+            'KeyConditionExpression': '#pk = :pk',
+            'ExpressionAttributeNames': {'#pk': 'pk'},
+            'ExpressionAttributeValues': {':pk': ROLE_PREFIX + role}
+        }
+        while True:
+            response = table.query(**query_params)
+            for item in response.get('Items', []):
+                users.append({
+                    'username': item['sk'],
+                    'email': item.get('email', ''),
+                    'name': item.get('name', ''),
+                    'role': role
+                })
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return users
+
+
+def reconcile(cognito, pool_id, table):
+    """Reconstruye el índice desde Cognito; devuelve (agregados, eliminados)"""
+    expected = {}
+    params = {'UserPoolId': pool_id, 'Limit': 60, 'AttributesToGet': ['email', 'name', 'custom:role']}
+    while True:
+        response = cognito.list_users(**params)
+        for user in response.get('Users', []):
+            attributes = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
+            role = attributes.get('custom:role', 'user')
+            if role in INDEXED_ROLES:
+                expected[(ROLE_PREFIX + role, user['Username'])] = {
+                    'email': attributes.get('email', ''),
+                    'name': attributes.get('name', '')
+                }
+        if not response.get('PaginationToken'):
+            break
+        params['PaginationToken'] = response['PaginationToken']
+
+    current = {
+        (ROLE_PREFIX + user['role'], user['username']): {'email': user['email'], 'name': user['name']}
+        for user in users_with_roles(table)
+    }
+
+    added = [key for key, value in expected.items() if current.get(key) != value]
+    removed = [key for key in current if key not in expected]
+    with table.batch_writer() as writer:
+        for pk, sk in removed:
+            writer.delete_item(Key={'pk': pk, 'sk': sk})
+        for pk, sk in added:
+            writer.put_item(Item={'pk': pk, 'sk': sk, **expected[(pk, sk)]})
+    # Recién con todos los roles escritos el índice reemplaza al recorrido de Cognito
+    table.put_item(Item={**MARKER_KEY, 'reconciledAt': int(time.time())})
+    return len(added), len(removed)
+
+
+if __name__ == '__main__':
+    import argparse
+    import boto3
+
+    parser = argparse.ArgumentParser(description='Índice de roles de usuarios de Cognito')
+    parser.add_argument('command', choices=['reconcile'])
+    parser.add_argument('--region', default='us-east-1')
+    args = parser.parse_args()
+
+    cognito_client = boto3.client('cognito-idp', region_name=args.region)
+    index_table = boto3.resource('dynamodb', region_name=args.region).Table(ROLE_INDEX_TABLE)
+    added_count, removed_count = reconcile(cognito_client, USER_POOL_ID, index_table)
+    print(f'Reconcile completo: {added_count} agregados/actualizados, {removed_count} eliminados')
@@ -0,0 +1,72 @@
+"""Agregación en una sola pasada de items de epi-user-analysis.
+
+Consume páginas a medida que llegan (parallel_scan) y guarda solo contadores,
+por lo que la memoria no crece con la cantidad de análisis. Los días se agrupan
+con aritmética entera sobre el timestamp en milisegundos y la fecha en texto se
+calcula una vez por día, no por item.
+"""
+from datetime import date
+
+MS_PER_DAY = 86400000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def detection_type_of(item):
+    """DetectionType en nivel raíz o dentro de analysisData"""
+    analysis = item.get('analysisData') or item
+    return item.get('DetectionType') or analysis.get('DetectionType') or 'unknown'
+
+
+def day_index(date_str):
+    """Días desde 1970-01-01 (UTC) de una fecha YYYY-MM-DD"""
+    return date.fromisoformat(date_str).toordinal() - EPOCH_ORDINAL
+
+
+def day_str(index):
+    return date.fromordinal(EPOCH_ORDINAL + index).isoformat()
+
+
+class StatsAccumulator:
+    """Contadores por tipo, por usuario y por día (y último análisis por usuario) sin retener los items"""
+
+    __slots__ = ('total', 'by_type', 'by_user', 'by_day', 'last_by_user')
+
+    def __init__(self):
+        self.total = 0
+        self.by_type = {}
+        self.by_user = {}
+        self.by_day = {}
+        self.last_by_user = {}
+
+    def add_page(self, items):
+        by_type = self.by_type
+        by_user = self.by_user
+        by_day = self.by_day
+        last_by_user = self.last_by_user
+        for item in items:
+            detection_type = detection_type_of(item)
+            by_type[detection_type] = by_type.get(detection_type, 0) + 1
+            user_id = item.get('userId')
+            by_user[user_id] = by_user.get(user_id, 0) + 1
+            timestamp = item.get('timestamp')
+            if timestamp:
+                timestamp = int(timestamp)
+                day = timestamp // MS_PER_DAY
+                by_day[day] = by_day.get(day, 0) + 1
+                if timestamp > last_by_user.get(user_id, 0):
+                    last_by_user[user_id] = timestamp
+        self.total += len(items)
+
+    def daily(self):
+        """Conteos por fecha YYYY-MM-DD"""
+        return {day_str(day): count for day, count in self.by_day.items()}
+
+    def result(self, start_date, end_date):
+        """Mismo formato que stats_store.read_stats para la ventana indicada"""
+        first, last = day_index(start_date), day_index(end_date)
+        return {
+            'total': self.total,
+            'activeUsers': len(self.by_user),
+            'byType': dict(self.by_type),
+            'daily': {day_str(day): count for day, count in self.by_day.items() if first <= day <= last}
+        }
@@ -0,0 +1,397 @@
+"""Agregados pre-calculados de la tabla epi-user-analysis.
+
+Tabla epi-analysis-stats (pk: pk, sk: sk):
+- ('GLOBAL', 'TOTAL')     -> total, activeUsers y un contador type_<DetectionType>
+- ('DAY', 'YYYY-MM-DD')   -> count (días en UTC)
+- ('USER', <userId>)      -> count, lastAnalysis (timestamp en ms del más reciente)
+
+save-analysis y delete-analysis actualizan los contadores con ADD atómicos, así
+las estadísticas se responden con un get_item + una query de días en lugar de un
+scan completo, y el listado de usuarios lee las filas USER en lugar de escanear
+los análisis (por actividad, página a página desde el GSI pk-count). lastAnalysis
+avanza con un SET condicional al guardar; al eliminar el análisis más reciente
+se recalcula con una query de un item.
+
+    python stats_store.py rebuild        # recalcula todo desde un scan
+    python stats_store.py check [--fix]  # compara las filas USER con un scan
+"""
+import os
+from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+from dynamodb_items import batch_get
+from parallel_scan import ANALYSIS_SUMMARY_ATTRIBUTES, parallel_scan
+from stats_accumulator import MS_PER_DAY, StatsAccumulator, day_str, detection_type_of
+
+STATS_TABLE = os.environ.get('STATS_TABLE', 'epi-analysis-stats')
+ANALYSIS_TABLE = os.environ.get('ANALYSIS_TABLE', 'epi-user-analysis')
+
+GLOBAL_PK = 'GLOBAL'
+GLOBAL_SK = 'TOTAL'
+DAY_PK = 'DAY'
+USER_PK = 'USER'
+TYPE_PREFIX = 'type_'
+
+
+def day_key(timestamp_ms):
+    """Fecha UTC (YYYY-MM-DD) de un timestamp en milisegundos"""
+    return day_str(int(timestamp_ms) // MS_PER_DAY)
+
+
+def record_analysis(stats_table, user_id, timestamp, detection_type, delta=1, analysis_table=None):
+    """Aplica delta (+1 al guardar, -1 al eliminar) a los contadores de un análisis"""
+    record_analyses(stats_table, [(user_id, timestamp, detection_type)], delta, analysis_table)
+
+
+def _update_user(stats_table, user_id, user_delta, timestamp=None):
+    """Suma user_delta al conteo del usuario y adelanta lastAnalysis si timestamp es más reciente"""
+    key = {'pk': USER_PK, 'sk': user_id}
+    if timestamp:
+        try:
+            return stats_table.update_item(
+                Key=key,
+                UpdateExpression='ADD #count :delta SET #last = :last',
+                ConditionExpression='attribute_not_exists(#last) OR #last < :last',
+                ExpressionAttributeNames={'#count': 'count', '#last': 'lastAnalysis'},
+                ExpressionAttributeValues={':delta': user_delta, ':last': timestamp},
+                ReturnValues='ALL_NEW'
+            )['Attributes']
+        except ClientError as e:
+            # Análisis más antiguo que el último del usuario: solo cuenta
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    return stats_table.update_item(
+        Key=key,
+        UpdateExpression='ADD #count :delta',
+        ExpressionAttributeNames={'#count': 'count'},
+        ExpressionAttributeValues={':delta': user_delta},
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+
+
+def refresh_last_analysis(stats_table, analysis_table, user_id):
+    """Recalcula lastAnalysis con el análisis más reciente que le queda al usuario"""
+    response = analysis_table.query(
+        KeyConditionExpression='#user = :user',
+        ProjectionExpression='#ts',
+        ExpressionAttributeNames={'#user': 'userId', '#ts': 'timestamp'},
+        ExpressionAttributeValues={':user': user_id},
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    if items:
+        stats_table.update_item(
+            Key={'pk': USER_PK, 'sk': user_id},
+            UpdateExpression='SET #last = :last',
+            ExpressionAttributeNames={'#last': 'lastAnalysis'},
+            ExpressionAttributeValues={':last': items[0]['timestamp']}
+        )
+    else:
+        stats_table.update_item(
+            Key={'pk': USER_PK, 'sk': user_id},
+            UpdateExpression='REMOVE #last',
+            ExpressionAttributeNames={'#last': 'lastAnalysis'}
+        )
+
+
+def record_analyses(stats_table, records, delta=1, analysis_table=None):
+    """Aplica delta a los contadores de varios análisis (userId, timestamp, DetectionType).
+
+    Agrupa por fila: una actualización por usuario, una del total global y una
+    por día, sin importar cuántos análisis traiga el lote. Al eliminar (delta < 0)
+    con analysis_table, recalcula lastAnalysis de los usuarios que perdieron su
+    análisis más reciente.
+
+    Los llamadores registran y siguen si esto falla: un fallo de agregados no
+    invalida el guardado ni el borrado, y stats_store.py rebuild corrige la deriva.
+    """
+    by_user = {}
+    by_type = {}
+    by_day = {}
+    timestamps = {}
+    for user_id, timestamp, detection_type in records:
+        by_user[user_id] = by_user.get(user_id, 0) + delta
+        by_type[detection_type] = by_type.get(detection_type, 0) + delta
+        if timestamp:
+            day = day_key(timestamp)
+            by_day[day] = by_day.get(day, 0) + delta
+            timestamps.setdefault(user_id, set()).add(int(timestamp))
+    if not by_user:
+        return
+
+    # activeUsers cambia solo cuando un usuario pasa de 0 análisis a tener alguno o viceversa
+    active_delta = 0
+    for user_id, user_delta in by_user.items():
+        user_timestamps = timestamps.get(user_id, ())
+        user_item = _update_user(stats_table, user_id, user_delta, max(user_timestamps) if delta > 0 and user_timestamps else None)
+        user_count = user_item['count']
+        if user_delta > 0 and user_count == user_delta:
+            active_delta += 1
+        elif user_delta < 0 and user_count <= 0 < user_count - user_delta:
+            active_delta -= 1
+        if delta < 0 and analysis_table is not None and user_item.get('lastAnalysis') in user_timestamps:
+            refresh_last_analysis(stats_table, analysis_table, user_id)
+
+    additions = ['#total :total']
+    names = {'#total': 'total'}
+    values = {':total': sum(by_user.values())}
+    for position, (detection_type, type_delta) in enumerate(by_type.items()):
+        additions.append(f'#type{position} :type{position}')
+        names[f'#type{position}'] = TYPE_PREFIX + detection_type
+        values[f':type{position}'] = type_delta
+    if active_delta:
+        additions.append('#active :active')
+        names['#active'] = 'activeUsers'
+        values[':active'] = active_delta
+
+    stats_table.update_item(
+        Key={'pk': GLOBAL_PK, 'sk': GLOBAL_SK},
+        UpdateExpression='ADD ' + ', '.join(additions),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+
+    for day, day_delta in by_day.items():
+        stats_table.update_item(
+            Key={'pk': DAY_PK, 'sk': day},
+            UpdateExpression='ADD #count :delta',
+            ExpressionAttributeNames={'#count': 'count'},
+            ExpressionAttributeValues={':delta': day_delta}
+        )
+
+
+def record_type_changes(stats_table, changes):
+    """Mueve los contadores type_<DetectionType> de análisis reescritos con otro tipo.
+
+    changes es una lista de (tipo anterior, tipo nuevo); total, días y usuarios
+    no cambian porque el análisis reemplazado ya estaba contado.
+    """
+    by_type = {}
+    for old_type, new_type in changes:
+        if old_type != new_type:
+            by_type[old_type] = by_type.get(old_type, 0) - 1
+            by_type[new_type] = by_type.get(new_type, 0) + 1
+    by_type = {detection_type: delta for detection_type, delta in by_type.items() if delta}
+    if not by_type:
+        return
+
+    additions, names, values = [], {}, {}
+    for position, (detection_type, type_delta) in enumerate(by_type.items()):
+        additions.append(f'#type{position} :type{position}')
+        names[f'#type{position}'] = TYPE_PREFIX + detection_type
+        values[f':type{position}'] = type_delta
+    stats_table.update_item(
+        Key={'pk': GLOBAL_PK, 'sk': GLOBAL_SK},
+        UpdateExpression='ADD ' + ', '.join(additions),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+
+
+def read_stats(stats_table, start_date, end_date):
+    """Lee totales y conteos diarios entre start_date y end_date (YYYY-MM-DD, inclusive).
+
+    Devuelve None si los agregados todavía no fueron inicializados.
+    """
+    response = stats_table.get_item(Key={'pk': GLOBAL_PK, 'sk': GLOBAL_SK})
+    totals = response.get('Item')
+    if not totals:
+        return None
+
+    by_type = {
+        key[len(TYPE_PREFIX):]: int(value)
+        for key, value in totals.items()
+        if key.startswith(TYPE_PREFIX)
+    }
+
+    daily = {}
+    query_params = {
+        'KeyConditionExpression': '#pk = :pk AND #sk BETWEEN :start AND :end',
+        'ExpressionAttributeNames': {'#pk': 'pk', '#sk': 'sk'},
+        'ExpressionAttributeValues': {':pk': DAY_PK, ':start': start_date, ':end': end_date}
+    }
+    while True:
+        day_response = stats_table.query(**query_params)
+        for item in day_response.get('Items', []):
+            daily[item['sk']] = int(item.get('count', 0))
+        if 'LastEvaluatedKey' not in day_response:
+            break
+        query_params['ExclusiveStartKey'] = day_response['LastEvaluatedKey']
+
+    return {
+        'total': int(totals.get('total', 0)),
+        'activeUsers': int(totals.get('activeUsers', 0)),
+        'byType': by_type,
+        'daily': daily
+    }
+
+
+def last_days(days=30, now=None):
+    """Fechas (YYYY-MM-DD) de la ventana de días que muestra el panel de administración"""
+    now = now or datetime.now()
+    start = now - timedelta(days=days)
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+
+
+def _activity(item):
+    return int(item.get('count', 0)), int(item['lastAnalysis']) if 'lastAnalysis' in item else None
+
+
+def all_user_activity(stats_table):
+    """{userId: (count, lastAnalysis)} de todas las filas USER (una query sobre items chicos)"""
+    activity = {}
+    query_params = {
+        'KeyConditionExpression': '#pk = :pk',
+        'ExpressionAttributeNames': {'#pk': 'pk'},
+        'ExpressionAttributeValues': {':pk': USER_PK}
+    }
+    while True:
+        response = stats_table.query(**query_params)
+        for item in response.get('Items', []):
+            activity[item['sk']] = _activity(item)
+        if 'LastEvaluatedKey' not in response:
+            return activity
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def active_users(stats_table, index_name, limit, start_key=None):
+    """(userIds, LastEvaluatedKey) de hasta limit filas USER con análisis, de más a menos.
+
+    Lee el GSI index_name (partition key pk, sort key count, proyección
+    KEYS_ONLY): la página cuesta lo que trae, no el total de usuarios. Los
+    empates en count no tienen orden garantizado; LastEvaluatedKey los separa.
+    """
+    query_params = {
+        'IndexName': index_name,
+        'KeyConditionExpression': '#pk = :pk AND #count > :zero',
+        'ExpressionAttributeNames': {'#pk': 'pk', '#count': 'count'},
+        'ExpressionAttributeValues': {':pk': USER_PK, ':zero': 0},
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    if start_key:
+        query_params['ExclusiveStartKey'] = start_key
+    response = stats_table.query(**query_params)
+    return [item['sk'] for item in response.get('Items', [])], response.get('LastEvaluatedKey')
+
+
+def user_activity(dynamodb, stats_table, user_ids):
+    """{userId: (count, lastAnalysis)} de los usuarios indicados, con batch_get_item de a 100"""
+    keys = [{'pk': USER_PK, 'sk': user_id} for user_id in dict.fromkeys(user_ids)]
+    return {item['sk']: _activity(item) for item in batch_get(dynamodb, stats_table.name, keys)}
+
+
+def _user_item(user_id, count, last_analysis):
+    item = {'pk': USER_PK, 'sk': user_id, 'count': count}
+    if last_analysis:
+        item['lastAnalysis'] = last_analysis
+    return item
+
+
+def _partition_keys(stats_table, pk):
+    """Claves de todas las filas de una partición (DAY o USER)"""
+    keys = []
+    query_params = {
+        'KeyConditionExpression': '#pk = :pk',
+        'ProjectionExpression': '#pk, #sk',
+        'ExpressionAttributeNames': {'#pk': 'pk', '#sk': 'sk'},
+        'ExpressionAttributeValues': {':pk': pk}
+    }
+    while True:
+        response = stats_table.query(**query_params)
+        keys.extend({'pk': item['pk'], 'sk': item['sk']} for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return keys
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def rebuild(dynamodb, stats_table):
+    """Recalcula todos los agregados con un scan de epi-user-analysis (dynamodb es el cliente).
+
+    Ejecutar una sola vez para el backfill inicial o si se detecta deriva; los
+    guardados concurrentes durante el rebuild pueden perderse, conviene correrlo
+    en una ventana de poco tráfico.
+    """
+    accumulator = StatsAccumulator()
+    parallel_scan(dynamodb, ANALYSIS_TABLE, accumulator.add_page, attributes=ANALYSIS_SUMMARY_ATTRIBUTES)
+
+    totals = {'pk': GLOBAL_PK, 'sk': GLOBAL_SK, 'total': accumulator.total, 'activeUsers': len(accumulator.by_user)}
+    for detection_type, count in accumulator.by_type.items():
+        totals[TYPE_PREFIX + detection_type] = count
+    by_day = accumulator.daily()
+    items = [totals]
+    items.extend({'pk': DAY_PK, 'sk': date, 'count': count} for date, count in by_day.items())
+    items.extend(_user_item(user_id, count, accumulator.last_by_user.get(user_id))
+                 for user_id, count in accumulator.by_user.items())
+
+    # Borrar solo los días/usuarios huérfanos: un delete y un put de la misma clave en el
+    # batch_writer no tienen orden garantizado (los no procesados se reencolan al final).
+    # Las demás filas de la tabla (índice de roles, snapshot del directorio) no se tocan
+    rewritten = {(item['pk'], item['sk']) for item in items}
+    stale_keys = [key for pk in (DAY_PK, USER_PK) for key in _partition_keys(stats_table, pk)
+                  if (key['pk'], key['sk']) not in rewritten]
+
+    with stats_table.batch_writer(overwrite_by_pkeys=['pk', 'sk']) as writer:
+        for item in items:
+            writer.put_item(Item=item)
+        for key in stale_keys:
+            writer.delete_item(Key=key)
+
+    return {'total': accumulator.total, 'days': len(by_day), 'users': len(accumulator.by_user)}
+
+
+def check_users(dynamodb, stats_table, fix=False):
+    """Compara las filas USER con un scan de epi-user-analysis; con fix reescribe las que difieren.
+
+    Devuelve (usuarios revisados, [(userId, (count, lastAnalysis) guardado, esperado), ...]).
+    Los guardados durante el scan aparecen como diferencias falsas: conviene
+    correrlo en una ventana de poco tráfico, igual que rebuild.
+    """
+    accumulator = StatsAccumulator()
+    parallel_scan(dynamodb, ANALYSIS_TABLE, accumulator.add_page, attributes=('userId', 'timestamp'))
+    stored = all_user_activity(stats_table)
+    expected = {user_id: (count, accumulator.last_by_user.get(user_id)) for user_id, count in accumulator.by_user.items()}
+
+    mismatched = []
+    for user_id in stored.keys() | expected.keys():
+        have, want = stored.get(user_id, (0, None)), expected.get(user_id, (0, None))
+        if have != want:
+            mismatched.append((user_id, have, want))
+
+    if fix and mismatched:
+        with stats_table.batch_writer(overwrite_by_pkeys=['pk', 'sk']) as writer:
+            for user_id, _, (count, last_analysis) in mismatched:
+                if count:
+                    writer.put_item(Item=_user_item(user_id, count, last_analysis))
+                else:
+                    writer.delete_item(Key={'pk': USER_PK, 'sk': user_id})
+        stats_table.update_item(
+            Key={'pk': GLOBAL_PK, 'sk': GLOBAL_SK},
+            UpdateExpression='SET #active = :active',
+            ExpressionAttributeNames={'#active': 'activeUsers'},
+            ExpressionAttributeValues={':active': len(expected)}
+        )
+    return len(stored.keys() | expected.keys()), mismatched
+
+
+if __name__ == '__main__':
+    import argparse
+    import boto3
+
+    parser = argparse.ArgumentParser(description='Agregados de estadísticas de epi-user-analysis')
+    parser.add_argument('command', choices=['rebuild', 'check'])
+    parser.add_argument('--fix', action='store_true', help='check: reescribir las filas USER que difieren')
+    parser.add_argument('--region', default='us-east-1')
+    args = parser.parse_args()
+
+    dynamodb = boto3.client('dynamodb', region_name=args.region)
+    stats_table = boto3.resource('dynamodb', region_name=args.region).Table(STATS_TABLE)
+    if args.command == 'check':
+        users, mismatched = check_users(dynamodb, stats_table, fix=args.fix)
+        for user_id, have, want in mismatched[:20]:
+            print(f'{user_id}: guardado count={have[0]} lastAnalysis={have[1]}, esperado count={want[0]} lastAnalysis={want[1]}')
+        action = 'corregidos' if args.fix else 'con diferencias'
+        print(f'Check: {users} usuarios revisados, {len(mismatched)} {action}')
+    else:
+        result = rebuild(dynamodb, stats_table)
+        print(f"Rebuild completo: {result['total']} análisis, {result['days']} días, {result['users']} usuarios")
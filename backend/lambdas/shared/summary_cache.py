@@ -0,0 +1,104 @@
+"""Caché de resúmenes IA direccionada por contenido.
+
+La clave es un hash canónico de las métricas de cumplimiento y los EPPs
+requeridos (no del payload crudo), así dos análisis equivalentes comparten
+entrada aunque difieran en bounding boxes, URLs o IDs. Dos niveles:
+- LRU en memoria del contenedor, acotado por cantidad de entradas y bytes
+- tabla DynamoDB epi-summary-cache (pk: cacheKey, TTL sobre expiresAt)
+
+El lote de bedrock-summary usa la caché desde varios hilos: el LRU y los
+contadores se tocan bajo un lock, que no se retiene durante las llamadas a
+DynamoDB.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SUMMARY_CACHE_TABLE = os.environ.get('SUMMARY_CACHE_TABLE', 'epi-summary-cache')
+SUMMARY_CACHE_TTL = int(os.environ.get('SUMMARY_CACHE_TTL', str(7 * 24 * 3600)))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get('SUMMARY_CACHE_MAX_ENTRIES', '512'))
+SUMMARY_CACHE_MAX_BYTES = int(os.environ.get('SUMMARY_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+
+
+def cache_key(metrics, model_id, prompt_version):
+    """Hash canónico: orden de claves y de EPPs irrelevante, confianzas a 1 decimal (como en el prompt)"""
+    canonical = {
+        'model': model_id,
+        'prompt': prompt_version,
+        'detected': metrics['total_persons_detected'],
+        'evaluable': metrics['total_persons'],
+        'compliant': metrics['compliant'],
+        'minConfidence': float(metrics['min_confidence']),
+        'required': sorted(metrics['required_epps']),
+        'eppDetected': metrics['epp_detected'],
+        'belowThreshold': metrics['below_threshold_epps'],
+        'belowThresholdMax': {k: round(float(v), 1) for k, v in metrics['below_threshold_max_conf'].items()}
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """LRU en memoria + tabla persistente, con contadores de aciertos por contenedor"""
+
+    def __init__(self, table=None, ttl=SUMMARY_CACHE_TTL, max_entries=SUMMARY_CACHE_MAX_ENTRIES, max_bytes=SUMMARY_CACHE_MAX_BYTES):
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.stats = {'memoryHits': 0, 'persistentHits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def _remember(self, key, summary, expires_at):
+        """Guarda en el LRU; llamar con self._lock tomado"""
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key)[0])
+        self.entries[key] = (summary, expires_at)
+        self.size += len(summary)
+        while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def get(self, key):
+        """Devuelve (summary, nivel) o (None, None) si no hay entrada vigente"""
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry:
+                if entry[1] > now:
+                    self.entries.move_to_end(key)
+                    self.stats['memoryHits'] += 1
+                    return entry[0], 'memory'
+                self.size -= len(self.entries.pop(key)[0])
+
+        if self.table is not None:
+            try:
+                item = self.table.get_item(Key={'cacheKey': key}).get('Item')
+            except Exception as e:
+                print(f'Summary cache read error: {str(e)}')
+                item = None
+            # El TTL de DynamoDB borra con demora: validar expiresAt igualmente
+            if item and int(item['expiresAt']) > now:
+                with self._lock:
+                    self._remember(key, item['summary'], int(item['expiresAt']))
+                    self.stats['persistentHits'] += 1
+                return item['summary'], 'persistent'
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None, None
+
+    def put(self, key, summary):
+        expires_at = int(time.time()) + self.ttl
+        with self._lock:
+            self._remember(key, summary, expires_at)
+        if self.table is not None:
+            try:
+                self.table.put_item(Item={'cacheKey': key, 'summary': summary, 'expiresAt': expires_at})
+            except Exception as e:
+                print(f'Summary cache write error: {str(e)}')
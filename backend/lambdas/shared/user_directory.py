@@ -0,0 +1,202 @@
+"""Caché del listado de usuarios de Cognito, compartida por las Lambdas admin.
+
+list_users devuelve como máximo 60 usuarios por llamada y tiene límites de
+tasa bajos, así que el directorio se guarda en dos niveles:
+- memoria del contenedor (MEMORY_TTL segundos)
+- snapshot comprimido en DynamoDB, o en un archivo de /tmp si no se indica
+  tabla, válido por SNAPSHOT_TTL segundos
+
+El snapshot comprimido ocupa unos 70 bytes por usuario y un item de DynamoDB
+admite 400 KB, así que se parte en trozos de SNAPSHOT_PART_BYTES: el item
+(pk='DIRECTORY', sk=<poolId>) lleva el primero, fetchedAt, la generación y la
+cantidad de partes, y el resto va en (pk='DIRECTORY', sk=<poolId>#<generación>#<n>).
+Las partes se escriben antes que el item principal, que es el que cambia de
+generación; después se borran las partes de generaciones anteriores. Si a un
+snapshot le falta una parte (lo reemplazó otro contenedor a mitad de la
+lectura) se trata como inexistente y se relee Cognito.
+
+Los errores de lectura y escritura del snapshot se cuentan en la línea de
+métricas (UserDirectoryReadErrors, UserDirectoryWriteErrors): si la escritura
+falla siempre, cada contenedor vuelve a recorrer Cognito cada MEMORY_TTL.
+
+epi-admin-actions llama a invalidate() al cambiar roles o resetear contraseñas.
+"""
+import json
+import os
+import time
+import zlib
+from collections import namedtuple
+
+from metrics import increment
+
+MEMORY_TTL = int(os.environ.get('USER_DIRECTORY_MEMORY_TTL', '60'))
+SNAPSHOT_TTL = int(os.environ.get('USER_DIRECTORY_TTL', '300'))
+CACHE_DIR = os.environ.get('USER_DIRECTORY_CACHE_DIR', '/tmp')
+# Bytes comprimidos por item de DynamoDB (límite de 400 KB por item)
+SNAPSHOT_PART_BYTES = int(os.environ.get('USER_DIRECTORY_PART_BYTES', str(300 * 1024)))
+
+DIRECTORY_PK = 'DIRECTORY'
+ATTRIBUTES = ('email', 'given_name', 'family_name', 'name', 'custom:role')
+
+DirectoryUser = namedtuple(
+    'DirectoryUser',
+    ['username', 'email', 'given_name', 'family_name', 'name', 'role', 'created_at', 'status']
+)
+
+_snapshots = {}
+
+
+def _fetch(cognito, pool_id):
+    """Recorre el user pool pidiendo solo los atributos que se usan"""
+    users = []
+    params = {'UserPoolId': pool_id, 'Limit': 60, 'AttributesToGet': list(ATTRIBUTES)}
+    while True:
+        response = cognito.list_users(**params)
+        for user in response.get('Users', []):
+            attributes = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
+            created = user.get('UserCreateDate')
+            users.append(DirectoryUser(
+                user.get('Username'),
+                attributes.get('email', ''),
+                attributes.get('given_name', ''),
+                attributes.get('family_name', ''),
+                attributes.get('name', ''),
+                attributes.get('custom:role', 'user'),
+                created.isoformat() if created else '',
+                user.get('UserStatus', '')
+            ))
+        if not response.get('PaginationToken'):
+            return users
+        params['PaginationToken'] = response['PaginationToken']
+
+
+def _encode(users):
+    return zlib.compress(json.dumps([list(user) for user in users], separators=(',', ':')).encode('utf-8'))
+
+
+def _decode(blob):
+    return [DirectoryUser(*row) for row in json.loads(zlib.decompress(blob))]
+
+
+def _cache_path(pool_id):
+    return os.path.join(CACHE_DIR, f'user-directory-{pool_id}.bin')
+
+
+def _part_prefix(pool_id, generation):
+    return f'{pool_id}#{generation}#'
+
+
+def _query_parts(table, prefix, projection=None):
+    """Items de partes del snapshot cuyo sk empieza con prefix, en orden"""
+    params = {
+        'KeyConditionExpression': '#pk = :pk AND begins_with(#sk, :prefix)',
+        'ExpressionAttributeNames': {'#pk': 'pk', '#sk': 'sk'},
+        'ExpressionAttributeValues': {':pk': DIRECTORY_PK, ':prefix': prefix}
+    }
+    if projection:
+        params['ProjectionExpression'] = projection
+    while True:
+        response = table.query(**params)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _blob(value):
+    return bytes(getattr(value, 'value', value))
+
+
+def _load_snapshot(pool_id, table):
+    """Devuelve (fetched_at, users) del snapshot persistido o None"""
+    if table is not None:
+        item = table.get_item(Key={'pk': DIRECTORY_PK, 'sk': pool_id}).get('Item')
+        if not item:
+            return None
+        chunks = [_blob(item['users'])]
+        parts = int(item.get('parts', 1))
+        if parts > 1:
+            chunks.extend(_blob(part['users']) for part in _query_parts(table, _part_prefix(pool_id, item['generation'])))
+            if len(chunks) != parts:
+                return None
+        return float(item['fetchedAt']), _decode(b''.join(chunks))
+    try:
+        with open(_cache_path(pool_id), 'rb') as cache_file:
+            return os.fstat(cache_file.fileno()).st_mtime, _decode(cache_file.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _delete_parts(pool_id, table, keep=None):
+    """Borra las partes del snapshot salvo las de la generación keep"""
+    stale = [part['sk'] for part in _query_parts(table, pool_id + '#', projection='sk')
+             if keep is None or not part['sk'].startswith(_part_prefix(pool_id, keep))]
+    if stale:
+        with table.batch_writer() as writer:
+            for sk in stale:
+                writer.delete_item(Key={'pk': DIRECTORY_PK, 'sk': sk})
+
+
+def _save_snapshot(pool_id, table, fetched_at, users):
+    blob = _encode(users)
+    if table is not None:
+        chunks = [blob[start:start + SNAPSHOT_PART_BYTES] for start in range(0, len(blob), SNAPSHOT_PART_BYTES)] or [b'']
+        generation = str(int(fetched_at * 1000))
+        prefix = _part_prefix(pool_id, generation)
+        if len(chunks) > 1:
+            with table.batch_writer() as writer:
+                for index, chunk in enumerate(chunks[1:], 1):
+                    writer.put_item(Item={'pk': DIRECTORY_PK, 'sk': f'{prefix}{index:04d}', 'users': chunk})
+        table.put_item(Item={
+            'pk': DIRECTORY_PK, 'sk': pool_id, 'fetchedAt': int(fetched_at),
+            'generation': generation, 'parts': len(chunks), 'users': chunks[0]
+        })
+        _delete_parts(pool_id, table, keep=generation)
+        return
+    path = _cache_path(pool_id)
+    with open(path + '.tmp', 'wb') as cache_file:
+        cache_file.write(blob)
+    os.replace(path + '.tmp', path)
+
+
+def get_users(cognito, pool_id, table=None):
+    """Lista de DirectoryUser del pool, desde caché si está vigente"""
+    now = time.time()
+    cached = _snapshots.get(pool_id)
+    if cached and now - cached[0] < MEMORY_TTL:
+        return cached[1]
+
+    snapshot = None
+    try:
+        snapshot = _load_snapshot(pool_id, table)
+    except Exception as e:
+        increment('UserDirectoryReadErrors')
+        print(f'User directory cache read error: {str(e)}')
+
+    if snapshot and now - snapshot[0] < SNAPSHOT_TTL:
+        users = snapshot[1]
+    else:
+        users = _fetch(cognito, pool_id)
+        try:
+            _save_snapshot(pool_id, table, now, users)
+        except Exception as e:
+            increment('UserDirectoryWriteErrors')
+            print(f'User directory cache write error ({len(users)} users): {str(e)}')
+
+    _snapshots[pool_id] = (now, users)
+    return users
+
+
+def invalidate(pool_id, table=None):
+    """Descarta el snapshot en memoria y el persistido (otros contenedores lo
+    releen de Cognito cuando vence su MEMORY_TTL)"""
+    _snapshots.pop(pool_id, None)
+    try:
+        if table is not None:
+            previous = table.delete_item(Key={'pk': DIRECTORY_PK, 'sk': pool_id}, ReturnValues='ALL_OLD').get('Attributes')
+            if previous and int(previous.get('parts', 1)) > 1:
+                _delete_parts(pool_id, table)
+        elif os.path.exists(_cache_path(pool_id)):
+            os.remove(_cache_path(pool_id))
+    except Exception as e:
+        print(f'User directory cache invalidation error: {str(e)}')
@@ -1,10 +1,21 @@
-import json
-import boto3
 import re
 from datetime import datetime
+from aws_clients import lazy_table
+from http_api import HttpError, Response, Router
+from profile_cache import ProfileCache, etag_matches
 
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-table = dynamodb.Table('UserProfiles')
+table = lazy_table('UserProfiles', region_name='us-east-1')
+
+# Perfiles de este contenedor (PROFILE_CACHE_TTL, PROFILE_CACHE_SIZE); el POST los actualiza
+profiles = ProfileCache()
+
+# El body trae datos personales: el log muestreado registra solo su tamaño
+router = Router(allow_headers='Content-Type,If-None-Match', error_message='Internal server error', decimal_body=False,
+                log_body=False)
+
+def cache_headers(etag):
+    """ETag del perfil; no-cache hace que el navegador revalide con If-None-Match en cada uso"""
+    return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
 
 # Validaciones de seguridad
 def sanitize_string(value, max_length=100):
@@ -41,140 +52,87 @@ def validate_date(date_str):
     except:
         return False
 
-def lambda_handler(event, context):
+# GET - Obtener perfil
+@router.route('GET')
+def get_profile(request):
     # Log de intento (sin datos sensibles)
-    print(f"Request: {event.get('httpMethod')} from IP: {event.get('requestContext', {}).get('identity', {}).get('sourceIp', 'unknown')}")
-    try:
-        # Configurar CORS
-        headers = {
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type',
-            'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-        }
-        
-        # Manejar preflight
-        if event.get('httpMethod') == 'OPTIONS':
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'body': json.dumps({'message': 'OK'})
-            }
-        
-        # GET - Obtener perfil
-        if event.get('httpMethod') == 'GET':
-            user_id = event.get('queryStringParameters', {}).get('userId')
-            
-            if not user_id:
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'userId is required'})
-                }
-            
-            response = table.get_item(Key={'userId': user_id})
-            
-            if 'Item' in response:
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'body': json.dumps({'profile': response['Item']})
-                }
-            else:
-                return {
-                    'statusCode': 404,
-                    'headers': headers,
-                    'body': json.dumps({'profile': None})
-                }
-        
-        # POST - Guardar/actualizar perfil
-        elif event.get('httpMethod') == 'POST':
-            body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-            
-            user_id = body.get('userId')
-            profile_data = body.get('profileData', {})
-            
-            # Validaciones de seguridad
-            if not user_id or not validate_user_id(user_id):
-                print(f"Invalid userId format: {user_id}")
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'Invalid userId format'})
-                }
-            
-            # Validar campos requeridos
-            first_name = sanitize_string(profile_data.get('firstName', ''), 50)
-            last_name = sanitize_string(profile_data.get('lastName', ''), 50)
-            
-            if not first_name or not last_name:
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'firstName and lastName are required'})
-                }
-            
-            # Validar teléfono
-            phone = sanitize_string(profile_data.get('phone', ''), 20)
-            if phone and not validate_phone(phone):
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'Invalid phone format'})
-                }
-            
-            # Validar fecha
-            birth_date = profile_data.get('birthDate', '')
-            if birth_date and not validate_date(birth_date):
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'Invalid date format'})
-                }
-            
-            # Preparar item con datos sanitizados
-            item = {
-                'userId': user_id,
-                'firstName': first_name,
-                'lastName': last_name,
-                'birthDate': birth_date,
-                'country': sanitize_string(profile_data.get('country', ''), 100),
-                'state': sanitize_string(profile_data.get('state', ''), 100),
-                'department': sanitize_string(profile_data.get('department', ''), 100),
-                'city': sanitize_string(profile_data.get('city', ''), 100),
-                'postalCode': sanitize_string(profile_data.get('postalCode', ''), 20),
-                'phone': phone,
-                'updatedAt': datetime.now().isoformat()
-            }
-            
-            print(f"Saving profile for user: {user_id[:8]}...")
-            
-            # Guardar en DynamoDB
-            table.put_item(Item=item)
-            
-            return {
-                'statusCode': 200,
-                'headers': headers,
-                'body': json.dumps({'success': True, 'profile': item})
-            }
-        
-        else:
-            return {
-                'statusCode': 405,
-                'headers': headers,
-                'body': json.dumps({'error': 'Method not allowed'})
-            }
-            
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {str(e)}")
-        return {
-            'statusCode': 400,
-            'headers': headers,
-            'body': json.dumps({'error': 'Invalid JSON format'})
-        }
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({'error': 'Internal server error'})
-        }
+    print(f"Request: GET from IP: {request.source_ip}")
+    user_id = request.params.get('userId')
+    
+    if not user_id:
+        raise HttpError(400, 'userId is required')
+    
+    if_none_match = request.header('If-None-Match')
+    cached = profiles.get(user_id)
+    # Un ETag del cliente distinto del cacheado puede venir de un POST atendido por otro
+    # contenedor: se relee el perfil en lugar de devolver la copia de este
+    if cached is not None and if_none_match and not etag_matches(if_none_match, cached[1]):
+        cached = None
+    if cached is None:
+        response = table.get_item(Key={'userId': user_id})
+        if 'Item' not in response:
+            return Response(404, {'profile': None})
+        cached = profiles.put(user_id, response['Item'])
+    item, etag = cached
+    
+    # Perfil sin cambios desde la copia del cliente: 304 sin body
+    if etag_matches(if_none_match, etag):
+        return Response(304, headers=cache_headers(etag), text='')
+    return Response(200, {'profile': item}, headers=cache_headers(etag))
+
+# POST - Guardar/actualizar perfil
+@router.route('POST')
+def save_profile(request):
+    print(f"Request: POST from IP: {request.source_ip}")
+    body = request.body
+    
+    user_id = body.get('userId')
+    profile_data = body.get('profileData', {})
+    
+    # Validaciones de seguridad
+    if not user_id or not validate_user_id(user_id):
+        print(f"Invalid userId format: {user_id}")
+        raise HttpError(400, 'Invalid userId format')
+    
+    # Validar campos requeridos
+    first_name = sanitize_string(profile_data.get('firstName', ''), 50)
+    last_name = sanitize_string(profile_data.get('lastName', ''), 50)
+    
+    if not first_name or not last_name:
+        raise HttpError(400, 'firstName and lastName are required')
+    
+    # Validar teléfono
+    phone = sanitize_string(profile_data.get('phone', ''), 20)
+    if phone and not validate_phone(phone):
+        raise HttpError(400, 'Invalid phone format')
+    
+    # Validar fecha
+    birth_date = profile_data.get('birthDate', '')
+    if birth_date and not validate_date(birth_date):
+        raise HttpError(400, 'Invalid date format')
+    
+    # Preparar item con datos sanitizados
+    item = {
+        'userId': user_id,
+        'firstName': first_name,
+        'lastName': last_name,
+        'birthDate': birth_date,
+        'country': sanitize_string(profile_data.get('country', ''), 100),
+        'state': sanitize_string(profile_data.get('state', ''), 100),
+        'department': sanitize_string(profile_data.get('department', ''), 100),
+        'city': sanitize_string(profile_data.get('city', ''), 100),
+        'postalCode': sanitize_string(profile_data.get('postalCode', ''), 20),
+        'phone': phone,
+        'updatedAt': datetime.now().isoformat()
+    }
+    
+    print(f"Saving profile for user: {user_id[:8]}...")
+    
+    # Guardar en DynamoDB
+    table.put_item(Item=item)
+    _, etag = profiles.put(user_id, item)
+    
+    return Response(200, {'success': True, 'profile': item}, headers=cache_headers(etag))
+
+def lambda_handler(event, context):
+    return router(event, context)
@@ -47,6 +47,8 @@ const AdminPanel: React.FC = () => {
   const [stats, setStats] = useState<Stats | null>(null);
   const [users, setUsers] = useState<User[]>([]);
   const [loading, setLoading] = useState(false);
+  const [lastUsersKey, setLastUsersKey] = useState<string | null>(null);
+  const [loadingMoreUsers, setLoadingMoreUsers] = useState(false);
   const [selectedUser, setSelectedUser] = useState<User | null>(null);
   const [showUserModal, setShowUserModal] = useState(false);
   const [userHistory, setUserHistory] = useState<any[]>([]);
@@ -76,17 +78,38 @@ const AdminPanel: React.FC = () => {
     }
   };
 
-  const fetchUsers = async () => {
-    setLoading(true);
+  const fetchUsers = async (loadMore = false) => {
+    if (loadMore) {
+      setLoadingMoreUsers(true);
+    } else {
+      setLoading(true);
+    }
     try {
-      const response = await axios.get(ADMIN_USERS_URL);
-      setUsers(response.data.users);
+      let url = ADMIN_USERS_URL;
+      if (loadMore && lastUsersKey) {
+        url += `?lastKey=${encodeURIComponent(lastUsersKey)}`;
+      }
+      
+      const response = await axios.get(url);
+      const newUsers = response.data.users || [];
+      
+      if (loadMore) {
+        setUsers(prev => [...prev, ...newUsers]);
+      } else {
+        setUsers(newUsers);
+      }
+      setLastUsersKey(response.data.lastKey || null);
     } catch (error) {
       console.error('Error cargando usuarios:', error);
-      setUsers([]);
-      toast.info('Modo desarrollo: Usuarios no disponibles');
+      if (!loadMore) {
+        setUsers([]);
+        toast.info('Modo desarrollo: Usuarios no disponibles');
+      } else {
+        toast.error('Error cargando más usuarios');
+      }
     } finally {
       setLoading(false);
+      setLoadingMoreUsers(false);
     }
   };
 
@@ -141,7 +164,7 @@ const AdminPanel: React.FC = () => {
     setLoadingUserHistory(true);
     
     try {
-      let url = `${ADMIN_USER_HISTORY_URL}?userId=${user.username}&limit=10`;
+      let url = `${ADMIN_USER_HISTORY_URL}?userId=${user.username}&limit=10&view=summary`;
       if (loadMore && lastUserHistoryKey) {
         url += `&lastKey=${encodeURIComponent(lastUserHistoryKey)}`;
       }
@@ -166,6 +189,19 @@ const AdminPanel: React.FC = () => {
     }
   };
 
+  const handleViewAnalysis = async (analysis: any) => {
+    if (!selectedUser) return;
+    
+    try {
+      // El listado trae solo el resumen; el informe necesita el análisis completo
+      const response = await axios.get(`${ADMIN_USER_HISTORY_URL}?userId=${selectedUser.username}&timestamp=${analysis.timestamp}`);
+      setViewingAnalysis(response.data.analysis);
+    } catch (error) {
+      console.error('Error cargando análisis:', error);
+      toast.error('Error cargando el informe del análisis');
+    }
+  };
+
   return (
     <div className="max-w-7xl mx-auto space-y-6">
       <div className="bg-white rounded-2xl shadow-xl border border-gray-100 overflow-hidden">
@@ -387,6 +423,18 @@ const AdminPanel: React.FC = () => {
                   </tbody>
                 </table>
               </div>
+              
+              {lastUsersKey && (
+                <div className="text-center">
+                  <button
+                    onClick={() => fetchUsers(true)}
+                    disabled={loadingMoreUsers}
+                    className="bg-gradient-to-r from-blue-600 to-purple-600 text-white px-6 py-3 rounded-xl font-semibold hover:from-blue-700 hover:to-purple-700 disabled:opacity-50 disabled:cursor-not-allowed transition-all shadow-lg"
+                  >
+                    {loadingMoreUsers ? 'Cargando...' : '🔄 Cargar más usuarios'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -482,7 +530,7 @@ const AdminPanel: React.FC = () => {
                         </div>
                         
                         <button
-                          onClick={() => setViewingAnalysis(analysis)}
+                          onClick={() => handleViewAnalysis(analysis)}
                           className="w-full bg-gradient-to-r from-blue-600 to-purple-600 text-white py-2 px-4 rounded-lg text-sm font-medium hover:from-blue-700 hover:to-purple-700 transition-all"
                         >
                           📊 Ver Informe Completo